@@ -0,0 +1,141 @@
+"""
+Speed of encoding QGIS features for upload to a vector layer.
+
+Compares the former per-feature encoding, which created a coordinate
+transform and looked up field types for every feature, with
+NGWFeatureEncoder, which prepares them once for the layer. Features of a
+memory layer in EPSG:4326 are encoded for a layer in EPSG:3857.
+
+    python benchmarks/feature_encoder.py --features 100000 --fields 20
+"""
+
+import argparse
+import time
+from typing import Any, Callable, Dict, List
+
+from ngw_layer_json import (
+    field_definitions,
+    field_value,
+    init_qgis,
+    legacy_construct_ngw_feature_as_json,
+    vector_layer,
+)
+
+QGIS_FIELD_TYPES = {
+    "INTEGER": "integer",
+    "REAL": "double",
+    "STRING": "string",
+    "DATE": "date",
+    "DATETIME": "datetime",
+    "TIME": "time",
+}
+
+
+def memory_layer(fields, features_count: int) -> Any:
+    from qgis.core import QgsFeature, QgsGeometry, QgsPointXY, QgsVectorLayer
+
+    fields_uri = "&".join(
+        f"field={keyname}:{QGIS_FIELD_TYPES[datatype]}"
+        for keyname, datatype in fields
+    )
+    layer = QgsVectorLayer(
+        f"Point?crs=EPSG:4326&{fields_uri}", "benchmark", "memory"
+    )
+    qgs_features = []
+    for index in range(features_count):
+        qgs_feature = QgsFeature(layer.fields())
+        qgs_feature.setGeometry(
+            QgsGeometry.fromPointXY(
+                QgsPointXY(index % 360 - 180, index % 170 - 85)
+            )
+        )
+        qgs_feature.setAttributes(
+            [field_value(datatype, index) for _, datatype in fields]
+        )
+        qgs_features.append(qgs_feature)
+    layer.dataProvider().addFeatures(qgs_features)
+    return layer
+
+
+def legacy_encode(ngw_layer: Any, qgs_feature: Any, qgs_layer: Any) -> Dict:
+    from qgis.core import (
+        QgsCoordinateReferenceSystem,
+        QgsCoordinateTransform,
+        QgsProject,
+    )
+
+    from nextgis_connect.ngw_api.qgis.compat_qgis import CompatQt
+    from nextgis_connect.ngw_api.qgis.ngw_feature_encoder import get_wkt
+
+    geometry = qgs_feature.geometry()
+    geometry.transform(
+        QgsCoordinateTransform(
+            qgs_layer.crs(),
+            QgsCoordinateReferenceSystem.fromEpsgId(ngw_layer.srs()),
+            QgsProject.instance(),
+        )
+    )
+    if ngw_layer.is_geom_multy():
+        geometry.convertToMultiType()
+
+    attributes = {}
+    for qgs_field in qgs_feature.fields().toList():
+        value = qgs_feature.attribute(qgs_field.name())
+        attributes[qgs_field.name()] = CompatQt.get_clean_python_value(value)
+
+    return {
+        "geom": get_wkt(geometry),
+        "fields": legacy_construct_ngw_feature_as_json(ngw_layer, attributes),
+    }
+
+
+def measure(
+    name: str, encode: Callable[[], List[Any]], features_count: int
+) -> None:
+    started_at = time.perf_counter()
+    encode()
+    elapsed = time.perf_counter() - started_at
+    print(f"{name:>8}: {features_count / elapsed:12.0f} features/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--features", type=int, default=100000)
+    parser.add_argument("--fields", type=int, default=20)
+    args = parser.parse_args()
+
+    _application = init_qgis()
+
+    from nextgis_connect.ngw_api.core.ngw_feature import (
+        GEOM_FORMAT_WKB,
+        GEOM_FORMAT_WKT,
+    )
+    from nextgis_connect.ngw_api.qgis.ngw_feature_encoder import (
+        NGWFeatureEncoder,
+    )
+
+    fields = field_definitions(args.fields)
+    ngw_layer = vector_layer(fields)
+    qgs_layer = memory_layer(fields, args.features)
+    qgs_features = list(qgs_layer.getFeatures())
+
+    print(f"{args.features} features, {args.fields} fields")
+    measure(
+        "legacy",
+        lambda: [
+            legacy_encode(ngw_layer, qgs_feature, qgs_layer)
+            for qgs_feature in qgs_features
+        ],
+        args.features,
+    )
+    for geom_format in (GEOM_FORMAT_WKT, GEOM_FORMAT_WKB):
+        encoder = NGWFeatureEncoder(qgs_layer, ngw_layer, geom_format)
+        measure(
+            geom_format,
+            lambda encoder=encoder: encoder.encode_batch(qgs_features),
+            args.features,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Speed of encoding feature attributes of wide layers into features API form.
+
+Compares the former NGWVectorLayer.construct_ngw_feature_as_json, which
+looked up every field by name and compared type names, with the current
+one using compiled field converters, and with direct iteration over
+NGWVectorLayer.field_converters as done by the QGIS feature encoder.
+
+    python benchmarks/field_converters.py --fields 200
+"""
+
+import argparse
+import time
+from typing import Any, Callable, Dict
+
+from ngw_layer_json import (
+    field_definitions,
+    field_value,
+    init_qgis,
+    legacy_construct_ngw_feature_as_json,
+    vector_layer,
+)
+
+
+def measure(name: str, encode: Callable[[], Any], features_count: int) -> None:
+    started_at = time.perf_counter()
+    for _ in range(features_count):
+        encode()
+    elapsed = time.perf_counter() - started_at
+    print(f"{name:>14}: {features_count / elapsed:12.0f} features/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fields", type=int, default=200)
+    parser.add_argument("--features", type=int, default=10000)
+    args = parser.parse_args()
+
+    _application = init_qgis()
+
+    fields = field_definitions(args.fields)
+    layer = vector_layer(fields)
+    attributes = {
+        keyname: field_value(datatype, index)
+        for index, (keyname, datatype) in enumerate(fields)
+    }
+    values = list(attributes.values())
+
+    def encode_compiled() -> Dict[str, Any]:
+        return {
+            keyname: converter(values[index])
+            for index, (keyname, converter) in enumerate(
+                layer.field_converters
+            )
+        }
+
+    print(f"{args.fields} fields, {args.features} features")
+    measure(
+        "legacy",
+        lambda: legacy_construct_ngw_feature_as_json(layer, attributes),
+        args.features,
+    )
+    measure(
+        "construct",
+        lambda: layer.construct_ngw_feature_as_json(attributes),
+        args.features,
+    )
+    measure("converters", encode_compiled, args.features)
+
+
+if __name__ == "__main__":
+    main()
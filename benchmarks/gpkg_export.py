@@ -0,0 +1,186 @@
+"""
+Speed of exporting a vector layer to a GeoPackage for upload.
+
+Compares the former prepareAsGPKG, which transformed and wrote features
+one by one, with the current one transforming chunks of features in worker
+threads, and with the gdal.VectorTranslate path used for unmodified OGR
+layers. Points of a GeoPackage in EPSG:4326 are exported to EPSG:3857.
+
+    python benchmarks/gpkg_export.py --features 1000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from typing import Any, Callable, Optional, Tuple
+
+from ngw_layer_json import init_qgis
+
+
+def create_source(path: str, features_count: int, fields_count: int) -> None:
+    from osgeo import ogr, osr
+
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(4326)
+    srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+
+    datasource = ogr.GetDriverByName("GPKG").CreateDataSource(path)
+    layer = datasource.CreateLayer("points", srs, ogr.wkbPoint)
+    for index in range(fields_count):
+        field_type = ogr.OFTInteger if index % 2 == 0 else ogr.OFTString
+        layer.CreateField(ogr.FieldDefn(f"field_{index}", field_type))
+
+    definition = layer.GetLayerDefn()
+    layer.StartTransaction()
+    for index in range(features_count):
+        feature = ogr.Feature(definition)
+        for field_index in range(fields_count):
+            feature.SetField(
+                field_index,
+                index if field_index % 2 == 0 else f"value {index}",
+            )
+        geometry = ogr.Geometry(ogr.wkbPoint)
+        geometry.AddPoint_2D(index % 360 - 180, index % 170 - 85)
+        feature.SetGeometry(geometry)
+        layer.CreateFeature(feature)
+    layer.CommitTransaction()
+    del datasource
+
+
+def legacy_prepare_as_gpkg(snapshot: Any) -> Tuple[str, Optional[str]]:
+    """Former QGISResourceJob.prepareAsGPKG without the primary key check"""
+    from qgis.core import (
+        QgsCoordinateReferenceSystem,
+        QgsCoordinateTransform,
+        QgsFeature,
+        QgsFeatureRequest,
+        QgsField,
+        QgsFields,
+        QgsVectorFileWriter,
+    )
+
+    from nextgis_connect.compat import FieldType
+
+    tmp_gpkg_path = tempfile.mktemp(".gpkg")
+    destination_srs = QgsCoordinateReferenceSystem.fromEpsgId(3857)
+    fid_name = "0xFEEDC0DE"
+
+    options = QgsVectorFileWriter.SaveVectorOptions()
+    options.driverName = "GPKG"
+    options.layerName = snapshot.name
+    options.fileEncoding = "UTF-8"
+    options.layerOptions = [
+        *QgsVectorFileWriter.defaultDatasetOptions("GPKG"),
+        f"FID={fid_name}",
+        "SPATIAL_INDEX=NO",
+    ]
+
+    fields = QgsFields()
+    fields.append(QgsField(fid_name, FieldType.LongLong))
+    for field in snapshot.fields.toList():
+        fields.append(field)
+
+    writer = QgsVectorFileWriter.create(
+        fileName=tmp_gpkg_path,
+        fields=fields,
+        geometryType=snapshot.wkb_type,
+        transformContext=snapshot.transform_context,
+        srs=destination_srs,
+        options=options,
+    )
+    transform = QgsCoordinateTransform(
+        snapshot.source_crs, destination_srs, snapshot.transform_context
+    )
+
+    for feature in snapshot.feature_source.getFeatures(QgsFeatureRequest()):
+        target_feature = QgsFeature(fields)
+        geometry = feature.geometry()
+        geometry.transform(transform)
+        target_feature.setGeometry(geometry)
+        target_feature.setAttributes([None, *feature.attributes()])
+        writer.addFeature(target_feature)
+
+    del writer  # save changes
+
+    return tmp_gpkg_path, None
+
+
+def features_count(path: str) -> int:
+    from osgeo import ogr
+
+    datasource = ogr.Open(path)
+    count = datasource.GetLayer(0).GetFeatureCount()
+    del datasource
+    return count
+
+
+def measure(
+    name: str, export: Callable[[], Tuple[str, Optional[str]]]
+) -> None:
+    started_at = time.perf_counter()
+    path, _ = export()
+    elapsed = time.perf_counter() - started_at
+    count = features_count(path)
+    os.remove(path)
+    print(f"{name:>8}: {elapsed:7.2f} s, {count / elapsed:10.0f} features/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--features", type=int, default=1000000)
+    parser.add_argument("--fields", type=int, default=4)
+    parser.add_argument("--file", help="Use existing GeoPackage")
+    args = parser.parse_args()
+
+    _application = init_qgis()
+
+    from qgis.core import QgsVectorLayer
+
+    from nextgis_connect.ngw_api.qgis.ngw_resource_model_4qgis import (
+        QGISResourceJob,
+        VectorLayerSnapshot,
+    )
+
+    class ChunkedExportJob(QGISResourceJob):
+        def translateAsGPKG(self, snapshot, gpkg_path, fid_name) -> bool:
+            return False
+
+    path = args.file
+    if path is None:
+        file_descriptor, path = tempfile.mkstemp(suffix=".gpkg")
+        os.close(file_descriptor)
+        os.remove(path)
+        create_source(path, args.features, args.fields)
+
+    try:
+        layer = QgsVectorLayer(path, "benchmark", "ogr")
+        assert layer.isValid()
+        print(f"{layer.featureCount()} features, {args.fields} fields")
+
+        # Every export reads features from its own feature source
+        measure(
+            "legacy",
+            lambda: legacy_prepare_as_gpkg(
+                VectorLayerSnapshot.from_layer(layer)
+            ),
+        )
+        measure(
+            "chunked",
+            lambda: ChunkedExportJob().prepareAsGPKG(
+                VectorLayerSnapshot.from_layer(layer)
+            ),
+        )
+        measure(
+            "gdal",
+            lambda: QGISResourceJob().prepareAsGPKG(
+                VectorLayerSnapshot.from_layer(layer)
+            ),
+        )
+    finally:
+        if args.file is None:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
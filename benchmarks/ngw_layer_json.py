@@ -0,0 +1,126 @@
+"""
+Helpers of benchmarks working with vector layers without a server.
+
+A benchmark is run with the Python interpreter of QGIS with the plugin
+directory on the path. QGIS is initialized without GUI.
+"""
+
+import datetime
+from typing import Any, Dict, List, Tuple
+
+# Field types cycled over generated fields
+FIELD_TYPES = ("INTEGER", "REAL", "STRING", "DATE", "DATETIME", "TIME")
+
+
+def init_qgis() -> Any:
+    from qgis.core import QgsApplication
+
+    application = QgsApplication([], False)
+    application.initQgis()
+    return application
+
+
+def field_definitions(fields_count: int) -> List[Tuple[str, str]]:
+    return [
+        (f"field_{index}", FIELD_TYPES[index % len(FIELD_TYPES)])
+        for index in range(fields_count)
+    ]
+
+
+def field_value(datatype: str, index: int) -> Any:
+    values = {
+        "INTEGER": index,
+        "REAL": index / 3,
+        "STRING": f"value {index}",
+        "DATE": datetime.date(2024, 1, 1 + index % 28),
+        "DATETIME": datetime.datetime(2024, 1, 1, index % 24, 30, 15),
+        "TIME": datetime.time(index % 24, 30, 15),
+    }
+    return values[datatype]
+
+
+def legacy_construct_ngw_feature_as_json(
+    layer: Any, attributes: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Former NGWVectorLayer.construct_ngw_feature_as_json"""
+    json_feature = {}
+    for field_name, pyvalue in attributes.items():
+        field_type = layer.field(field_name).datatype.name
+        json_value = None
+        if field_type == "DATE":
+            if isinstance(pyvalue, datetime.date):
+                json_value = {
+                    "year": pyvalue.year,
+                    "month": pyvalue.month,
+                    "day": pyvalue.day,
+                }
+        elif field_type == "TIME":
+            if isinstance(pyvalue, datetime.time):
+                json_value = {
+                    "hour": pyvalue.hour,
+                    "minute": pyvalue.minute,
+                    "second": pyvalue.second,
+                }
+        elif field_type == "DATETIME":
+            if isinstance(pyvalue, datetime.datetime):
+                json_value = {
+                    "year": pyvalue.year,
+                    "month": pyvalue.month,
+                    "day": pyvalue.day,
+                    "hour": pyvalue.hour,
+                    "minute": pyvalue.minute,
+                    "second": pyvalue.second,
+                }
+        elif field_type is None:
+            json_value = None
+        else:
+            json_value = pyvalue
+        json_feature[field_name] = json_value
+    return json_feature
+
+
+def vector_layer_json(
+    fields: List[Tuple[str, str]],
+    geometry_type: str = "POINT",
+    srs: int = 3857,
+) -> Dict[str, Any]:
+    return {
+        "resource": {
+            "id": 1,
+            "cls": "vector_layer",
+            "parent": {"id": 0},
+            "owner_user": None,
+            "display_name": "Benchmark",
+            "keyname": None,
+            "description": None,
+            "children": False,
+            "interfaces": [],
+            "scopes": [],
+        },
+        "vector_layer": {
+            "srs": {"id": srs},
+            "geometry_type": geometry_type,
+        },
+        "feature_layer": {
+            "fields": [
+                {
+                    "id": index + 1,
+                    "keyname": keyname,
+                    "datatype": datatype,
+                    "typemod": None,
+                    "display_name": keyname,
+                    "label_field": False,
+                    "grid_visibility": True,
+                    "text_search": True,
+                    "lookup_table": None,
+                }
+                for index, (keyname, datatype) in enumerate(fields)
+            ]
+        },
+    }
+
+
+def vector_layer(fields: List[Tuple[str, str]], **kwargs) -> Any:
+    from nextgis_connect.ngw_api.core.ngw_vector_layer import NGWVectorLayer
+
+    return NGWVectorLayer(None, vector_layer_json(fields, **kwargs))
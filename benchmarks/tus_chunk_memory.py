@@ -0,0 +1,130 @@
+"""
+Peak memory of reading tus chunks of a large local file.
+
+Compares chunks read with QByteArray(file.read(size)) wrapped in a QBuffer
+with chunks read from MappedFileRegion devices. Several devices are kept
+open at once, as during an upload with several requests in flight, and
+read in small pieces as Qt does while sending.
+
+Every mode runs in a separate process to measure its own peak RSS. Run it
+with the Python interpreter of QGIS with the plugin directory on the path:
+
+    python benchmarks/tus_chunk_memory.py --size-mib 2048
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+CHUNK_SIZE = 16 * 1024 * 1024
+QT_READ_SIZE = 64 * 1024
+MODES = ("qbytearray", "mapped")
+
+
+def create_file(path: str, size: int) -> None:
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as file:
+        for _ in range(size // len(block)):
+            file.write(block)
+
+
+def read_chunks(path: str, mode: str, in_flight: int) -> None:
+    from qgis.PyQt.QtCore import QBuffer, QByteArray, QFile, QIODevice
+
+    from nextgis_connect.ngw_api.qgis.mapped_file_region import (
+        MappedFileRegion,
+    )
+
+    file_size = os.path.getsize(path)
+    file = QFile(path)
+    file.open(QIODevice.OpenModeFlag.ReadOnly)
+
+    offset = 0
+    while offset < file_size:
+        devices = []
+        for _ in range(in_flight):
+            size = min(CHUNK_SIZE, file_size - offset)
+            if size <= 0:
+                break
+            if mode == "mapped":
+                device = MappedFileRegion(path, offset, size)
+            else:
+                file.seek(offset)
+                device = QBuffer(QByteArray(file.read(size)))
+                device.open(QIODevice.OpenModeFlag.ReadOnly)
+            devices.append(device)
+            offset += size
+
+        for device in devices:
+            while len(device.read(QT_READ_SIZE)) > 0:
+                pass
+            device.close()
+
+    file.close()
+
+
+def run_mode(path: str, mode: str, in_flight: int) -> None:
+    tracemalloc.start()
+    started_at = time.perf_counter()
+    read_chunks(path, mode, in_flight)
+    elapsed = time.perf_counter() - started_at
+    _, heap_peak = tracemalloc.get_traced_memory()
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        rss_peak //= 1024
+    print(
+        f"{mode:>10}: {elapsed:7.2f} s,"
+        f" Python heap peak {heap_peak / 2**20:8.1f} MiB,"
+        f" RSS peak {rss_peak / 1024:8.1f} MiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mib", type=int, default=1024)
+    parser.add_argument("--in-flight", type=int, default=4)
+    parser.add_argument("--file", help="Use existing file")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode is not None:
+        run_mode(args.file, args.mode, args.in_flight)
+        return
+
+    path = args.file
+    if path is None:
+        file_descriptor, path = tempfile.mkstemp(suffix=".bin")
+        os.close(file_descriptor)
+        create_file(path, args.size_mib * 1024 * 1024)
+
+    try:
+        print(
+            f"File of {os.path.getsize(path) / 2**20:.0f} MiB, chunks of"
+            f" {CHUNK_SIZE / 2**20:.0f} MiB, {args.in_flight} in flight"
+        )
+        for mode in MODES:
+            subprocess.run(
+                [
+                    sys.executable,
+                    __file__,
+                    "--file",
+                    path,
+                    "--mode",
+                    mode,
+                    "--in-flight",
+                    str(args.in_flight),
+                ],
+                check=True,
+            )
+    finally:
+        if args.file is None:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -161,6 +161,7 @@ class NGWAbstractVectorResource(ABC, NGWResource):
             self.res_factory,
             NGWResource.receive_resource_obj(connection, result["id"]),
         )
+        self.res_factory.on_resource_created(ngw_resource)
 
         return ngw_resource
 
@@ -25,6 +25,12 @@ def FEATURE_ATTACHMENT_URL(res_id, feature_id, attachment_id):
     return f"/api/resource/{res_id}/feature/{feature_id}/attachment/{attachment_id}"
 
 
+def DOWNLOAD_URL(res_id, feature_id, attachment_id):
+    return (
+        f"{FEATURE_ATTACHMENT_URL(res_id, feature_id, attachment_id)}/download"
+    )
+
+
 def IMAGE_URL(res_id, feature_id, image_id):
     return f"{FEATURE_ATTACHMENT_URL(res_id, feature_id, image_id)}/image"
 
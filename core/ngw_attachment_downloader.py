@@ -0,0 +1,385 @@
+"""
+/***************************************************************************
+    NextGIS WEB API
+                              -------------------
+        begin                : 2014-11-19
+        git sha              : $Format:%H$
+        copyright            : (C) 2014 by NextGIS
+        email                : info@nextgis.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import json
+import os
+import tempfile
+import threading
+from collections import deque
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from qgis.PyQt.QtCore import QFile, QIODevice
+
+from nextgis_connect.logging import logger
+from nextgis_connect.ngw_api.qgis.file_upload_cache import file_full_hash
+from nextgis_connect.ngw_api.qgis.local_storage import local_storage_path
+from nextgis_connect.ngw_api.qgis.qgis_ngw_connection import NgwReplyFuture
+
+from .ngw_attachment import DOWNLOAD_URL
+from .ngw_feature import FEATURE_ATTACHMENTS_URL
+
+if TYPE_CHECKING:
+    from .ngw_vector_layer import NGWVectorLayer
+
+ATTACHMENTS_MAX_DOWNLOADS_IN_FLIGHT = 4
+ATTACHMENTS_CACHE_INDEX = "index.json"
+
+_index_lock = threading.Lock()
+
+
+@dataclass
+class NGWDownloadedAttachment:
+    """Attachment stored in the local cache"""
+
+    feature_id: int
+    attachment_id: int
+    name: Optional[str]
+    mime_type: Optional[str]
+    path: str
+    is_cached: bool
+
+
+@dataclass
+class NGWAttachmentDownloadError:
+    """Attachment which has not been downloaded"""
+
+    feature_id: int
+    attachment_id: Optional[int]
+    error: Exception
+
+
+class NGWAttachmentDownloader:
+    """
+    Bulk downloader of files attached to features of a vector layer.
+
+    Files are downloaded concurrently and streamed to disk. The cache
+    directory is content-addressed: every file is stored once under its
+    SHA-256 hash, and the index maps attachments to hashes. An attachment
+    is not downloaded again if the cached file has the same size as
+    reported by the server and its content matches the hash.
+
+    Failed files do not stop the download of others. Failures are
+    collected in :attr:`errors`.
+    """
+
+    __ngw_vector_layer: "NGWVectorLayer"
+    __cache_dir: Path
+    __max_downloads_in_flight: int
+    __progress_callback: Optional[Callable[[str, int, int], None]]
+
+    __index: Dict[str, Dict[str, Any]]
+    __downloads_in_flight: Deque[NgwReplyFuture]
+    __attachments: List[NGWDownloadedAttachment]
+    __errors: List[NGWAttachmentDownloadError]
+
+    def __init__(
+        self,
+        ngw_vector_layer: "NGWVectorLayer",
+        cache_dir: Optional[str] = None,
+        *,
+        max_downloads_in_flight: int = ATTACHMENTS_MAX_DOWNLOADS_IN_FLIGHT,
+        progress_callback: Optional[Callable[[str, int, int], None]] = None,
+    ) -> None:
+        if max_downloads_in_flight < 1:
+            raise ValueError("Downloads limit must be positive")
+
+        self.__ngw_vector_layer = ngw_vector_layer
+        self.__cache_dir = (
+            Path(cache_dir)
+            if cache_dir is not None
+            else local_storage_path("attachments")
+        )
+        self.__cache_dir.mkdir(parents=True, exist_ok=True)
+        self.__max_downloads_in_flight = max_downloads_in_flight
+        self.__progress_callback = progress_callback
+
+        self.__index = {}
+        self.__downloads_in_flight = deque()
+        self.__attachments = []
+        self.__errors = []
+
+    @property
+    def cache_dir(self) -> str:
+        return str(self.__cache_dir)
+
+    @property
+    def errors(self) -> List[NGWAttachmentDownloadError]:
+        return list(self.__errors)
+
+    def download(
+        self, feature_ids: Optional[Iterable[int]] = None
+    ) -> List[NGWDownloadedAttachment]:
+        """
+        Download attachments into the cache.
+
+        :param feature_ids: Ids of features to download attachments of.
+            Attachments of all features are downloaded if not set.
+        :type feature_ids: Optional[Iterable[int]]
+
+        :return: Attachments stored in the cache, including already cached
+            ones.
+        :rtype: List[NGWDownloadedAttachment]
+        """
+        self.__attachments = []
+        self.__errors = []
+        with _index_lock:
+            self.__index = self.__read_index()
+
+        try:
+            attachments = (
+                self.__ngw_vector_layer.iter_feature_attachments()
+                if feature_ids is None
+                else self.__iter_selected_attachments(feature_ids)
+            )
+            for feature_id, feature_attachments in attachments:
+                for attachment in feature_attachments:
+                    self.__fetch(feature_id, attachment)
+
+            connection = self.__ngw_vector_layer.res_factory.connection
+            connection.wait(self.__downloads_in_flight)
+            self.__downloads_in_flight.clear()
+
+        finally:
+            self.__save_index()
+
+        return list(self.__attachments)
+
+    def __iter_selected_attachments(
+        self, feature_ids: Iterable[int]
+    ) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+        connection = self.__ngw_vector_layer.res_factory.connection
+        resource_id = self.__ngw_vector_layer.resource_id
+
+        # Metadata of next features is requested while files are downloaded
+        futures: Deque[Tuple[int, NgwReplyFuture]] = deque()
+
+        def pop_attachments() -> Tuple[int, List[Dict[str, Any]]]:
+            feature_id, future = futures.popleft()
+            error = future.exception()
+            if error is not None:
+                logger.error(f"Can't get attachments of feature {feature_id}")
+                self.__errors.append(
+                    NGWAttachmentDownloadError(feature_id, None, error)
+                )
+                return feature_id, []
+            return feature_id, future.result()
+
+        for feature_id in feature_ids:
+            futures.append(
+                (
+                    feature_id,
+                    connection.request_async(
+                        "GET", FEATURE_ATTACHMENTS_URL(resource_id, feature_id)
+                    ),
+                )
+            )
+            if len(futures) >= self.__max_downloads_in_flight:
+                yield pop_attachments()
+
+        while len(futures) > 0:
+            yield pop_attachments()
+
+    def __fetch(self, feature_id: int, attachment: Dict[str, Any]) -> None:
+        cached_path = self.__cached_path(attachment)
+        if cached_path is not None:
+            self.__add_attachment(feature_id, attachment, cached_path, True)
+            return
+
+        connection = self.__ngw_vector_layer.res_factory.connection
+        while (
+            len(self.__downloads_in_flight) >= self.__max_downloads_in_flight
+        ):
+            self.__downloads_in_flight[0].exception()  # Wait for download
+            while (
+                len(self.__downloads_in_flight) > 0
+                and self.__downloads_in_flight[0].done()
+            ):
+                self.__downloads_in_flight.popleft()
+
+        attachment_id = attachment["id"]
+        logger.debug(f"Download attachment {attachment_id}")
+
+        file_descriptor, temp_path = tempfile.mkstemp(
+            suffix=".part", dir=self.__cache_dir
+        )
+        os.close(file_descriptor)
+        file = QFile(temp_path)
+        if not file.open(
+            QIODevice.OpenModeFlag.WriteOnly | QIODevice.OpenModeFlag.Truncate
+        ):
+            os.remove(temp_path)
+            self.__errors.append(
+                NGWAttachmentDownloadError(
+                    feature_id,
+                    attachment_id,
+                    RuntimeError("Failed to open file for downloading"),
+                )
+            )
+            return
+
+        progress_callback = None
+        if self.__progress_callback is not None:
+            progress_callback = partial(
+                self.__progress_callback,
+                attachment.get("name") or str(attachment_id),
+            )
+
+        future = connection.request_async(
+            "GET",
+            DOWNLOAD_URL(
+                self.__ngw_vector_layer.resource_id, feature_id, attachment_id
+            ),
+            callback=partial(
+                self.__on_downloaded, feature_id, attachment, file
+            ),
+            output=file,
+            progress_callback=progress_callback,
+        )
+        if not future.done():
+            self.__downloads_in_flight.append(future)
+
+    def __on_downloaded(
+        self,
+        feature_id: int,
+        attachment: Dict[str, Any],
+        file: QFile,
+        future: NgwReplyFuture,
+    ) -> None:
+        file.close()
+        temp_path = file.fileName()
+
+        error = future.exception()
+        size = attachment.get("size")
+        if error is None and size is not None:
+            downloaded_size = os.path.getsize(temp_path)
+            if downloaded_size != size:
+                error = RuntimeError(
+                    f"Downloaded {downloaded_size} bytes of {size}"
+                )
+
+        if error is not None:
+            logger.error(f"Failed to download attachment {attachment['id']}")
+            os.remove(temp_path)
+            self.__errors.append(
+                NGWAttachmentDownloadError(feature_id, attachment["id"], error)
+            )
+            return
+
+        content_hash = file_full_hash(temp_path)
+        path = self.__content_path(content_hash)
+        path.parent.mkdir(exist_ok=True)
+        if path.is_file():
+            os.remove(temp_path)  # Same content is already stored
+        else:
+            os.replace(temp_path, path)
+
+        self.__index[self.__index_key(attachment)] = dict(
+            hash=content_hash, size=os.path.getsize(path)
+        )
+        self.__add_attachment(feature_id, attachment, path, False)
+
+    def __cached_path(self, attachment: Dict[str, Any]) -> Optional[Path]:
+        entry = self.__index.get(self.__index_key(attachment))
+        if not isinstance(entry, dict):
+            return None
+
+        content_hash = entry.get("hash")
+        size = attachment.get("size", entry.get("size"))
+        if not isinstance(content_hash, str) or size != entry.get("size"):
+            return None
+
+        path = self.__content_path(content_hash)
+        if (
+            not path.is_file()
+            or path.stat().st_size != size
+            or file_full_hash(str(path)) != content_hash
+        ):
+            return None
+
+        return path
+
+    def __add_attachment(
+        self,
+        feature_id: int,
+        attachment: Dict[str, Any],
+        path: Path,
+        is_cached: bool,
+    ) -> None:
+        self.__attachments.append(
+            NGWDownloadedAttachment(
+                feature_id,
+                attachment["id"],
+                attachment.get("name"),
+                attachment.get("mime_type"),
+                str(path),
+                is_cached,
+            )
+        )
+
+    def __content_path(self, content_hash: str) -> Path:
+        return self.__cache_dir / content_hash[:2] / content_hash
+
+    def __index_key(self, attachment: Dict[str, Any]) -> str:
+        connection = self.__ngw_vector_layer.res_factory.connection
+        return ":".join(
+            (
+                connection.connection_id,
+                str(self.__ngw_vector_layer.resource_id),
+                str(attachment["id"]),
+            )
+        )
+
+    def __read_index(self) -> Dict[str, Any]:
+        index_path = self.__cache_dir / ATTACHMENTS_CACHE_INDEX
+        if not index_path.exists():
+            return {}
+
+        try:
+            index = json.loads(index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            logger.warning("Attachments cache index is corrupted")
+            return {}
+
+        return index if isinstance(index, dict) else {}
+
+    def __save_index(self) -> None:
+        # The index is written once because it may hold many entries.
+        # Entries added by other downloaders in the meantime are kept.
+        index_path = self.__cache_dir / ATTACHMENTS_CACHE_INDEX
+        with _index_lock:
+            index = self.__read_index()
+            index.update(self.__index)
+            tmp_path = index_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(index), encoding="utf-8")
+            tmp_path.replace(index_path)
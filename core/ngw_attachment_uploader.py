@@ -0,0 +1,319 @@
+"""
+/***************************************************************************
+    NextGIS WEB API
+                              -------------------
+        begin                : 2014-11-19
+        git sha              : $Format:%H$
+        copyright            : (C) 2014 by NextGIS
+        email                : info@nextgis.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+from collections import deque
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+)
+
+from nextgis_connect.logging import logger
+from nextgis_connect.ngw_api.qgis.qgis_ngw_connection import NgwReplyFuture
+
+from .ngw_feature import FEATURE_ATTACHMENTS_URL
+
+if TYPE_CHECKING:
+    from .ngw_vector_layer import NGWVectorLayer
+
+ATTACHMENTS_MAX_UPLOADS_IN_FLIGHT = 4
+ATTACHMENTS_LINK_BATCH_SIZE = 100
+
+
+@dataclass
+class NGWAttachmentError:
+    """Attachment which has not been uploaded or linked"""
+
+    feature_id: int
+    path: str
+    error: Exception
+
+
+@dataclass
+class _FeatureAttachments:
+    feature_id: int
+    paths: List[str]
+    attachments: List[Optional[Dict[str, Any]]] = field(default_factory=list)
+    remaining: int = 0
+
+
+class NGWAttachmentUploader:
+    """
+    Bulk uploader of files attached to features of a vector layer.
+
+    Files are uploaded concurrently. When all files of a feature are
+    uploaded, the feature is queued for linking, and queued features are
+    linked with one PATCH request of the features collection. The request
+    replaces attachments of the features, so the uploader is intended for
+    features without attachments. If the server rejects a batch, its
+    attachments and all the following ones are linked one by one.
+
+    Failed files do not stop the upload of others. Failures are collected
+    in :attr:`errors`.
+    """
+
+    __ngw_vector_layer: "NGWVectorLayer"
+    __max_uploads_in_flight: int
+    __link_batch_size: int
+    __progress_callback: Optional[Callable[[str, int, int], None]]
+
+    __uploads_in_flight: Deque[NgwReplyFuture]
+    __pending_futures: List[NgwReplyFuture]
+    __features_to_link: List[_FeatureAttachments]
+    __is_batch_linking_supported: bool
+    __linked_count: int
+    __errors: List[NGWAttachmentError]
+
+    def __init__(
+        self,
+        ngw_vector_layer: "NGWVectorLayer",
+        *,
+        max_uploads_in_flight: int = ATTACHMENTS_MAX_UPLOADS_IN_FLIGHT,
+        link_batch_size: int = ATTACHMENTS_LINK_BATCH_SIZE,
+        progress_callback: Optional[Callable[[str, int, int], None]] = None,
+    ) -> None:
+        if max_uploads_in_flight < 1 or link_batch_size < 1:
+            raise ValueError("Uploads and batch limits must be positive")
+
+        self.__ngw_vector_layer = ngw_vector_layer
+        self.__max_uploads_in_flight = max_uploads_in_flight
+        self.__link_batch_size = link_batch_size
+        self.__progress_callback = progress_callback
+
+        self.__uploads_in_flight = deque()
+        self.__pending_futures = []
+        self.__features_to_link = []
+        self.__is_batch_linking_supported = True
+        self.__linked_count = 0
+        self.__errors = []
+
+    @property
+    def linked_count(self) -> int:
+        return self.__linked_count
+
+    @property
+    def errors(self) -> List[NGWAttachmentError]:
+        return list(self.__errors)
+
+    def add(self, feature_id: int, paths: Iterable[str]) -> None:
+        """
+        Upload files and attach them to the feature.
+
+        Waits while the limit of uploads in flight is reached.
+
+        :param feature_id: Id of the feature in the layer.
+        :type feature_id: int
+        :param paths: Paths of files. File names are used as attachment
+            names.
+        :type paths: Iterable[str]
+        """
+        feature = _FeatureAttachments(feature_id, list(paths))
+        if len(feature.paths) == 0:
+            return
+
+        feature.attachments = [None] * len(feature.paths)
+        feature.remaining = len(feature.paths)
+
+        connection = self.__ngw_vector_layer.res_factory.connection
+        for index, path in enumerate(feature.paths):
+            while (
+                len(self.__uploads_in_flight) >= self.__max_uploads_in_flight
+            ):
+                self.__uploads_in_flight[0].exception()  # Wait for upload
+                while (
+                    len(self.__uploads_in_flight) > 0
+                    and self.__uploads_in_flight[0].done()
+                ):
+                    self.__uploads_in_flight.popleft()
+
+            logger.debug(f"Load file: {path}")
+            progress_callback = None
+            if self.__progress_callback is not None:
+                progress_callback = self.__upload_progress_callback(path)
+
+            try:
+                future = connection.upload_file_async(
+                    path,
+                    callback=partial(self.__on_uploaded, feature, index),
+                    progress_callback=progress_callback,
+                )
+            except Exception as error:
+                self.__on_upload_failed(feature, index, error)
+                continue
+
+            if not future.done():
+                self.__uploads_in_flight.append(future)
+                self.__pending_futures.append(future)
+
+    def close(self) -> None:
+        """Link the rest of attachments and wait for all requests"""
+        connection = self.__ngw_vector_layer.res_factory.connection
+        while True:
+            # Finished requests may start new ones
+            pending = [
+                future
+                for future in self.__pending_futures
+                if not future.done()
+            ]
+            if len(pending) == 0 and len(self.__features_to_link) > 0:
+                self.__link_features()
+                continue
+            if len(pending) == 0:
+                break
+            connection.wait(pending)
+
+        self.__uploads_in_flight.clear()
+        self.__pending_futures.clear()
+
+    def __upload_progress_callback(
+        self, path: str
+    ) -> Callable[[int, int], None]:
+        def progress(total: int, uploaded: int) -> None:
+            assert self.__progress_callback is not None
+            self.__progress_callback(path, total, uploaded)
+
+        return progress
+
+    def __on_uploaded(
+        self,
+        feature: _FeatureAttachments,
+        index: int,
+        future: NgwReplyFuture,
+    ) -> None:
+        error = future.exception()
+        if error is not None:
+            self.__on_upload_failed(feature, index, error)
+            return
+
+        logger.debug(f"Uploaded file info: {future.result()}")
+        feature.attachments[index] = dict(
+            name=Path(feature.paths[index]).name,
+            file_upload=future.result(),
+        )
+        self.__on_attachment_done(feature)
+
+    def __on_upload_failed(
+        self, feature: _FeatureAttachments, index: int, error: Exception
+    ) -> None:
+        logger.error(f"Failed to upload {feature.paths[index]}")
+        self.__errors.append(
+            NGWAttachmentError(feature.feature_id, feature.paths[index], error)
+        )
+        self.__on_attachment_done(feature)
+
+    def __on_attachment_done(self, feature: _FeatureAttachments) -> None:
+        feature.remaining -= 1
+        if feature.remaining > 0:
+            return
+
+        if any(attachment is not None for attachment in feature.attachments):
+            self.__features_to_link.append(feature)
+        if len(self.__features_to_link) >= self.__link_batch_size:
+            self.__link_features()
+
+    def __link_features(self) -> None:
+        features = self.__features_to_link
+        self.__features_to_link = []
+
+        if not self.__is_batch_linking_supported:
+            self.__link_one_by_one(features)
+            return
+
+        body = [
+            dict(
+                id=feature.feature_id,
+                extensions=dict(
+                    attachment=[
+                        attachment
+                        for attachment in feature.attachments
+                        if attachment is not None
+                    ]
+                ),
+            )
+            for feature in features
+        ]
+        connection = self.__ngw_vector_layer.res_factory.connection
+        future = connection.request_async(
+            "PATCH",
+            self.__ngw_vector_layer.get_feature_adding_url(),
+            params=body,
+            callback=partial(self.__on_features_linked, features),
+        )
+        self.__pending_futures.append(future)
+
+    def __on_features_linked(
+        self, features: List[_FeatureAttachments], future: NgwReplyFuture
+    ) -> None:
+        if future.exception() is None:
+            for feature in features:
+                self.__linked_count += sum(
+                    attachment is not None
+                    for attachment in feature.attachments
+                )
+            return
+
+        logger.warning(
+            "Attachments can't be linked in batches, linking one by one"
+        )
+        self.__is_batch_linking_supported = False
+        self.__link_one_by_one(features)
+
+    def __link_one_by_one(self, features: List[_FeatureAttachments]) -> None:
+        connection = self.__ngw_vector_layer.res_factory.connection
+        for feature in features:
+            url = FEATURE_ATTACHMENTS_URL(
+                self.__ngw_vector_layer.resource_id, feature.feature_id
+            )
+            for index, attachment in enumerate(feature.attachments):
+                if attachment is None:
+                    continue
+                future = connection.request_async(
+                    "POST",
+                    url,
+                    callback=partial(
+                        self.__on_attachment_linked, feature, index
+                    ),
+                    json=attachment,
+                )
+                self.__pending_futures.append(future)
+
+    def __on_attachment_linked(
+        self,
+        feature: _FeatureAttachments,
+        index: int,
+        future: NgwReplyFuture,
+    ) -> None:
+        error = future.exception()
+        if error is None:
+            self.__linked_count += 1
+            return
+
+        logger.error(f"Failed to link {feature.paths[index]}")
+        self.__errors.append(
+            NGWAttachmentError(feature.feature_id, feature.paths[index], error)
+        )
@@ -95,6 +95,7 @@ class NGWBaseMap(NGWResource):
             ngw_group_resource.res_factory,
             NGWResource.receive_resource_obj(connection, result["id"]),
         )
+        ngw_group_resource.res_factory.on_resource_created(ngw_resource)
 
         return ngw_resource
 
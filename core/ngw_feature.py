@@ -18,6 +18,56 @@
  ***************************************************************************/
 """
 
+import base64
+import binascii
+import re
+from typing import Optional
+
+from osgeo import ogr
+
+GEOM_FORMAT_WKT = "wkt"
+GEOM_FORMAT_WKB = "wkb"
+
+_HEX_WKB_PATTERN = re.compile(r"0[01][0-9A-Fa-f]*")
+
+
+def wkt_to_wkb(wkt: Optional[str]) -> Optional[bytes]:
+    if wkt is None:
+        return None
+    geometry = ogr.CreateGeometryFromWkt(wkt)
+    if geometry is None:
+        raise ValueError(f"Invalid geometry: {wkt}")
+    return bytes(geometry.ExportToIsoWkb())
+
+
+def wkb_to_wkt(wkb: Optional[bytes]) -> Optional[str]:
+    if wkb is None:
+        return None
+    geometry = ogr.CreateGeometryFromWkb(wkb)
+    if geometry is None:
+        raise ValueError("Invalid WKB geometry")
+    return geometry.ExportToIsoWkt()
+
+
+def decode_wkb(value: Optional[str]) -> Optional[bytes]:
+    """Decode WKB geometry received as hex or base64 string"""
+    if value is None:
+        return None
+    try:
+        # Byte order mark of WKB is 00 or 01. Base64 string can't start
+        # with this characters because of valid byte order values
+        if _HEX_WKB_PATTERN.fullmatch(value):
+            return bytes.fromhex(value)
+        return base64.b64decode(value, validate=True)
+    except (ValueError, binascii.Error) as error:
+        raise ValueError("Invalid WKB geometry") from error
+
+
+def encode_wkb(wkb: Optional[bytes]) -> Optional[str]:
+    if wkb is None:
+        return None
+    return base64.b64encode(wkb).decode()
+
 
 def FEATURE_URL(res_id, feature_id):
     return "/api/resource/%d/feature/%d" % (res_id, feature_id)
@@ -29,13 +79,61 @@ def FEATURE_ATTACHMENTS_URL(res_id, feature_id):
 
 # Need refactoring!
 class NGWFeature:
-    def __init__(self, ngw_feature_dict, ngw_vector_layer):
+    """
+    Vector layer feature.
+
+    Geometry is kept in the form in which it was received, WKT or WKB, and
+    is converted to the other form only on access.
+    """
+
+    __slots__ = (
+        "__geom_wkb",
+        "__geom_wkt",
+        "fields",
+        "id",
+        "ngw_vector_layer",
+    )
+
+    def __init__(
+        self,
+        ngw_feature_dict,
+        ngw_vector_layer,
+        *,
+        geom_format: str = GEOM_FORMAT_WKT,
+    ):
         self.id = ngw_feature_dict.get("id")
-        self.geom_wkt = ngw_feature_dict.get("geom")
+        self.__geom_wkt = None
+        self.__geom_wkb = None
+        if geom_format == GEOM_FORMAT_WKB:
+            self.__geom_wkb = decode_wkb(ngw_feature_dict.get("geom"))
+        else:
+            self.__geom_wkt = ngw_feature_dict.get("geom")
         self.ngw_vector_layer = ngw_vector_layer
 
         self.fields = ngw_feature_dict.get("fields", {})
 
+    @property
+    def geom_wkt(self) -> Optional[str]:
+        if self.__geom_wkt is None and self.__geom_wkb is not None:
+            self.__geom_wkt = wkb_to_wkt(self.__geom_wkb)
+        return self.__geom_wkt
+
+    @geom_wkt.setter
+    def geom_wkt(self, wkt: Optional[str]) -> None:
+        self.__geom_wkt = wkt
+        self.__geom_wkb = None
+
+    @property
+    def geom_wkb(self) -> Optional[bytes]:
+        if self.__geom_wkb is None and self.__geom_wkt is not None:
+            self.__geom_wkb = wkt_to_wkb(self.__geom_wkt)
+        return self.__geom_wkb
+
+    @geom_wkb.setter
+    def geom_wkb(self, wkb: Optional[bytes]) -> None:
+        self.__geom_wkb = wkb
+        self.__geom_wkt = None
+
     def get_feature_url(self):
         return FEATURE_URL(self.ngw_vector_layer.resource_id, self.id)
 
@@ -56,14 +154,17 @@ class NGWFeature:
         )
         return res["id"]
 
-    def asDict(self):
+    def asDict(self, geom_format: str = GEOM_FORMAT_WKT):
         feature_dict = {}
 
         if self.id is not None:
             feature_dict["id"] = self.id
 
         feature_dict["fields"] = self.fields
-        feature_dict["geom"] = self.geom_wkt
+        if geom_format == GEOM_FORMAT_WKB:
+            feature_dict["geom"] = encode_wkb(self.geom_wkb)
+        else:
+            feature_dict["geom"] = self.geom_wkt
 
         return feature_dict
 
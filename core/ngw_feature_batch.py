@@ -0,0 +1,276 @@
+"""
+/***************************************************************************
+    NextGIS WEB API
+                              -------------------
+        begin                : 2014-11-19
+        git sha              : $Format:%H$
+        copyright            : (C) 2014 by NextGIS
+        email                : info@nextgis.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+from array import array
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Union,
+)
+
+from .ngw_feature import (
+    GEOM_FORMAT_WKB,
+    GEOM_FORMAT_WKT,
+    NGWFeature,
+    decode_wkb,
+    encode_wkb,
+    wkb_to_wkt,
+    wkt_to_wkb,
+)
+
+if TYPE_CHECKING:
+    from .ngw_vector_layer import NGWVectorLayer
+
+# Id of features which are not created on the server yet
+NO_FEATURE_ID = -1
+
+# Array type codes for field types with fixed size values
+ARRAY_TYPECODES = {
+    "INTEGER": "q",
+    "BIGINT": "q",
+    "REAL": "d",
+}
+
+
+class NGWFeatureBatch:
+    """
+    Columnar container of vector layer features.
+
+    Feature ids are kept in an array, values of numeric fields are kept in
+    typed arrays with null masks, other values are kept in lists. Geometries
+    are stored as WKB in one contiguous buffer with offsets, an empty slice
+    means null geometry. NGWFeature objects are created only on access.
+
+    Fields and geometry which a feature was appended without are marked as
+    absent and are not written by :meth:`as_json`, so a patch with a batch
+    read partially does not change the rest of feature data.
+    """
+
+    __ngw_vector_layer: "NGWVectorLayer"
+    __ids: array
+    __columns: Dict[str, Union[array, List[Any]]]
+    __nulls: Dict[str, bytearray]
+    __absent: Dict[str, bytearray]
+    __geometries: bytearray
+    __geometry_offsets: array
+    __has_geometry: bytearray
+
+    def __init__(self, ngw_vector_layer: "NGWVectorLayer") -> None:
+        self.__ngw_vector_layer = ngw_vector_layer
+        self.__ids = array("q")
+        self.__columns = {}
+        self.__nulls = {}
+        self.__absent = {}
+        self.__geometries = bytearray()
+        self.__geometry_offsets = array("Q", [0])
+        self.__has_geometry = bytearray()
+
+        for field in ngw_vector_layer.fields:
+            self.__add_column(field.keyname, field.datatype.name)
+
+    @classmethod
+    def from_json(
+        cls,
+        features_json: Iterable[Dict[str, Any]],
+        ngw_vector_layer: "NGWVectorLayer",
+        *,
+        geom_format: str = GEOM_FORMAT_WKT,
+    ) -> "NGWFeatureBatch":
+        batch = cls(ngw_vector_layer)
+        for feature_json in features_json:
+            batch.append_json(feature_json, geom_format=geom_format)
+        return batch
+
+    @classmethod
+    def from_features(
+        cls,
+        features: Iterable[NGWFeature],
+        ngw_vector_layer: "NGWVectorLayer",
+    ) -> "NGWFeatureBatch":
+        batch = cls(ngw_vector_layer)
+        for feature in features:
+            batch.append(feature.id, feature.fields, feature.geom_wkb)
+        return batch
+
+    @property
+    def ngw_vector_layer(self) -> "NGWVectorLayer":
+        return self.__ngw_vector_layer
+
+    @property
+    def ids(self) -> array:
+        return self.__ids
+
+    @property
+    def field_names(self) -> List[str]:
+        return list(self.__columns.keys())
+
+    def __len__(self) -> int:
+        return len(self.__ids)
+
+    def __getitem__(self, index: int) -> NGWFeature:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Feature index out of range")
+
+        feature_id = self.__ids[index]
+        feature = NGWFeature(
+            {
+                "id": feature_id if feature_id != NO_FEATURE_ID else None,
+                "fields": self.fields(index),
+            },
+            self.__ngw_vector_layer,
+        )
+        feature.geom_wkb = self.geometry_wkb(index)
+        return feature
+
+    def __iter__(self) -> Iterator[NGWFeature]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def append(
+        self,
+        feature_id: Optional[int],
+        fields: Dict[str, Any],
+        geom_wkb: Optional[bytes],
+        *,
+        has_geometry: bool = True,
+    ) -> None:
+        """
+        Append feature.
+
+        :param feature_id: Feature id or None for new features.
+        :param fields: Values of fields the feature has. Other fields of the
+            layer are marked as absent.
+        :param geom_wkb: Geometry as WKB or None for null geometry.
+        :param has_geometry: False if the feature has no geometry at all,
+            not even a null one.
+        """
+        size = len(self)
+        for keyname in fields:
+            if keyname not in self.__columns:
+                # Field is missing in the layer schema
+                self.__add_column(keyname, None)
+                self.__columns[keyname].extend([None] * size)
+                self.__absent[keyname].extend(b"\x01" * size)
+
+        for keyname, column in self.__columns.items():
+            is_absent = keyname not in fields
+            self.__absent[keyname].append(is_absent)
+            value = fields.get(keyname)
+            nulls = self.__nulls.get(keyname)
+            if nulls is None:
+                column.append(value)
+                continue
+
+            nulls.append(value is None)
+            if value is None:
+                column.append(0)
+            elif isinstance(value, str):
+                # NGW returns BIGINT values as strings
+                column.append(
+                    int(value) if column.typecode == "q" else float(value)
+                )
+            else:
+                column.append(value)
+
+        self.__ids.append(
+            feature_id if feature_id is not None else NO_FEATURE_ID
+        )
+        if geom_wkb is not None:
+            self.__geometries.extend(geom_wkb)
+        self.__geometry_offsets.append(len(self.__geometries))
+        self.__has_geometry.append(has_geometry)
+
+    def append_json(
+        self,
+        feature_json: Dict[str, Any],
+        *,
+        geom_format: str = GEOM_FORMAT_WKT,
+    ) -> None:
+        geom = feature_json.get("geom")
+        self.append(
+            feature_json.get("id"),
+            feature_json.get("fields", {}),
+            decode_wkb(geom)
+            if geom_format == GEOM_FORMAT_WKB
+            else wkt_to_wkb(geom),
+            has_geometry="geom" in feature_json,
+        )
+
+    def field_value(self, index: int, keyname: str) -> Any:
+        nulls = self.__nulls.get(keyname)
+        if nulls is not None and nulls[index]:
+            return None
+        return self.__columns[keyname][index]
+
+    def fields(self, index: int) -> Dict[str, Any]:
+        """Return values of fields the feature has been appended with"""
+        return {
+            keyname: self.field_value(index, keyname)
+            for keyname in self.__columns
+            if not self.__absent[keyname][index]
+        }
+
+    def has_geometry(self, index: int) -> bool:
+        return bool(self.__has_geometry[index])
+
+    def geometry_wkb(self, index: int) -> Optional[bytes]:
+        start = self.__geometry_offsets[index]
+        end = self.__geometry_offsets[index + 1]
+        if start == end:
+            return None
+        return bytes(memoryview(self.__geometries)[start:end])
+
+    def as_json(
+        self, geom_format: str = GEOM_FORMAT_WKT
+    ) -> List[Dict[str, Any]]:
+        """Return features in the form accepted by the features API"""
+        features_json = []
+        for index in range(len(self)):
+            feature_json: Dict[str, Any] = {}
+            feature_id = self.__ids[index]
+            if feature_id != NO_FEATURE_ID:
+                feature_json["id"] = feature_id
+            feature_json["fields"] = self.fields(index)
+            if self.__has_geometry[index]:
+                geom_wkb = self.geometry_wkb(index)
+                feature_json["geom"] = (
+                    encode_wkb(geom_wkb)
+                    if geom_format == GEOM_FORMAT_WKB
+                    else wkb_to_wkt(geom_wkb)
+                )
+            features_json.append(feature_json)
+        return features_json
+
+    def __add_column(self, keyname: str, datatype: Optional[str]) -> None:
+        self.__absent[keyname] = bytearray()
+        typecode = ARRAY_TYPECODES.get(datatype) if datatype else None
+        if typecode is None:
+            self.__columns[keyname] = []
+            return
+
+        self.__columns[keyname] = array(typecode)
+        self.__nulls[keyname] = bytearray()
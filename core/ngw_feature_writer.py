@@ -0,0 +1,247 @@
+"""
+/***************************************************************************
+    NextGIS WEB API
+                              -------------------
+        begin                : 2014-11-19
+        git sha              : $Format:%H$
+        copyright            : (C) 2014 by NextGIS
+        email                : info@nextgis.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import json
+from collections import deque
+from dataclasses import dataclass, field
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Union,
+)
+
+from nextgis_connect.logging import logger
+from nextgis_connect.ngw_api.qgis.qgis_ngw_connection import NgwReplyFuture
+
+from .ngw_feature import GEOM_FORMAT_WKT, NGWFeature
+
+if TYPE_CHECKING:
+    from .ngw_vector_layer import NGWVectorLayer
+
+# Maximum size of encoded features in one request
+WRITER_MAX_BATCH_BYTES = 4 * 1024 * 1024
+WRITER_MAX_BATCH_FEATURES = 1000
+WRITER_MAX_REQUESTS_IN_FLIGHT = 4
+
+
+@dataclass
+class NGWFeaturesBatchError:
+    """Failed request of the writer"""
+
+    batch_index: int
+    source_ids: List[Optional[int]]
+    error: Exception
+
+
+@dataclass
+class _PendingBatch:
+    index: int
+    source_ids: List[Optional[int]]
+    future: Optional[NgwReplyFuture] = None
+    encoded_features: List[str] = field(default_factory=list)
+    size: int = 0
+
+
+class NGWFeatureWriter:
+    """
+    Bulk writer of features into a vector layer.
+
+    Features are encoded as they are written and grouped into batches
+    bounded by encoded size and features count. Several batches are sent
+    concurrently. Features of concurrent batches may be created on the
+    server in any order.
+
+    Progress is reported with count of features in batches accepted by the
+    server. After a failed batch no new batches are sent, and the next
+    :meth:`write` or :meth:`close` call waits for requests in flight and
+    raises error of the first failed batch. All failures are available in
+    :attr:`errors` in order of batches.
+    """
+
+    __ngw_vector_layer: "NGWVectorLayer"
+    __geom_format: str
+    __max_batch_bytes: int
+    __max_batch_features: int
+    __max_requests_in_flight: int
+    __progress_callback: Optional[Callable[[int], None]]
+
+    __batch: _PendingBatch
+    __batches_in_flight: Deque[_PendingBatch]
+    __batches_count: int
+    __committed_count: int
+    __errors: List[NGWFeaturesBatchError]
+
+    def __init__(
+        self,
+        ngw_vector_layer: "NGWVectorLayer",
+        *,
+        geom_format: Optional[str] = None,
+        max_batch_bytes: int = WRITER_MAX_BATCH_BYTES,
+        max_batch_features: int = WRITER_MAX_BATCH_FEATURES,
+        max_requests_in_flight: int = WRITER_MAX_REQUESTS_IN_FLIGHT,
+        progress_callback: Optional[Callable[[int], None]] = None,
+    ) -> None:
+        if max_batch_features < 1 or max_requests_in_flight < 1:
+            raise ValueError("Batch and requests limits must be positive")
+
+        self.__ngw_vector_layer = ngw_vector_layer
+        self.__geom_format = (
+            geom_format
+            if geom_format is not None
+            else ngw_vector_layer.default_geom_format()
+        )
+        self.__max_batch_bytes = max_batch_bytes
+        self.__max_batch_features = max_batch_features
+        self.__max_requests_in_flight = max_requests_in_flight
+        self.__progress_callback = progress_callback
+
+        self.__batch = _PendingBatch(0, [])
+        self.__batches_in_flight = deque()
+        self.__batches_count = 1
+        self.__committed_count = 0
+        self.__errors = []
+
+    @property
+    def geom_format(self) -> str:
+        return self.__geom_format
+
+    @property
+    def committed_count(self) -> int:
+        return self.__committed_count
+
+    @property
+    def errors(self) -> List[NGWFeaturesBatchError]:
+        return sorted(self.__errors, key=lambda error: error.batch_index)
+
+    def write(
+        self,
+        ngw_feature: Union[NGWFeature, Dict[str, Any]],
+        source_id: Optional[int] = None,
+    ) -> None:
+        """
+        Add feature to the current batch and send it if the batch is full.
+
+        :param ngw_feature: Feature to write. A dict is treated as a feature
+            already encoded into features API form with geometry in
+            :attr:`geom_format`, and is only serialized.
+        :type ngw_feature: Union[NGWFeature, Dict[str, Any]]
+        :param source_id: Id of the source feature used in error reports.
+        :type source_id: Optional[int]
+
+        :raises Exception: Error of the first failed batch.
+        """
+        if len(self.__errors) > 0:
+            self.close()
+
+        feature_dict = (
+            ngw_feature
+            if isinstance(ngw_feature, dict)
+            else ngw_feature.asDict(self.__geom_format)
+        )
+        encoded_feature = json.dumps(feature_dict)
+
+        batch = self.__batch
+        if len(batch.encoded_features) > 0 and (
+            batch.size + len(encoded_feature) > self.__max_batch_bytes
+        ):
+            self.__send_batch()
+            batch = self.__batch
+
+        batch.encoded_features.append(encoded_feature)
+        batch.source_ids.append(source_id)
+        batch.size += len(encoded_feature) + 1
+
+        if len(batch.encoded_features) >= self.__max_batch_features:
+            self.__send_batch()
+
+    def close(self) -> None:
+        """
+        Send the rest of features and wait for all requests.
+
+        :raises Exception: Error of the first failed batch.
+        """
+        if len(self.__errors) == 0 and len(self.__batch.encoded_features) > 0:
+            self.__send_batch()
+
+        while len(self.__batches_in_flight) > 0:
+            self.__wait_for_oldest_batch()
+
+        errors = self.errors
+        if len(errors) == 0:
+            return
+
+        first_error = errors[0].error
+        if hasattr(first_error, "add_note"):
+            for error in errors:
+                ids = ", ".join(map(str, error.source_ids))
+                first_error.add_note(
+                    f"Batch {error.batch_index} failed, features: {ids}"
+                )
+        raise first_error
+
+    def __send_batch(self) -> None:
+        batch = self.__batch
+        self.__batch = _PendingBatch(self.__batches_count, [])
+        self.__batches_count += 1
+
+        while len(self.__batches_in_flight) >= self.__max_requests_in_flight:
+            self.__wait_for_oldest_batch()
+        if len(self.__errors) > 0:
+            return  # Don't send anything after a failure
+
+        url = self.__ngw_vector_layer.get_feature_adding_url()
+        if self.__geom_format != GEOM_FORMAT_WKT:
+            url = f"{url}?geom_format={self.__geom_format}"
+
+        connection = self.__ngw_vector_layer.res_factory.connection
+        body = "[" + ",".join(batch.encoded_features) + "]"
+        batch.encoded_features = []
+        batch.future = connection.request_async(
+            "PATCH",
+            url,
+            params=body,
+            callback=lambda future: self.__on_batch_finished(batch, future),
+        )
+        self.__batches_in_flight.append(batch)
+
+    def __wait_for_oldest_batch(self) -> None:
+        batch = self.__batches_in_flight.popleft()
+        assert batch.future is not None
+        batch.future.exception()  # Wait for the request
+
+    def __on_batch_finished(
+        self, batch: _PendingBatch, future: NgwReplyFuture
+    ) -> None:
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Features batch {batch.index} failed")
+            self.__errors.append(
+                NGWFeaturesBatchError(batch.index, batch.source_ids, error)
+            )
+            return
+
+        self.__committed_count += len(batch.source_ids)
+        if self.__progress_callback is not None:
+            self.__progress_callback(self.__committed_count)
@@ -35,8 +35,8 @@ from .ngw_resource import NGWResource
 
 
 class NGWQGISStyle(NGWResource):
-    def __init__(self, resource_factory, resource_json):
-        super().__init__(resource_factory, resource_json)
+    def _construct(self):
+        super()._construct()
         self.__qml = None
 
     @property
@@ -98,6 +98,7 @@ class NGWQGISStyle(NGWResource):
         connection.put(url, params=params)
         self.__qml = Path(qml).read_text()
         self.update()
+        self.res_factory.on_resource_changed(self)
 
 
 class NGWQGISVectorStyle(NGWQGISStyle):
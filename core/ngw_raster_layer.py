@@ -34,9 +34,9 @@ class NGWRasterLayer(NGWResource):
     type_id = "raster_layer"
     type_title = "NGW Raster Layer"
 
-    def __init__(self, resource_factory, resource_json):
-        super().__init__(resource_factory, resource_json)
-        self.is_cog = resource_json["raster_layer"].get("cog", False)
+    def _construct(self):
+        super()._construct()
+        self.is_cog = self._json["raster_layer"].get("cog", False)
 
     @property
     def layer_params(self) -> Tuple[str, str, str]:
@@ -86,10 +86,12 @@ class NGWRasterLayer(NGWResource):
 
         url = self.get_api_collection_url()
         result = connection.post(url, params=params)
-        return NGWResource(
-            self.res_factory,
-            NGWResource.receive_resource_obj(connection, result["id"]),
+        ngw_resource = self.res_factory.get_resource_by_json(
+            NGWResource.receive_resource_obj(connection, result["id"])
         )
+        self.res_factory.on_resource_created(ngw_resource)
+
+        return ngw_resource
 
     def create_qml_style(
         self, qml, callback, style_name=None
@@ -117,7 +119,10 @@ class NGWRasterLayer(NGWResource):
 
         url = self.get_api_collection_url()
         result = connection.post(url, params=params)
-        return NGWQGISRasterStyle(
+        ngw_resource = NGWQGISRasterStyle(
             self.res_factory,
             NGWResource.receive_resource_obj(connection, result["id"]),
         )
+        self.res_factory.on_resource_created(ngw_resource)
+
+        return ngw_resource
@@ -24,7 +24,10 @@ from pathlib import Path
 from typing import TYPE_CHECKING, Any, Dict, List
 
 from nextgis_connect.logging import logger
-from nextgis_connect.ngw_api.qgis.qgis_ngw_connection import QgsNgwConnection
+from nextgis_connect.ngw_api.qgis.qgis_ngw_connection import (
+    NgwReplyFuture,
+    QgsNgwConnection,
+)
 from nextgis_connect.resources.utils import generate_unique_name
 
 ICONS_DIR = Path(__file__).parents[1] / "icons"
@@ -79,6 +82,13 @@ class NGWResource:
         """
         return ngw_con.get(API_RESOURCE_URL(res_id))
 
+    @classmethod
+    def receive_resource_obj_async(cls, ngw_con, res_id) -> NgwReplyFuture:
+        """
+        :rtype : future resolved with json obj
+        """
+        return ngw_con.request_async("GET", API_RESOURCE_URL(res_id))
+
     @classmethod
     def receive_resource_children(cls, ngw_con, res_id):
         """
@@ -88,11 +98,25 @@ class NGWResource:
         logger.debug(f"↓ Fetch children for id={res_id}")
         return ngw_con.get(f"{API_COLLECTION_URL}?parent={res_id}")
 
+    @classmethod
+    def receive_resource_children_async(
+        cls, ngw_con, res_id
+    ) -> NgwReplyFuture:
+        """
+        :rtype : future resolved with json obj
+        """
+
+        logger.debug(f"↓ Fetch children for id={res_id}")
+        return ngw_con.request_async(
+            "GET", f"{API_COLLECTION_URL}?parent={res_id}"
+        )
+
     @classmethod
     def delete_resource(cls, ngw_resource):
         ngw_con = ngw_resource.res_factory.connection
         url = API_RESOURCE_URL(ngw_resource.resource_id)
         ngw_con.delete(url)
+        ngw_resource.res_factory.on_resource_deleted(ngw_resource)
 
     # INSTANCE
     def __init__(self, resource_factory, resource_json):
@@ -142,16 +166,7 @@ class NGWResource:
             return None
 
     def get_children(self) -> List["NGWResource"]:
-        if not self.common.children:
-            return []
-
-        children_json = NGWResource.receive_resource_children(
-            self.res_factory.connection, self.resource_id
-        )
-        children: List[NGWResource] = []
-        for child_json in children_json:
-            children.append(self.res_factory.get_resource_by_json(child_json))
-        return children
+        return self.res_factory.get_children_of([self])[0]
 
     def get_absolute_url(self) -> str:
         base_url = self.res_factory.connection.server_url
@@ -237,6 +252,7 @@ class NGWResource:
         url = self.get_relative_api_url()
         connection.put(url, params=params)
         self.update()
+        self.res_factory.on_resource_changed(self)
 
     def update_metadata(self, metadata):
         params = dict(
@@ -249,6 +265,7 @@ class NGWResource:
         url = self.get_relative_api_url()
         connection.put(url, params=params)
         self.update()
+        self.res_factory.on_resource_changed(self)
 
     def update(self, *, skip_children: bool = False):
         self._json = self.receive_resource_obj(
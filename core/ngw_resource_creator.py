@@ -18,7 +18,7 @@
  ***************************************************************************/
 """
 
-from typing import Any, Dict, Iterable
+from typing import Any, Dict, Iterable, Optional
 
 from nextgis_connect.settings import NgConnectSettings
 
@@ -51,6 +51,7 @@ class ResourceCreator:
             NGWResource.receive_resource_obj(connection, result["id"]),
         )
         parent_ngw_resource.common.children = True
+        parent_ngw_resource.res_factory.on_resource_created(ngw_resource)
 
         return ngw_resource
 
@@ -64,12 +65,16 @@ class ResourceCreator:
         url = parent_ngw_resource.get_api_collection_url()
         result = connection.post(url, params=vector_layer, is_lunkwill=True)
 
-        ngw_resource = NGWResource.receive_resource_obj(
+        resource_json = NGWResource.receive_resource_obj(
             connection, result["id"]
         )
 
+        ngw_resource = NGWVectorLayer(
+            parent_ngw_resource.res_factory, resource_json
+        )
         parent_ngw_resource.common.children = True
-        return NGWVectorLayer(parent_ngw_resource.res_factory, ngw_resource)
+        parent_ngw_resource.res_factory.on_resource_created(ngw_resource)
+        return ngw_resource
 
     @staticmethod
     def create_vector_layer(
@@ -79,6 +84,9 @@ class ResourceCreator:
         old_fid_name,
         upload_callback,
         create_callback,
+        *,
+        source_layer: Optional[str] = None,
+        fid_source: str = "AUTO",
     ) -> NGWVectorLayer:
         connection = parent_ngw_resource.res_factory.connection
 
@@ -103,10 +111,12 @@ class ResourceCreator:
                 source=vector_file_desc,
                 fix_errors="LOSSY",
                 skip_errors=True,
-                fid_source="AUTO",
+                fid_source=fid_source,
                 fid_field=",".join(fid_fields),
             ),
         )
+        if source_layer is not None:
+            params["vector_layer"]["source_layer"] = source_layer
         if NgConnectSettings().upload_vector_with_versioning:
             params["feature_layer"] = dict(versioning=dict(enabled=True))
 
@@ -116,13 +126,17 @@ class ResourceCreator:
         # result = connection.post(url, params=params)
         result = connection.post(url, params=params, is_lunkwill=True)
 
-        ngw_resource = NGWResource.receive_resource_obj(
+        resource_json = NGWResource.receive_resource_obj(
             connection, result["id"]
         )
 
+        ngw_resource = NGWVectorLayer(
+            parent_ngw_resource.res_factory, resource_json
+        )
         parent_ngw_resource.common.children = True
+        parent_ngw_resource.res_factory.on_resource_created(ngw_resource)
 
-        return NGWVectorLayer(parent_ngw_resource.res_factory, ngw_resource)
+        return ngw_resource
 
     @staticmethod
     def create_raster_layer(
@@ -159,12 +173,16 @@ class ResourceCreator:
         # result = connection.post(url, params=params)
         result = connection.post(url, params=params, is_lunkwill=True)
 
-        ngw_resource = NGWResource.receive_resource_obj(
+        resource_json = NGWResource.receive_resource_obj(
             connection, result["id"]
         )
+        ngw_resource = NGWRasterLayer(
+            parent_ngw_resource.res_factory, resource_json
+        )
         parent_ngw_resource.common.children = True
+        parent_ngw_resource.res_factory.on_resource_created(ngw_resource)
 
-        return NGWRasterLayer(parent_ngw_resource.res_factory, ngw_resource)
+        return ngw_resource
 
     @staticmethod
     def create_wfs_or_ogcf_service(
@@ -208,6 +226,7 @@ class ResourceCreator:
             NGWResource.receive_resource_obj(connection, result["id"]),
         )
         ngw_group_resource.common.children = True
+        ngw_group_resource.res_factory.on_resource_created(ngw_resource)
 
         return ngw_resource
 
@@ -236,5 +255,6 @@ class ResourceCreator:
             NGWResource.receive_resource_obj(connection, result["id"]),
         )
         parent_group_resource.common.children = True
+        parent_group_resource.res_factory.on_resource_created(ngw_resource)
 
         return ngw_resource
@@ -18,8 +18,12 @@
  ***************************************************************************/
 """
 
-from typing import Dict, Type
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import ClassVar, Dict, Iterable, List, Optional, Tuple, Type
 
+from nextgis_connect.exceptions import ErrorCode, NgwError
 from nextgis_connect.logging import logger
 from nextgis_connect.ngw_api.core.ngw_tms_resources import (
     NGWTmsConnection,
@@ -40,6 +44,7 @@ from .ngw_raster_layer import NGWRasterLayer
 from .ngw_raster_mosaic import NGWRasterMosaic
 from .ngw_raster_style import NGWRasterStyle
 from .ngw_resource import NGWResource
+from .ngw_resource_store import NGWResourceStore
 from .ngw_tileset import NGWTileset
 from .ngw_vector_layer import NGWVectorLayer
 from .ngw_webmap import NGWWebMap
@@ -50,13 +55,41 @@ from .ngw_wms_service import NGWWmsService
 
 API_NGW_VERSION = "/api/component/pyramid/pkg_version"
 
+# Resources received less than RESOURCE_CACHE_TTL seconds ago are returned
+# by get_resource without requests to the server
+RESOURCE_CACHE_TTL = 60
+RESOURCE_CACHE_MAX_SIZE = 5000
+
+API_RESOURCE_SEARCH_URL = "/api/resource/search/"
+# Maximum count of ids in a single search request to keep URL short
+RESOURCE_SEARCH_BATCH_SIZE = 100
+
+
+@dataclass
+class NGWResourcesBatch:
+    """Result of fetching several resources at once"""
+
+    resources: List[NGWResource] = field(default_factory=list)
+    not_permitted: Dict[int, NgwError] = field(default_factory=dict)
+
 
 class NGWResourceFactory:
+    # Server URL -> whether search by several ids is supported
+    __id_search_support: ClassVar[Dict[str, bool]] = {}
+
     __res_types_register: Dict[str, Type[NGWResource]]
     __default_type: str
     __conn: QgsNgwConnection
+    __store: Optional[NGWResourceStore]
+    # Identity map: resource id -> (receive time, resource)
+    __resources: "OrderedDict[int, Tuple[float, NGWResource]]"
 
-    def __init__(self, ngw_connection: QgsNgwConnection):
+    def __init__(
+        self,
+        ngw_connection: QgsNgwConnection,
+        *,
+        store: Optional[NGWResourceStore] = None,
+    ):
         self.__res_types_register = {
             NGWResource.type_id: NGWResource,
             NGWWfsService.type_id: NGWWfsService,
@@ -96,25 +129,309 @@ class NGWResourceFactory:
         }
         self.__default_type = NGWResource.type_id
         self.__conn = ngw_connection
+        self.__store = store
+        self.__resources = OrderedDict()
 
     @property
     def connection(self) -> QgsNgwConnection:
         return self.__conn
 
+    @property
+    def store(self) -> Optional[NGWResourceStore]:
+        return self.__store
+
     def get_resource(self, resource_id: int) -> NGWResource:
+        cached_resource = self.__resources.get(resource_id)
+        if (
+            cached_resource is not None
+            and time.monotonic() - cached_resource[0] < RESOURCE_CACHE_TTL
+        ):
+            self.__resources.move_to_end(resource_id)
+            return cached_resource[1]
+
         logger.debug(f"↓ Fetch resource with id={resource_id}")
         res_json = NGWResource.receive_resource_obj(self.__conn, resource_id)
         return self.get_resource_by_json(res_json)
 
+    def get_resources(self, resources_id: Iterable[int]) -> NGWResourcesBatch:
+        """
+        Fetch several resources at once.
+
+        Resources are received with search requests by id if the server
+        supports them. Otherwise, and for resources missing from the search
+        answer, concurrent requests for single resources are sent. Their
+        count is bounded by the connection.
+
+        Permission errors are collected in the result, other errors are
+        raised.
+
+        :param resources_id: Ids of resources to fetch.
+        :type resources_id: Iterable[int]
+        :return: Fetched resources in order of requested ids and permission
+            errors for other ids.
+        :rtype: NGWResourcesBatch
+        """
+        resources_id = list(dict.fromkeys(resources_id))
+        received: Dict[int, NGWResource] = {}
+
+        now = time.monotonic()
+        for resource_id in resources_id:
+            cached_resource = self.__resources.get(resource_id)
+            if (
+                cached_resource is not None
+                and now - cached_resource[0] < RESOURCE_CACHE_TTL
+            ):
+                received[resource_id] = cached_resource[1]
+
+        missing_id = [
+            resource_id
+            for resource_id in resources_id
+            if resource_id not in received
+        ]
+        if len(missing_id) > 1 and self.__is_id_search_supported():
+            received.update(self.__search_resources(missing_id))
+            missing_id = [
+                resource_id
+                for resource_id in missing_id
+                if resource_id not in received
+            ]
+
+        result = NGWResourcesBatch()
+
+        futures = {}
+        for resource_id in missing_id:
+            logger.debug(f"↓ Fetch resource with id={resource_id}")
+            futures[resource_id] = NGWResource.receive_resource_obj_async(
+                self.__conn, resource_id
+            )
+        self.__conn.wait(futures.values())
+
+        for resource_id, future in futures.items():
+            error = future.exception()
+            if error is None:
+                received[resource_id] = self.get_resource_by_json(
+                    future.result()
+                )
+                continue
+
+            if not isinstance(error, NgwError) or error.code not in (
+                ErrorCode.PermissionsError,
+                ErrorCode.AuthorizationError,
+            ):
+                raise error
+
+            logger.warning(
+                "An permission error occurred during fetching resource"
+                f" (id={resource_id})"
+            )
+            result.not_permitted[resource_id] = error
+
+        result.resources = [
+            received[resource_id]
+            for resource_id in resources_id
+            if resource_id in received
+        ]
+        return result
+
+    def __is_id_search_supported(self) -> bool:
+        # Old servers ignore unknown filters, so the probe combines filters
+        # which can not be satisfied together. The answer must be empty
+        server_url = self.__conn.server_url
+        is_supported = self.__id_search_support.get(server_url)
+        if is_supported is not None:
+            return is_supported
+
+        try:
+            answer = self.__conn.get(
+                f"{API_RESOURCE_SEARCH_URL}?id=0&id__in=1"
+            )
+            is_supported = isinstance(answer, list) and len(answer) == 0
+        except NgwError:
+            is_supported = False
+
+        logger.debug(f"Search resources by id supported: {is_supported}")
+        self.__id_search_support[server_url] = is_supported
+        return is_supported
+
+    def __search_resources(
+        self, resources_id: List[int]
+    ) -> Dict[int, NGWResource]:
+        received = {}
+        requested_id = set(resources_id)
+
+        futures = []
+        for i in range(0, len(resources_id), RESOURCE_SEARCH_BATCH_SIZE):
+            batch = resources_id[i : i + RESOURCE_SEARCH_BATCH_SIZE]
+            logger.debug(f"↓ Search resources with id in {batch}")
+            futures.append(
+                self.__conn.request_async(
+                    "GET",
+                    f"{API_RESOURCE_SEARCH_URL}?id__in="
+                    + ",".join(map(str, batch)),
+                )
+            )
+        self.__conn.wait(futures)
+
+        for future in futures:
+            if future.exception() is not None:
+                continue  # Resources will be fetched one by one
+
+            answer = future.result()
+            if not isinstance(answer, list) or any(
+                res_json["resource"]["id"] not in requested_id
+                for res_json in answer
+            ):
+                # Filter is ignored by server
+                self.__id_search_support[self.__conn.server_url] = False
+                return {}
+
+            for res_json in answer:
+                resource = self.get_resource_by_json(res_json)
+                received[resource.resource_id] = resource
+
+        return received
+
     def get_resource_by_json(self, res_json) -> NGWResource:
-        resource_type: Type[NGWResource]
+        """
+        Create resource from json. If the factory already has an object for
+        this resource, it is updated and returned instead of a new one
+        """
+        if self.__store is not None:
+            self.__store.put(self.__conn.connection_id, res_json)
+
+        resource_id = res_json["resource"]["id"]
+        cached_resource = self.__resources.get(resource_id)
+        if cached_resource is not None and type(
+            cached_resource[1]
+        ) is self.__resource_type(res_json):
+            resource = cached_resource[1]
+            resource._json = res_json
+            resource._construct()
+        else:
+            resource = self.__create_resource(res_json)
+
+        self.__register(resource)
+        return resource
+
+    def on_resource_created(self, resource: NGWResource) -> None:
+        """
+        Register resource which has just been created on the server and
+        forget its parent which has got a new child
+        """
+        if self.__store is not None:
+            self.__store.put(self.__conn.connection_id, resource._json)
+        self.__register(resource)
+        if resource.common.parent:
+            self.invalidate(resource.parent_id)
+
+    def on_resource_changed(self, resource: NGWResource) -> None:
+        """Register actual state of resource which has been changed"""
+        self.on_resource_created(resource)
+
+    def on_resource_deleted(self, resource: NGWResource) -> None:
+        """Forget resource and its parent which may have lost children"""
+        if self.__store is not None:
+            self.__store.remove(
+                self.__conn.connection_id, resource.resource_id
+            )
+        self.__resources.pop(resource.resource_id, None)
+        if resource.common.parent:
+            self.invalidate(resource.parent_id)
+
+    def invalidate(self, resource_id: Optional[int] = None) -> None:
+        """
+        Force the next get_resource call to fetch the resource from the
+        server. All resources are invalidated if id is not specified.
+
+        Invalidated objects stay in the identity map, so the fetch updates
+        the objects already handed out instead of creating new ones
+        """
+        resources_id = (
+            list(self.__resources) if resource_id is None else [resource_id]
+        )
+        for invalidated_id in resources_id:
+            cached_resource = self.__resources.get(invalidated_id)
+            if cached_resource is not None:
+                self.__resources[invalidated_id] = (
+                    float("-inf"),
+                    cached_resource[1],
+                )
+
+    def __register(self, resource: NGWResource) -> None:
+        self.__resources[resource.resource_id] = (time.monotonic(), resource)
+        self.__resources.move_to_end(resource.resource_id)
+        while len(self.__resources) > RESOURCE_CACHE_MAX_SIZE:
+            self.__resources.popitem(last=False)
+
+    def get_stored_resource(self, resource_id: int) -> Optional[NGWResource]:
+        """Build resource from the store without requests to the server"""
+        if self.__store is None:
+            return None
+        res_json = self.__store.get(self.__conn.connection_id, resource_id)
+        if res_json is None:
+            return None
+        return self.__create_resource(res_json)
+
+    def get_stored_children(
+        self, resource: NGWResource
+    ) -> Optional[List[NGWResource]]:
+        """
+        Build children of the resource from the store. None is returned if
+        the children were never loaded
+        """
+        if self.__store is None:
+            return None
+        children_json = self.__store.children(
+            self.__conn.connection_id, resource.resource_id
+        )
+        if children_json is None:
+            return None
+        return [
+            self.__create_resource(child_json) for child_json in children_json
+        ]
+
+    def __create_resource(self, res_json) -> NGWResource:
+        return self.__resource_type(res_json)(self, res_json)
+
+    def __resource_type(self, res_json) -> Type[NGWResource]:
         if res_json["resource"]["cls"] in self.__res_types_register:
-            resource_type = self.__res_types_register[
-                res_json["resource"]["cls"]
+            return self.__res_types_register[res_json["resource"]["cls"]]
+        return self.__res_types_register[self.__default_type]
+
+    def get_children_of(
+        self, resources: Iterable[NGWResource]
+    ) -> List[List[NGWResource]]:
+        """Fetch children of several resources with concurrent requests"""
+        resources = list(resources)
+        futures = [
+            NGWResource.receive_resource_children_async(
+                self.__conn, resource.resource_id
+            )
+            if resource.common.children
+            else None
+            for resource in resources
+        ]
+        self.__conn.wait(future for future in futures if future is not None)
+
+        children = [
+            [
+                self.get_resource_by_json(child_json)
+                for child_json in future.result()
             ]
-        else:
-            resource_type = self.__res_types_register[self.__default_type]
-        return resource_type(self, res_json)
+            if future is not None
+            else []
+            for future in futures
+        ]
+
+        if self.__store is not None:
+            for i, resource in enumerate(resources):
+                self.__store.set_children(
+                    self.__conn.connection_id,
+                    resource.resource_id,
+                    (child.resource_id for child in children[i]),
+                )
+
+        return children
 
     def get_root_resource(self) -> NGWResource:
         return self.get_resource(0)
@@ -0,0 +1,230 @@
+"""
+/***************************************************************************
+    NextGIS WEB API
+                              -------------------
+        begin                : 2014-11-19
+        git sha              : $Format:%H$
+        copyright            : (C) 2014 by NextGIS
+        email                : info@nextgis.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from nextgis_connect.ngw_api.qgis.local_storage import local_storage_path
+
+RESOURCE_STORE_FILE_NAME = "resources.sqlite"
+# Credentials of connection resources which are not written to disk
+CONNECTION_SECRET_KEYS = frozenset(("username", "password", "apikey"))
+
+
+def strip_secrets(resource_json: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return resource JSON without credentials of connection resources.
+
+    Values of secret keys are replaced with None, so a stored connection
+    looks like a connection without authentication.
+    """
+    resource_cls = resource_json["resource"]["cls"]
+    connection = resource_json.get(resource_cls)
+    if not resource_cls.endswith("_connection") or not isinstance(
+        connection, dict
+    ):
+        return resource_json
+
+    stripped_connection = {
+        key: None if key in CONNECTION_SECRET_KEYS else value
+        for key, value in connection.items()
+    }
+    return {**resource_json, resource_cls: stripped_connection}
+
+
+class NGWResourceStore:
+    """
+    Persistent storage of resources JSON.
+
+    Resources are keyed by connection id and resource id and indexed by
+    parent, so a resources tree which was seen in a previous session can be
+    restored without requests to the server. Only children listings which
+    were received completely are marked as loaded. Credentials of connection
+    resources are not stored.
+
+    The store is safe to use from several threads and is shared instead of
+    being copied.
+    """
+
+    __path: Path
+    __db: sqlite3.Connection
+    __lock: threading.Lock
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.__path = (
+            path
+            if path is not None
+            else local_storage_path(RESOURCE_STORE_FILE_NAME)
+        )
+        self.__lock = threading.Lock()
+        self.__db = sqlite3.connect(
+            str(self.__path), check_same_thread=False, isolation_level=None
+        )
+        self.__db.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS resources (
+                connection_id TEXT NOT NULL,
+                resource_id INTEGER NOT NULL,
+                parent_id INTEGER,
+                children_loaded INTEGER NOT NULL DEFAULT 0,
+                json TEXT NOT NULL,
+                PRIMARY KEY (connection_id, resource_id)
+            );
+            CREATE INDEX IF NOT EXISTS resources_parent_idx
+                ON resources (connection_id, parent_id);
+            """
+        )
+
+    def __deepcopy__(self, memo):
+        return self
+
+    @property
+    def path(self) -> Path:
+        return self.__path
+
+    def put(self, connection_id: str, resource_json: Dict[str, Any]) -> None:
+        resource = resource_json["resource"]
+        parent = resource.get("parent")
+        with self.__lock:
+            self.__db.execute(
+                """
+                INSERT INTO resources
+                    (connection_id, resource_id, parent_id, json)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (connection_id, resource_id) DO UPDATE SET
+                    parent_id = excluded.parent_id,
+                    json = excluded.json
+                """,
+                (
+                    connection_id,
+                    resource["id"],
+                    parent["id"] if parent else None,
+                    json.dumps(strip_secrets(resource_json)),
+                ),
+            )
+
+    def get(
+        self, connection_id: str, resource_id: int
+    ) -> Optional[Dict[str, Any]]:
+        with self.__lock:
+            row = self.__db.execute(
+                """
+                SELECT json FROM resources
+                WHERE connection_id = ? AND resource_id = ?
+                """,
+                (connection_id, resource_id),
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def children(
+        self, connection_id: str, parent_id: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return stored children of the resource or None if they were never
+        loaded completely
+        """
+        with self.__lock:
+            row = self.__db.execute(
+                """
+                SELECT children_loaded FROM resources
+                WHERE connection_id = ? AND resource_id = ?
+                """,
+                (connection_id, parent_id),
+            ).fetchone()
+            if row is None or not row[0]:
+                return None
+
+            rows = self.__db.execute(
+                """
+                SELECT json FROM resources
+                WHERE connection_id = ? AND parent_id = ?
+                ORDER BY resource_id
+                """,
+                (connection_id, parent_id),
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def set_children(
+        self, connection_id: str, parent_id: int, children_id: Iterable[int]
+    ) -> None:
+        """
+        Mark children of the resource as loaded and remove stored children
+        which are not present on the server anymore
+        """
+        children_id = set(children_id)
+        with self.__lock:
+            self.__db.execute("BEGIN")
+            try:
+                rows = self.__db.execute(
+                    """
+                    SELECT resource_id FROM resources
+                    WHERE connection_id = ? AND parent_id = ?
+                    """,
+                    (connection_id, parent_id),
+                ).fetchall()
+                for (child_id,) in rows:
+                    if child_id not in children_id:
+                        self.__remove_subtree(connection_id, child_id)
+
+                self.__db.execute(
+                    """
+                    UPDATE resources SET children_loaded = 1
+                    WHERE connection_id = ? AND resource_id = ?
+                    """,
+                    (connection_id, parent_id),
+                )
+            except Exception:
+                self.__db.execute("ROLLBACK")
+                raise
+            self.__db.execute("COMMIT")
+
+    def remove(self, connection_id: str, resource_id: int) -> None:
+        """Remove the resource and all its stored descendants"""
+        with self.__lock:
+            self.__remove_subtree(connection_id, resource_id)
+
+    def clear(self, connection_id: str) -> None:
+        with self.__lock:
+            self.__db.execute(
+                "DELETE FROM resources WHERE connection_id = ?",
+                (connection_id,),
+            )
+
+    def __remove_subtree(self, connection_id: str, resource_id: int) -> None:
+        self.__db.execute(
+            """
+            WITH RECURSIVE subtree (resource_id) AS (
+                SELECT ?
+                UNION ALL
+                SELECT resources.resource_id FROM resources, subtree
+                WHERE resources.connection_id = ?
+                    AND resources.parent_id = subtree.resource_id
+            )
+            DELETE FROM resources
+            WHERE connection_id = ?
+                AND resource_id IN (SELECT resource_id FROM subtree)
+            """,
+            (resource_id, connection_id, connection_id),
+        )
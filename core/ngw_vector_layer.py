@@ -19,21 +19,72 @@
 """
 
 import datetime
-from typing import Any, Dict, List, Optional
+import urllib.parse
+from typing import (
+    Any,
+    Callable,
+    ClassVar,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 from qgis.core import QgsProviderRegistry
 
+from nextgis_connect.exceptions import NgwError
+from nextgis_connect.logging import logger
 from nextgis_connect.ngw_connection.ngw_connections_manager import (
     NgwConnectionsManager,
 )
 
 from .ngw_abstract_vector_resource import NGWAbstractVectorResource
-from .ngw_feature import NGWFeature
+from .ngw_feature import GEOM_FORMAT_WKB, GEOM_FORMAT_WKT, NGWFeature
+from .ngw_feature_batch import NGWFeatureBatch
 from .ngw_mapserver_style import NGWMapServerStyle
 from .ngw_resource import API_LAYER_EXTENT, NGWResource
 
 ADD_FEATURE_URL = "/api/resource/%s/feature/"
 DEL_ALL_FEATURES_URL = "/api/resource/%s/feature/"
+FEATURES_PAGE_SIZE = 1000
+
+FieldConverter = Callable[[Any], Any]
+
+
+def date_to_json(value: Any) -> Optional[Dict[str, int]]:
+    if not isinstance(value, datetime.date):
+        return None
+    return {"year": value.year, "month": value.month, "day": value.day}
+
+
+def time_to_json(value: Any) -> Optional[Dict[str, int]]:
+    if not isinstance(value, datetime.time):
+        return None
+    return {
+        "hour": value.hour,
+        "minute": value.minute,
+        "second": value.second,
+    }
+
+
+def datetime_to_json(value: Any) -> Optional[Dict[str, int]]:
+    if not isinstance(value, datetime.datetime):
+        return None
+    return {
+        "year": value.year,
+        "month": value.month,
+        "day": value.day,
+        "hour": value.hour,
+        "minute": value.minute,
+        "second": value.second,
+    }
+
+
+def value_to_json(value: Any) -> Any:
+    return value
 
 
 class NGWVectorLayer(NGWAbstractVectorResource):
@@ -45,6 +96,40 @@ class NGWVectorLayer(NGWAbstractVectorResource):
 
     type_id = "vector_layer"
 
+    # Server URL -> whether WKB geometry format is supported
+    __wkb_support: ClassVar[Dict[str, bool]] = {}
+
+    __field_converters: Optional[Tuple[Tuple[str, FieldConverter], ...]]
+    __field_converters_map: Dict[str, FieldConverter]
+
+    def _construct(self):
+        super()._construct()
+        self.__field_converters = None
+        self.__field_converters_map = {}
+
+    @property
+    def field_converters(self) -> Tuple[Tuple[str, FieldConverter], ...]:
+        """
+        Pairs of field keyname and function converting python value of the
+        field into features API form. Built once for the layer fields.
+        """
+        if self.__field_converters is None:
+            self.__compile_field_converters()
+        assert self.__field_converters is not None
+        return self.__field_converters
+
+    def __compile_field_converters(self) -> None:
+        converters = {
+            NGWVectorLayer.FieldTypeDate: date_to_json,
+            NGWVectorLayer.FieldTypeTime: time_to_json,
+            NGWVectorLayer.FieldTypeDatetime: datetime_to_json,
+        }
+        self.__field_converters = tuple(
+            (field.keyname, converters.get(field.datatype.name, value_to_json))
+            for field in self.fields
+        )
+        self.__field_converters_map = dict(self.__field_converters)
+
     def get_absolute_geojson_url(self):
         connections_manager = NgwConnectionsManager()
         connection = connections_manager.connection(self.connection_id)
@@ -73,72 +158,240 @@ class NGWVectorLayer(NGWAbstractVectorResource):
     def get_feature_deleting_url(self):
         return DEL_ALL_FEATURES_URL % self.resource_id
 
+    @property
+    def is_wkb_supported(self) -> bool:
+        """
+        Check if features API of the server accepts and returns geometries
+        as WKB.
+
+        Servers which don't know ``geom_format`` parameter ignore it, so
+        first the server is checked to reject an unknown format. The result
+        is cached for the server.
+        """
+        connection = self.res_factory.connection
+        server_url = connection.server_url
+        is_supported = self.__wkb_support.get(server_url)
+        if is_supported is not None:
+            return is_supported
+
+        url = self.get_feature_adding_url()
+        try:
+            connection.get(f"{url}?limit=0&geom_format=unknown")
+        except NgwError:
+            try:
+                connection.get(f"{url}?limit=0&geom_format={GEOM_FORMAT_WKB}")
+                is_supported = True
+            except NgwError:
+                is_supported = False
+        else:
+            is_supported = False
+
+        logger.debug(f"WKB geometry format supported: {is_supported}")
+        self.__wkb_support[server_url] = is_supported
+        return is_supported
+
+    def default_geom_format(self) -> str:
+        return GEOM_FORMAT_WKB if self.is_wkb_supported else GEOM_FORMAT_WKT
+
     # TODO Need refactoring
-    def patch_features(self, ngw_feature_list):
-        features_dict_list = [
-            ngw_feature.asDict() for ngw_feature in ngw_feature_list
-        ]
+    def patch_features(
+        self,
+        ngw_feature_list: Union[Iterable[NGWFeature], NGWFeatureBatch],
+        *,
+        geom_format: Optional[str] = None,
+    ):
+        if geom_format is None:
+            geom_format = self.default_geom_format()
+
+        if isinstance(ngw_feature_list, NGWFeatureBatch):
+            features_dict_list = ngw_feature_list.as_json(geom_format)
+        else:
+            features_dict_list = [
+                ngw_feature.asDict(geom_format)
+                for ngw_feature in ngw_feature_list
+            ]
 
         connection = self.res_factory.connection
 
         url = self.get_feature_adding_url()
+        if geom_format != GEOM_FORMAT_WKT:
+            url = f"{url}?geom_format={geom_format}"
         connection.patch(url, params=features_dict_list)
 
     def construct_ngw_feature_as_json(self, attributes):
-        json_feature = {}
-
-        for field_name, pyvalue in list(attributes.items()):
-            field_type = self.field(field_name).datatype.name
-            field_value = None
-            if field_type == NGWVectorLayer.FieldTypeDate:
-                if isinstance(pyvalue, datetime.date):
-                    field_value = {
-                        "year": pyvalue.year,
-                        "month": pyvalue.month,
-                        "day": pyvalue.day,
-                    }
-            elif field_type == NGWVectorLayer.FieldTypeTime:
-                if isinstance(pyvalue, datetime.time):
-                    field_value = {
-                        "hour": pyvalue.hour,
-                        "minute": pyvalue.minute,
-                        "second": pyvalue.second,
-                    }
-            elif field_type == NGWVectorLayer.FieldTypeDatetime:
-                if isinstance(pyvalue, datetime.datetime):
-                    field_value = {
-                        "year": pyvalue.year,
-                        "month": pyvalue.month,
-                        "day": pyvalue.day,
-                        "hour": pyvalue.hour,
-                        "minute": pyvalue.minute,
-                        "second": pyvalue.second,
-                    }
-            elif field_type is None:
-                field_value = None
-            else:
-                field_value = pyvalue
-
-            json_feature[field_name] = field_value
-
-        return json_feature
+        if self.__field_converters is None:
+            self.__compile_field_converters()
+        converters = self.__field_converters_map
+        return {
+            field_name: converters.get(field_name, value_to_json)(pyvalue)
+            for field_name, pyvalue in attributes.items()
+        }
 
     def delete_all_features(self):
         connection = self.res_factory.connection
         connection.delete(self.get_feature_deleting_url())
 
-    # TODO Need refactoring. Paging loading with process
     def get_features(self) -> List[NGWFeature]:
-        connection = self.res_factory.connection
+        return list(self.iter_features())
+
+    def iter_features(
+        self,
+        page_size: int = FEATURES_PAGE_SIZE,
+        fields: Optional[Iterable[str]] = None,
+        geom: bool = True,
+        bbox: Optional[Tuple[float, float, float, float]] = None,
+        geom_format: Optional[str] = None,
+    ) -> Iterator[NGWFeature]:
+        """
+        Iterate over layer features loading them page by page.
+
+        The next page is requested while the current one is processed, and
+        only these two pages are kept in memory.
+
+        :param page_size: Count of features in one request.
+        :type page_size: int
+        :param fields: Keynames of fields to receive. All fields are
+            received if not set.
+        :type fields: Optional[Iterable[str]]
+        :param geom: Whether to receive geometries.
+        :type geom: bool
+        :param bbox: Optional filter extent (xmin, ymin, xmax, ymax) in the
+            layer SRS.
+        :type bbox: Optional[Tuple[float, float, float, float]]
+        :param geom_format: Geometry transport format, WKB is used if the
+            server supports it when not set.
+        :type geom_format: Optional[str]
+        """
+        if geom_format is None:
+            geom_format = (
+                self.default_geom_format() if geom else GEOM_FORMAT_WKT
+            )
+
+        for page in self.__iter_pages(
+            page_size, fields, geom, bbox, geom_format
+        ):
+            for feature in page:
+                yield NGWFeature(feature, self, geom_format=geom_format)
+
+    def iter_feature_ids(
+        self, page_size: int = FEATURES_PAGE_SIZE
+    ) -> Iterator[int]:
+        """
+        Iterate over ids of layer features.
+
+        Geometries and extensions are not requested, and only one field is
+        received because NGW returns all of them if none is set.
+
+        :param page_size: Count of features in one request.
+        :type page_size: int
+        """
+        first_field = next(iter(self.fields), None)
+        fields = [first_field.keyname] if first_field is not None else None
+        for page in self.__iter_pages(
+            page_size, fields, False, None, GEOM_FORMAT_WKT, extensions=()
+        ):
+            for feature in page:
+                yield feature["id"]
+
+    def iter_feature_attachments(
+        self, page_size: int = FEATURES_PAGE_SIZE
+    ) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+        """
+        Iterate over attachments metadata of layer features.
+
+        Only the attachment extension is requested, features without
+        attachments are skipped.
+
+        :param page_size: Count of features in one request.
+        :type page_size: int
+        """
+        first_field = next(iter(self.fields), None)
+        fields = [first_field.keyname] if first_field is not None else None
+        for page in self.__iter_pages(
+            page_size,
+            fields,
+            False,
+            None,
+            GEOM_FORMAT_WKT,
+            extensions=("attachment",),
+        ):
+            for feature in page:
+                attachments = feature.get("extensions", {}).get("attachment")
+                if attachments:
+                    yield feature["id"], attachments
+
+    def iter_feature_batches(
+        self,
+        page_size: int = FEATURES_PAGE_SIZE,
+        fields: Optional[Iterable[str]] = None,
+        geom: bool = True,
+        bbox: Optional[Tuple[float, float, float, float]] = None,
+        geom_format: Optional[str] = None,
+    ) -> Iterator[NGWFeatureBatch]:
+        """
+        Iterate over layer features page by page in columnar form.
+
+        Parameters are the same as for :meth:`iter_features`.
+        """
+        if geom_format is None:
+            geom_format = (
+                self.default_geom_format() if geom else GEOM_FORMAT_WKT
+            )
+
+        for page in self.__iter_pages(
+            page_size, fields, geom, bbox, geom_format
+        ):
+            yield NGWFeatureBatch.from_json(
+                page, self, geom_format=geom_format
+            )
+
+    def __iter_pages(
+        self,
+        page_size: int,
+        fields: Optional[Iterable[str]],
+        geom: bool,
+        bbox: Optional[Tuple[float, float, float, float]],
+        geom_format: str,
+        *,
+        extensions: Optional[Iterable[str]] = None,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        if page_size < 1:
+            raise ValueError("Page size must be positive")
 
+        connection = self.res_factory.connection
         url = self.get_feature_adding_url()
-        result = connection.get(url)
-
-        ngw_features = []
-        for feature in result:
-            ngw_features.append(NGWFeature(feature, self))
 
-        return ngw_features
+        query: Dict[str, Any] = {"limit": page_size}
+        if fields is not None:
+            query["fields"] = ",".join(fields)
+        if extensions is not None:
+            query["extensions"] = ",".join(extensions)
+        if not geom:
+            query["geom"] = "no"
+        elif geom_format != GEOM_FORMAT_WKT:
+            query["geom_format"] = geom_format
+        if bbox is not None:
+            xmin, ymin, xmax, ymax = bbox
+            query["intersects"] = (
+                f"POLYGON(({xmin} {ymin}, {xmin} {ymax}, {xmax} {ymax},"
+                f" {xmax} {ymin}, {xmin} {ymin}))"
+            )
+
+        def request_page(offset: int):
+            query["offset"] = offset
+            return connection.request_async(
+                "GET", f"{url}?{urllib.parse.urlencode(query)}"
+            )
+
+        offset = 0
+        future = request_page(offset)
+        while future is not None:
+            page = future.result()
+
+            offset += page_size
+            future = request_page(offset) if len(page) == page_size else None
+
+            yield page
 
     def extent(self):
         result = self.res_factory.connection.get(
@@ -175,6 +428,7 @@ class NGWVectorLayer(NGWAbstractVectorResource):
             self.res_factory,
             NGWResource.receive_resource_obj(connection, result["id"]),
         )
+        self.res_factory.on_resource_created(ngw_resource)
 
         return ngw_resource
 
@@ -203,6 +457,7 @@ class NGWVectorLayer(NGWAbstractVectorResource):
         connection.put(url, params=params)
 
         self.update()
+        self.res_factory.on_resource_changed(self)
 
     def export(self, path: str, format: str = "GPKG", srs: int = 3857) -> None:
         url = self.get_relative_api_url()
@@ -42,8 +42,9 @@ class NGWWebMap(NGWResource):
     __used_tree_resources: List[int]
     __basemaps: List["WebMapBaseMap"]
 
-    def __init__(self, resource_factory, resource_json):
-        super().__init__(resource_factory, resource_json)
+    def _construct(self):
+        super()._construct()
+        # Structure is built from the actual json on demand
         self.__root = None
         self.__used_tree_resources = []
         self.__basemaps = []
@@ -263,6 +264,7 @@ class NGWWebMap(NGWResource):
             ngw_group_resource.res_factory,
             NGWResource.receive_resource_obj(connection, result["id"]),
         )
+        ngw_group_resource.res_factory.on_resource_created(ngw_resource)
 
         return ngw_resource
 
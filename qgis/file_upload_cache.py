@@ -0,0 +1,158 @@
+"""
+/***************************************************************************
+    NextGIS WEB API
+                              -------------------
+        begin                : 2014-11-19
+        git sha              : $Format:%H$
+        copyright            : (C) 2014 by NextGIS
+        email                : info@nextgis.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from nextgis_connect.logging import logger
+
+from .local_storage import local_storage_path
+
+# Uploaded files are removed by NGW some time after the upload, so
+# descriptors are reused only within a shorter period
+FILE_UPLOAD_CACHE_TTL = 6 * 60 * 60
+HASH_BLOCK_SIZE = 1024 * 1024
+# Larger files are not read before upload to find their content hash
+FILE_UPLOAD_HASH_MAX_SIZE = 64 * 1024 * 1024
+
+_storage_lock = threading.Lock()
+
+
+def file_full_hash(file_path: str) -> str:
+    """
+    Return hash of the whole file content.
+
+    Unlike sampled hashes used for resuming uploads, identical hashes
+    guarantee identical content, so uploads can be shared by different files.
+    """
+    content_hash = hashlib.sha256()
+    with Path(file_path).open("rb") as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+            content_hash.update(block)
+
+    return content_hash.hexdigest()
+
+
+def file_upload_key(file_path: str) -> str:
+    """
+    Return key of the file in the cache of uploads.
+
+    Files up to FILE_UPLOAD_HASH_MAX_SIZE are identified by the content
+    hash, so an upload is shared by files with identical content. Larger
+    files are identified by path, size and modification time, so reading
+    them twice is avoided, and an upload is reused only for the same
+    unchanged file.
+    """
+    path = Path(file_path).resolve()
+    stat = path.stat()
+    if stat.st_size <= FILE_UPLOAD_HASH_MAX_SIZE:
+        return f"sha256:{file_full_hash(str(path))}"
+    return f"file:{path}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class FileUploadCache:
+    """
+    Persistent cache of file_upload descriptors of uploaded content.
+
+    Descriptors are found by connection id and file key returned by
+    :func:`file_upload_key` and expire after ``ttl`` seconds.
+    """
+
+    __path: Path
+    __ttl: float
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        ttl: float = FILE_UPLOAD_CACHE_TTL,
+    ) -> None:
+        self.__path = (
+            path
+            if path is not None
+            else local_storage_path("file_uploads.json")
+        )
+        self.__ttl = ttl
+
+    def find(
+        self, connection_id: str, file_key: str
+    ) -> Optional[Dict[str, Any]]:
+        key = self.__key(connection_id, file_key)
+        with _storage_lock:
+            entry = self.__read().get(key)
+
+        if not isinstance(entry, dict) or self.__is_expired(entry):
+            return None
+
+        descriptor = entry.get("descriptor")
+        return descriptor if isinstance(descriptor, dict) else None
+
+    def save(
+        self,
+        connection_id: str,
+        file_key: str,
+        descriptor: Dict[str, Any],
+    ) -> None:
+        key = self.__key(connection_id, file_key)
+        with _storage_lock:
+            entries = {
+                entry_key: entry
+                for entry_key, entry in self.__read().items()
+                if isinstance(entry, dict) and not self.__is_expired(entry)
+            }
+            entries[key] = dict(time=time.time(), descriptor=descriptor)
+            self.__write(entries)
+
+    def remove(self, connection_id: str, file_key: str) -> None:
+        key = self.__key(connection_id, file_key)
+        with _storage_lock:
+            entries = self.__read()
+            if entries.pop(key, None) is not None:
+                self.__write(entries)
+
+    def __is_expired(self, entry: Dict[str, Any]) -> bool:
+        upload_time = entry.get("time")
+        return (
+            not isinstance(upload_time, (int, float))
+            or time.time() - upload_time > self.__ttl
+        )
+
+    def __key(self, connection_id: str, file_key: str) -> str:
+        return f"{connection_id}:{file_key}"
+
+    def __read(self) -> Dict[str, Any]:
+        if not self.__path.exists():
+            return {}
+
+        try:
+            entries = json.loads(self.__path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            logger.warning("File uploads cache is corrupted")
+            return {}
+
+        return entries if isinstance(entries, dict) else {}
+
+    def __write(self, entries: Dict[str, Any]) -> None:
+        tmp_path = self.__path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(entries), encoding="utf-8")
+        tmp_path.replace(self.__path)
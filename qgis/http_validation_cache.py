@@ -0,0 +1,117 @@
+"""
+/***************************************************************************
+    NextGIS WEB API
+                              -------------------
+        begin                : 2014-11-19
+        git sha              : $Format:%H$
+        copyright            : (C) 2014 by NextGIS
+        email                : info@nextgis.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import ClassVar, Dict, Optional
+
+# Maximum total size of response bodies kept for a single connection
+HTTP_CACHE_MAX_SIZE = 32 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_type: Optional[str]
+    body: bytes
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+
+class HttpValidationCache:
+    """
+    LRU cache of GET responses which can be revalidated with conditional
+    requests.
+
+    Responses are stored together with their ETag and Last-Modified
+    validators. Total size of stored bodies is bounded, least recently used
+    responses are evicted first. Caches are shared by all connection
+    instances with the same connection id and are safe to use from several
+    threads.
+    """
+
+    __caches: ClassVar[Dict[str, "HttpValidationCache"]] = {}
+    __caches_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    __max_size: int
+    __size: int
+    __responses: "OrderedDict[str, CachedResponse]"
+    __lock: threading.Lock
+
+    def __init__(self, max_size: int = HTTP_CACHE_MAX_SIZE) -> None:
+        self.__max_size = max_size
+        self.__size = 0
+        self.__responses = OrderedDict()
+        self.__lock = threading.Lock()
+
+    @classmethod
+    def for_connection(cls, connection_id: str) -> "HttpValidationCache":
+        with cls.__caches_lock:
+            cache = cls.__caches.get(connection_id)
+            if cache is None:
+                cache = cls()
+                cls.__caches[connection_id] = cache
+            return cache
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    @property
+    def max_size(self) -> int:
+        return self.__max_size
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        with self.__lock:
+            response = self.__responses.get(url)
+            if response is not None:
+                self.__responses.move_to_end(url)
+            return response
+
+    def put(self, url: str, response: CachedResponse) -> None:
+        with self.__lock:
+            self.__remove(url)
+            if response.size > self.__max_size:
+                return
+
+            self.__responses[url] = response
+            self.__size += response.size
+
+            while self.__size > self.__max_size:
+                _, evicted = self.__responses.popitem(last=False)
+                self.__size -= evicted.size
+
+    def invalidate(self, url: str) -> None:
+        with self.__lock:
+            self.__remove(url)
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__responses.clear()
+            self.__size = 0
+
+    def __remove(self, url: str) -> None:
+        response = self.__responses.pop(url, None)
+        if response is not None:
+            self.__size -= response.size
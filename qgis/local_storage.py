@@ -0,0 +1,35 @@
+"""
+/***************************************************************************
+    NextGIS WEB API
+                              -------------------
+        begin                : 2014-11-19
+        git sha              : $Format:%H$
+        copyright            : (C) 2014 by NextGIS
+        email                : info@nextgis.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+from pathlib import Path
+
+from qgis.core import QgsApplication
+
+
+def local_storage_path(name: str) -> Path:
+    """
+    Return path of a file in the local storage of the API.
+
+    The storage directory is placed in the QGIS profile and is created if it
+    does not exist.
+    """
+    storage_dir = Path(QgsApplication.qgisSettingsDirPath()) / "ngw_api"
+    storage_dir.mkdir(parents=True, exist_ok=True)
+    return storage_dir / name
@@ -0,0 +1,103 @@
+"""
+/***************************************************************************
+    NextGIS WEB API
+                              -------------------
+        begin                : 2014-11-19
+        git sha              : $Format:%H$
+        copyright            : (C) 2014 by NextGIS
+        email                : info@nextgis.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import mmap
+from typing import Optional
+
+from qgis.PyQt.QtCore import QIODevice, QObject
+
+
+class MappedFileRegion(QIODevice):
+    """
+    Read-only device over a region of a memory-mapped file.
+
+    Only the region itself is mapped, so a request body built from this
+    device costs about one region of page cache. Qt reads the device in
+    small pieces while sending. Each piece is copied to a short-lived bytes
+    object, because PyQt requires it, so the whole region is never copied
+    to the Python heap at once.
+    """
+
+    __mmap: Optional[mmap.mmap]
+    __view: Optional[memoryview]
+    __offset: int
+
+    def __init__(
+        self,
+        file_path: str,
+        offset: int,
+        size: int,
+        parent: Optional[QObject] = None,
+    ) -> None:
+        super().__init__(parent)
+
+        # Mapping offset must be aligned to the allocation granularity
+        aligned_offset = offset - offset % mmap.ALLOCATIONGRANULARITY
+        shift = offset - aligned_offset
+
+        with open(file_path, "rb") as file:
+            self.__mmap = mmap.mmap(
+                file.fileno(),
+                shift + size,
+                access=mmap.ACCESS_READ,
+                offset=aligned_offset,
+            )
+        self.__view = memoryview(self.__mmap)[shift : shift + size]
+        self.__offset = 0
+
+        self.open(
+            QIODevice.OpenModeFlag.ReadOnly | QIODevice.OpenModeFlag.Unbuffered
+        )
+
+    def isSequential(self) -> bool:
+        return False
+
+    def size(self) -> int:
+        return len(self.__view) if self.__view is not None else 0
+
+    def bytesAvailable(self) -> int:
+        return self.size() - self.__offset + super().bytesAvailable()
+
+    def seek(self, pos: int) -> bool:
+        if pos < 0 or pos > self.size() or not super().seek(pos):
+            return False
+        self.__offset = pos
+        return True
+
+    def close(self) -> None:
+        super().close()
+        self.__offset = 0
+        if self.__view is not None:
+            self.__view.release()
+            self.__view = None
+        if self.__mmap is not None:
+            self.__mmap.close()
+            self.__mmap = None
+
+    def readData(self, maxlen: int) -> bytes:
+        if self.__view is None:
+            return b""
+
+        data = self.__view[self.__offset : self.__offset + maxlen].tobytes()
+        self.__offset += len(data)
+        return data
+
+    def writeData(self, data: bytes) -> int:
+        return -1
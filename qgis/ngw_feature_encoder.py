@@ -0,0 +1,146 @@
+"""
+/***************************************************************************
+    NextGIS WEB API
+                              -------------------
+        begin                : 2014-11-19
+        git sha              : $Format:%H$
+        copyright            : (C) 2014 by NextGIS
+        email                : info@nextgis.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from qgis.core import (
+    QgsCoordinateReferenceSystem,
+    QgsCoordinateTransform,
+    QgsFeature,
+    QgsGeometry,
+    QgsProject,
+    QgsVectorLayer,
+)
+
+from nextgis_connect.compat import WkbType
+from nextgis_connect.ngw_api.core.ngw_feature import (
+    GEOM_FORMAT_WKB,
+    GEOM_FORMAT_WKT,
+    encode_wkb,
+)
+from nextgis_connect.ngw_api.core.ngw_vector_layer import (
+    FieldConverter,
+    NGWVectorLayer,
+)
+
+from .compat_qgis import CompatQt
+
+
+def get_wkt(qgis_geometry: QgsGeometry):
+    wkt = qgis_geometry.asWkt()
+
+    # if qgis_geometry.wkbType() < 0: # TODO: why this check was made?
+    wkb_type = qgis_geometry.wkbType()
+    wkt_fixes = {
+        WkbType.PointZ: ("PointZ", "Point Z"),
+        WkbType.LineString25D: ("LineStringZ", "LineString Z"),
+        WkbType.Polygon25D: ("PolygonZ", "Polygon Z"),
+        WkbType.MultiPoint25D: ("MultiPointZ", "MultiPoint Z"),
+        WkbType.MultiLineString25D: (
+            "MultiLineStringZ",
+            "MultiLineString Z",
+        ),
+        WkbType.MultiPolygon25D: (
+            "MultiPolygonZ",
+            "MultiPolygon Z",
+        ),
+    }
+
+    if wkb_type in wkt_fixes:
+        wkt = wkt.replace(*wkt_fixes[wkb_type])
+
+    return wkt
+
+
+class NGWFeatureEncoder:
+    """
+    Encoder of QGIS layer features into NGW features JSON.
+
+    Everything that doesn't depend on a feature (coordinate transform,
+    fields order and their value converters, multi-geometry flag) is
+    computed once for the layer.
+    """
+
+    __geom_format: str
+    __transform: Optional[QgsCoordinateTransform]
+    __is_multi: bool
+    __fields: Tuple[Tuple[int, str, FieldConverter], ...]
+
+    def __init__(
+        self,
+        qgs_vector_layer: QgsVectorLayer,
+        ngw_vector_layer: NGWVectorLayer,
+        geom_format: str = GEOM_FORMAT_WKT,
+    ) -> None:
+        self.__geom_format = geom_format
+
+        target_crs = QgsCoordinateReferenceSystem.fromEpsgId(
+            ngw_vector_layer.srs()
+        )
+        self.__transform = None
+        if qgs_vector_layer.crs() != target_crs:
+            self.__transform = QgsCoordinateTransform(
+                qgs_vector_layer.crs(), target_crs, QgsProject.instance()
+            )
+
+        self.__is_multi = ngw_vector_layer.is_geom_multy()
+
+        converters = dict(ngw_vector_layer.field_converters)
+        self.__fields = tuple(
+            (index, qgs_field.name(), converters[qgs_field.name()])
+            for index, qgs_field in enumerate(qgs_vector_layer.fields())
+            if qgs_field.name() in converters  # Skip fields absent on server
+        )
+
+    @property
+    def geom_format(self) -> str:
+        return self.__geom_format
+
+    def encode(self, qgs_feature: QgsFeature) -> Dict[str, Any]:
+        # id need only for update not for create
+        geometry = qgs_feature.geometry()
+        if self.__transform is not None:
+            geometry.transform(self.__transform)
+        if self.__is_multi:
+            geometry.convertToMultiType()
+
+        if self.__geom_format == GEOM_FORMAT_WKB:
+            geom = (
+                encode_wkb(geometry.asWkb().data())
+                if not geometry.isNull()
+                else None
+            )
+        else:
+            geom = get_wkt(geometry)
+
+        attributes = qgs_feature.attributes()
+        fields = {
+            keyname: converter(
+                CompatQt.get_clean_python_value(attributes[index])
+            )
+            for index, keyname, converter in self.__fields
+        }
+
+        return {"geom": geom, "fields": fields}
+
+    def encode_batch(
+        self, qgs_features: Iterable[QgsFeature]
+    ) -> List[Dict[str, Any]]:
+        return [self.encode(qgs_feature) for qgs_feature in qgs_features]
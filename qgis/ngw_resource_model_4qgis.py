@@ -22,17 +22,38 @@
 
 import os
 import tempfile
-from collections import Counter
+import threading
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from copy import deepcopy
 from dataclasses import dataclass
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, cast
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
 
-from osgeo import ogr
+from osgeo import gdal, ogr
 from qgis.core import (
     Qgis,
+    QgsAbstractFeatureSource,
     QgsApplication,
     QgsCoordinateReferenceSystem,
     QgsCoordinateTransform,
+    QgsCoordinateTransformContext,
     QgsFeature,
     QgsFeatureRequest,
     QgsField,
@@ -46,14 +67,17 @@ from qgis.core import (
     QgsPluginLayer,
     QgsProject,
     QgsProviderRegistry,
+    QgsRasterDataProvider,
     QgsRasterFileWriter,
     QgsRasterLayer,
     QgsRasterPipe,
     QgsRasterProjector,
+    QgsRectangle,
     QgsReferencedRectangle,
     QgsValueRelationFieldFormatter,
     QgsVectorFileWriter,
     QgsVectorLayer,
+    QgsVectorLayerFeatureSource,
     QgsWkbTypes,
 )
 from qgis.gui import QgisInterface, QgsFileWidget
@@ -68,11 +92,17 @@ from nextgis_connect.compat import (
 )
 from nextgis_connect.exceptions import ErrorCode, NgConnectError, NgwError
 from nextgis_connect.logging import logger
+from nextgis_connect.ngw_api.core.ngw_attachment_uploader import (
+    NGWAttachmentUploader,
+)
 from nextgis_connect.ngw_api.core.ngw_base_map import (
     NGWBaseMap,
     NGWBaseMapExtSettings,
 )
-from nextgis_connect.ngw_api.core.ngw_feature import NGWFeature
+from nextgis_connect.ngw_api.core.ngw_feature_writer import (
+    WRITER_MAX_BATCH_FEATURES,
+    NGWFeatureWriter,
+)
 from nextgis_connect.ngw_api.core.ngw_group_resource import NGWGroupResource
 from nextgis_connect.ngw_api.core.ngw_qgis_style import (
     NGWQGISStyle,
@@ -88,6 +118,7 @@ from nextgis_connect.ngw_api.core.ngw_vector_layer import NGWVectorLayer
 from nextgis_connect.ngw_api.core.ngw_webmap import (
     NGWWebMap,
     NGWWebMapGroup,
+    NGWWebMapItem,
     NGWWebMapLayer,
     NGWWebMapRoot,
 )
@@ -103,9 +134,29 @@ from nextgis_connect.ngw_api.qt.qt_ngw_resource_model_job_error import (
     JobWarning,
 )
 from nextgis_connect.resources.ngw_data_type import NgwDataType
+from nextgis_connect.resources.utils import generate_unique_name
 from nextgis_connect.settings import NgConnectSettings
 
-from .compat_qgis import CompatQt
+from .ngw_feature_encoder import NGWFeatureEncoder
+from .raster_cog import (
+    RASTER_NUM_THREADS,
+    cog_creation_options,
+    is_cog,
+    is_cog_supported,
+    translate_to_cog,
+)
+from .upload_pipeline import PrepareTask, UploadPipeline
+
+T = TypeVar("T")
+
+# Number of layers uploaded simultaneously
+UPLOAD_LAYERS_WORKERS = 4
+# Number of features transformed by one task during GeoPackage export
+GPKG_EXPORT_CHUNK_SIZE = 10000
+# Number of threads transforming features during GeoPackage export
+GPKG_EXPORT_WORKERS = max(1, min(4, os.cpu_count() or 1))
+# Memory available to GDAL for raster reprojection, in megabytes
+RASTER_WARP_MEMORY_LIMIT = 512
 
 
 def getQgsMapLayerEPSG(qgs_map_layer):
@@ -119,41 +170,15 @@ def yOriginTopFromQgisTmsUrl(qgs_tms_url):
     return qgs_tms_url.find("{-y}")
 
 
-def get_wkt(qgis_geometry: QgsGeometry):
-    wkt = qgis_geometry.asWkt()
-
-    # if qgis_geometry.wkbType() < 0: # TODO: why this check was made?
-    wkb_type = qgis_geometry.wkbType()
-    wkt_fixes = {
-        WkbType.PointZ: ("PointZ", "Point Z"),
-        WkbType.LineString25D: ("LineStringZ", "LineString Z"),
-        WkbType.Polygon25D: ("PolygonZ", "Polygon Z"),
-        WkbType.MultiPoint25D: ("MultiPointZ", "MultiPoint Z"),
-        WkbType.MultiLineString25D: (
-            "MultiLineStringZ",
-            "MultiLineString Z",
-        ),
-        WkbType.MultiPolygon25D: (
-            "MultiPolygonZ",
-            "MultiPolygon Z",
-        ),
-    }
-
-    if wkb_type in wkt_fixes:
-        wkt = wkt.replace(*wkt_fixes[wkb_type])
-
-    return wkt
-
-
-def get_real_wkb_type(qgs_vector_layer: QgsVectorLayer) -> WkbType:
+def get_real_wkb_type(snapshot: "VectorLayerSnapshot") -> WkbType:
     if Qgis.versionInt() >= QGIS_3_42:
-        return qgs_vector_layer.wkbType()
+        return snapshot.wkb_type
 
     MAPINFO_DRIVER = "MapInfo File"
-    if qgs_vector_layer.storageType() != MAPINFO_DRIVER:
-        return qgs_vector_layer.wkbType()
+    if snapshot.storage_type != MAPINFO_DRIVER:
+        return snapshot.wkb_type
 
-    layer_path = qgs_vector_layer.source().split("|")[0]
+    layer_path = snapshot.source.split("|")[0]
     driver: ogr.Driver = ogr.GetDriverByName(MAPINFO_DRIVER)
     datasource: Optional[ogr.DataSource] = driver.Open(layer_path)
     assert datasource is not None
@@ -187,6 +212,26 @@ def get_real_wkb_type(qgs_vector_layer: QgsVectorLayer) -> WkbType:
     return WkbType(wkb_type)
 
 
+def get_ogr_layer_wkb_type(ogr_layer: ogr.Layer) -> WkbType:
+    """Return geometry type declared by the OGR layer as QGIS type"""
+    ogr_wkb_type: int = ogr_layer.GetGeomType()
+    wkb_type: int = ogr.GT_Flatten(ogr_wkb_type)
+    if ogr.GT_HasZ(ogr_wkb_type):
+        wkb_type += 1000
+    if ogr.GT_HasM(ogr_wkb_type):
+        wkb_type += 2000
+    return WkbType(wkb_type)
+
+
+@dataclass(frozen=True)
+class PreparedVectorFile:
+    path: str
+    old_fid_name: Optional[str]
+    is_converted: bool = True
+    source_layer: Optional[str] = None
+    fid_source: str = "AUTO"
+
+
 @dataclass(frozen=True)
 class ValueRelation:
     layer_id: str
@@ -205,6 +250,165 @@ class ValueRelation:
         )
 
 
+@dataclass(frozen=True)
+class LayerStyle:
+    name: str
+    qml: str
+    is_default: bool
+
+    @staticmethod
+    def from_layer(
+        qgs_map_layer: QgsMapLayer, style_name: str
+    ) -> "LayerStyle":
+        style_manager = qgs_map_layer.styleManager()
+        assert style_manager is not None
+        return LayerStyle(
+            style_name,
+            style_manager.style(style_name).xmlData(),
+            style_manager.isDefault(style_name),
+        )
+
+
+def get_layer_styles(qgs_map_layer: QgsMapLayer) -> List[LayerStyle]:
+    style_manager = qgs_map_layer.styleManager()
+    assert style_manager is not None
+    return [
+        LayerStyle.from_layer(qgs_map_layer, style_name)
+        for style_name in style_manager.styles()
+    ]
+
+
+@dataclass(frozen=True)
+class VectorLayerSnapshot:
+    """
+    State of a vector layer needed to upload it in a worker thread.
+
+    Layers and the project are not thread-safe, so the snapshot is taken in
+    the thread owning them. Features are read from an independent feature
+    source, fields, CRS and styles are copies.
+    """
+
+    layer_id: str
+    name: str
+    provider_type: str
+    storage_type: str
+    source: str
+    encoding: str
+    wkb_type: WkbType
+    source_crs: QgsCoordinateReferenceSystem
+    fields: QgsFields
+    provider_field_names: List[str]
+    primary_key_attributes: List[int]
+    is_modified: bool
+    subset_string: str
+    feature_source: QgsAbstractFeatureSource
+    transform_context: QgsCoordinateTransformContext
+    project_home_path: str
+    # Field name -> value relation with resolved layer id
+    value_relations: Dict[str, ValueRelation]
+    styles: List[LayerStyle]
+    current_style: str
+
+    @staticmethod
+    def from_layer(qgs_vector_layer: QgsVectorLayer) -> "VectorLayerSnapshot":
+        project = QgsProject.instance()
+        assert project is not None
+        data_provider = qgs_vector_layer.dataProvider()
+        assert data_provider is not None
+        style_manager = qgs_vector_layer.styleManager()
+        assert style_manager is not None
+
+        value_relations: Dict[str, ValueRelation] = {}
+        for field in qgs_vector_layer.fields():
+            editor_widget_setup = field.editorWidgetSetup()
+            if editor_widget_setup.type() != "ValueRelation":
+                continue
+            config = editor_widget_setup.config().copy()
+            related_layer = QgsValueRelationFieldFormatter.resolveLayer(
+                config, project
+            )
+            if related_layer is None:
+                continue
+            config["Layer"] = related_layer.id()
+            value_relations[field.name()] = ValueRelation.from_config(config)
+
+        return VectorLayerSnapshot(
+            layer_id=qgs_vector_layer.id(),
+            name=qgs_vector_layer.name(),
+            provider_type=qgs_vector_layer.providerType(),
+            storage_type=qgs_vector_layer.storageType(),
+            source=qgs_vector_layer.source(),
+            encoding=data_provider.encoding(),
+            wkb_type=qgs_vector_layer.wkbType(),
+            source_crs=QgsCoordinateReferenceSystem(
+                qgs_vector_layer.sourceCrs()
+            ),
+            fields=QgsFields(qgs_vector_layer.fields()),
+            provider_field_names=data_provider.fields().names(),
+            primary_key_attributes=list(
+                qgs_vector_layer.primaryKeyAttributes()
+            ),
+            is_modified=qgs_vector_layer.isModified(),
+            subset_string=qgs_vector_layer.subsetString(),
+            feature_source=QgsVectorLayerFeatureSource(qgs_vector_layer),
+            transform_context=project.transformContext(),
+            project_home_path=project.homePath(),
+            value_relations=value_relations,
+            styles=get_layer_styles(qgs_vector_layer),
+            current_style=style_manager.currentStyle(),
+        )
+
+
+@dataclass(frozen=True)
+class RasterLayerSnapshot:
+    """
+    State of a raster layer needed to upload it in a worker thread.
+
+    Pixels are read from a clone of the data provider, CRS, extent and
+    styles are copies.
+    """
+
+    layer_id: str
+    name: str
+    provider_type: str
+    source: str
+    source_crs: QgsCoordinateReferenceSystem
+    extent: QgsRectangle
+    data_provider: QgsRasterDataProvider
+    width: int
+    height: int
+    transform_context: QgsCoordinateTransformContext
+    styles: List[LayerStyle]
+    current_style: str
+    opacity: float
+
+    @staticmethod
+    def from_layer(qgs_raster_layer: QgsRasterLayer) -> "RasterLayerSnapshot":
+        project = QgsProject.instance()
+        assert project is not None
+        data_provider = qgs_raster_layer.dataProvider()
+        assert data_provider is not None
+        style_manager = qgs_raster_layer.styleManager()
+        assert style_manager is not None
+        renderer = qgs_raster_layer.renderer()
+
+        return RasterLayerSnapshot(
+            layer_id=qgs_raster_layer.id(),
+            name=qgs_raster_layer.name(),
+            provider_type=qgs_raster_layer.providerType(),
+            source=qgs_raster_layer.source(),
+            source_crs=QgsCoordinateReferenceSystem(qgs_raster_layer.crs()),
+            extent=QgsRectangle(qgs_raster_layer.extent()),
+            data_provider=data_provider.clone(),
+            width=data_provider.xSize(),
+            height=data_provider.ySize(),
+            transform_context=project.transformContext(),
+            styles=get_layer_styles(qgs_raster_layer),
+            current_style=style_manager.currentStyle(),
+            opacity=renderer.opacity() if renderer is not None else 1.0,
+        )
+
+
 class QGISResourceJob(NGWResourceModelJob):
     SUITABLE_LAYER = 0
     SUITABLE_LAYER_BAD_GEOMETRY = 1
@@ -212,19 +416,56 @@ class QGISResourceJob(NGWResourceModelJob):
     _value_relations: Set[ValueRelation]
     _lookup_tables_id: Dict[ValueRelation, int]
     _groups: Dict[QgsLayerTreeGroup, NGWGroupResource]
+    _upload_pipeline: Optional[UploadPipeline]
+    _layer_snapshots: Dict[
+        str, Union[VectorLayerSnapshot, RasterLayerSnapshot]
+    ]
+
+    build_cog_locally: bool
 
-    def __init__(self, ngw_version=None):
+    def __init__(self, ngw_version=None, *, build_cog_locally: bool = False):
         super().__init__()
 
         self.ngw_version = ngw_version
+        # Convert rasters to COG before uploading them. The server converts
+        # them itself, so this only pays off on servers keeping uploaded COGs
+        self.build_cog_locally = build_cog_locally
 
         self._value_relations = set()
         self._lookup_tables_id = {}
         self._groups = {}
+        self._upload_pipeline = None
+        self._layer_snapshots = {}
 
     def _layer_status(self, layer_name, status):
         self.statusChanged.emit(f""""{layer_name}" - {status}""")
 
+    def _prepared_file(
+        self,
+        qgs_map_layer: QgsMapLayer,
+        prepare: Callable[[Any], T],
+    ) -> T:
+        pipeline = self._upload_pipeline
+        if pipeline is None or qgs_map_layer.id() not in pipeline:
+            return prepare(qgs_map_layer)
+        return pipeline.take(qgs_map_layer.id())
+
+    def _layer_snapshot(
+        self, qgs_vector_layer: QgsVectorLayer
+    ) -> VectorLayerSnapshot:
+        snapshot = self._layer_snapshots.get(qgs_vector_layer.id())
+        if snapshot is None:
+            return VectorLayerSnapshot.from_layer(qgs_vector_layer)
+        return cast(VectorLayerSnapshot, snapshot)
+
+    def _raster_layer_snapshot(
+        self, qgs_raster_layer: QgsRasterLayer
+    ) -> RasterLayerSnapshot:
+        snapshot = self._layer_snapshots.get(qgs_raster_layer.id())
+        if snapshot is None:
+            return RasterLayerSnapshot.from_layer(qgs_raster_layer)
+        return cast(RasterLayerSnapshot, snapshot)
+
     def isSuitableLayer(self, qgs_map_layer: QgsVectorLayer):
         layer_type = qgs_map_layer.type()
 
@@ -377,18 +618,21 @@ class QGISResourceJob(NGWResourceModelJob):
             return [wms_connection, wms_layer]
 
     def importQgsRasterLayer(self, qgs_raster_layer, ngw_parent_resource):
+        snapshot = self._raster_layer_snapshot(qgs_raster_layer)
         new_layer_name = self.unique_resource_name(
-            qgs_raster_layer.name(), ngw_parent_resource
+            snapshot.name, ngw_parent_resource
         )
         logger.debug(
-            f'<b>↑ Uploading raster layer</b> "{qgs_raster_layer.name()}" (with the name "{new_layer_name}")'
+            f'<b>↑ Uploading raster layer</b> "{snapshot.name}" (with the name "{new_layer_name}")'
         )
 
-        def uploadFileCallback(total_size, readed_size, value=None):
+        def uploadFileCallback(
+            total_size, readed_size, value=None, chunk_size=None
+        ):
             if value is None:
                 value = round(readed_size * 100 / total_size)
             self._layer_status(
-                qgs_raster_layer.name(),
+                snapshot.name,
                 QgsApplication.translate(
                     "QGISResourceJob", "uploading ({}%)"
                 ).format(value),
@@ -396,11 +640,14 @@ class QGISResourceJob(NGWResourceModelJob):
 
         def createLayerCallback():
             self._layer_status(
-                qgs_raster_layer.name(),
+                snapshot.name,
                 QgsApplication.translate("QGISResourceJob", "creating"),
             )
 
-        is_converted, filepath = self.prepareImportRasterFile(qgs_raster_layer)
+        is_converted, filepath = self._prepared_file(
+            qgs_raster_layer,
+            lambda _layer: self.prepareImportRasterFile(snapshot),
+        )
 
         ngw_raster_layer = ResourceCreator.create_raster_layer(
             ngw_parent_resource,
@@ -421,16 +668,19 @@ class QGISResourceJob(NGWResourceModelJob):
         qgs_vector_layer: QgsVectorLayer,
         ngw_parent_resource: NGWGroupResource,
     ) -> Optional[NGWVectorLayer]:
+        snapshot = self._layer_snapshot(qgs_vector_layer)
         new_layer_name = self.unique_resource_name(
-            qgs_vector_layer.name(), ngw_parent_resource
+            snapshot.name, ngw_parent_resource
         )
         logger.debug(
-            f'<b>↑ Uploading vector layer</b> "{qgs_vector_layer.name()}" (with the name "{new_layer_name}")'
+            f'<b>↑ Uploading vector layer</b> "{snapshot.name}" (with the name "{new_layer_name}")'
         )
 
-        def uploadFileCallback(total_size, readed_size, value=None):
+        def uploadFileCallback(
+            total_size, readed_size, value=None, chunk_size=None
+        ):
             self._layer_status(
-                qgs_vector_layer.name(),
+                snapshot.name,
                 QgsApplication.translate(
                     "QGISResourceJob", "uploading ({}%)"
                 ).format(
@@ -444,7 +694,7 @@ class QGISResourceJob(NGWResourceModelJob):
 
         def createLayerCallback():
             self._layer_status(
-                qgs_vector_layer.name(),
+                snapshot.name,
                 QgsApplication.translate("QGISResourceJob", "creating"),
             )
 
@@ -454,47 +704,42 @@ class QGISResourceJob(NGWResourceModelJob):
         ):
             self.errorOccurred.emit(
                 JobError(
-                    f"Vector layer '{qgs_vector_layer.name()}' has no suitable geometry"
+                    f"Vector layer '{snapshot.name}' has no suitable geometry"
                 )
             )
             return None
 
-        filepath, old_fid_name, tgt_qgs_layer = self.prepareImportVectorFile(
-            qgs_vector_layer
+        prepared_file = self._prepared_file(
+            qgs_vector_layer,
+            lambda _layer: self.prepareImportVectorFile(snapshot),
         )
-        if filepath is None:
+        if prepared_file.path is None:
             self.errorOccurred.emit(
-                JobError(
-                    f"Can't prepare layer '{qgs_vector_layer.name()}'. Skipped!"
-                )
+                JobError(f"Can't prepare layer '{snapshot.name}'. Skipped!")
             )
             return None
 
         ngw_vector_layer = ResourceCreator.create_vector_layer(
             ngw_parent_resource,
-            filepath,
+            prepared_file.path,
             new_layer_name,
-            old_fid_name,
+            prepared_file.old_fid_name,
             uploadFileCallback,
             createLayerCallback,
+            source_layer=prepared_file.source_layer,
+            fid_source=prepared_file.fid_source,
         )
 
         fields_aliases: Dict[str, Dict[str, str]] = {}
         fields_lookup_table: Dict[str, Dict[str, Dict[str, Any]]] = {}
-        for field in qgs_vector_layer.fields():
+        for field in snapshot.fields:
             alias = field.alias()
             lookup_table = None
-            editor_widget_setup = field.editorWidgetSetup()
-            if editor_widget_setup.type() == "ValueRelation":
-                config = editor_widget_setup.config().copy()
-                related_layer = QgsValueRelationFieldFormatter.resolveLayer(
-                    config, QgsProject.instance()
-                )
-                if related_layer is None:
+            if field.editorWidgetSetup().type() == "ValueRelation":
+                value_relation = snapshot.value_relations.get(field.name())
+                if value_relation is None:
                     continue
 
-                config["Layer"] = related_layer.id()
-                value_relation = ValueRelation.from_config(config)
                 lookup_table = self._lookup_tables_id[value_relation]
 
             if len(alias) == 0 and lookup_table is None:
@@ -511,7 +756,7 @@ class QGISResourceJob(NGWResourceModelJob):
 
         if len(fields_aliases) > 0:
             self._layer_status(
-                qgs_vector_layer.name(),
+                snapshot.name,
                 QgsApplication.translate("QGISResourceJob", "adding aliases"),
             )
 
@@ -522,7 +767,7 @@ class QGISResourceJob(NGWResourceModelJob):
 
         if len(fields_lookup_table) > 0:
             self._layer_status(
-                qgs_vector_layer.name(),
+                snapshot.name,
                 QgsApplication.translate(
                     "QGISResourceJob", "adding lookup tables"
                 ),
@@ -533,57 +778,126 @@ class QGISResourceJob(NGWResourceModelJob):
                 self.warningOccurred.emit(error)
 
         self._layer_status(
-            qgs_vector_layer.name(),
+            snapshot.name,
             QgsApplication.translate("QGISResourceJob", "finishing"),
         )
-        os.remove(filepath)
+        if prepared_file.is_converted:
+            os.remove(prepared_file.path)
 
         return ngw_vector_layer
 
-    def prepareImportVectorFile(self, qgs_vector_layer):
+    def prepareImportVectorFile(
+        self, snapshot: VectorLayerSnapshot
+    ) -> PreparedVectorFile:
+        prepared_file = self.prepareSourceVectorFile(snapshot)
+        if prepared_file is not None:
+            return prepared_file
+
         self._layer_status(
-            qgs_vector_layer.name(),
+            snapshot.name,
             QgsApplication.translate("QGISResourceJob", "preparing"),
         )
 
-        layer_has_mixed_geoms = False
-        fids_with_notvalid_geom = []
-
         # Do not check geometries (rely on NGW):
         # if NgConnectPlugin.fix_incorrect_geometries
         #    layer_has_mixed_geoms, fids_with_notvalid_geom = self.checkGeometry(qgs_vector_layer)
 
-        if layer_has_mixed_geoms or len(fids_with_notvalid_geom) > 0:
-            layer = self.createLayer4Upload(
-                qgs_vector_layer,
-                fids_with_notvalid_geom,
-                layer_has_mixed_geoms,
-            )
-        else:
-            layer = qgs_vector_layer
+        gpkg_path, old_fid_name = self.prepareAsGPKG(snapshot)
+
+        return PreparedVectorFile(gpkg_path, old_fid_name)
+
+    def prepareSourceVectorFile(
+        self, snapshot: VectorLayerSnapshot
+    ) -> Optional[PreparedVectorFile]:
+        """
+        Check if the GeoPackage the layer is read from can be uploaded as is.
+
+        It is possible for unmodified single layer files in EPSG:3857 without
+        filters, virtual or joined fields. Features are identified by the source
+        FIDs, like the primary key column is used for converted layers.
+
+        :return: Description of the source file or None if the layer has to
+            be converted.
+        """
+        if (
+            snapshot.provider_type != "ogr"
+            or snapshot.storage_type != "GPKG"
+            or snapshot.source_crs.postgisSrid() != 3857
+            or snapshot.is_modified
+            or len(snapshot.subset_string) > 0
+            or snapshot.provider_field_names != snapshot.fields.names()
+        ):
+            return None
+
+        registry = QgsProviderRegistry.instance()
+        assert registry is not None
+        source_parts = registry.decodeUri("ogr", snapshot.source)
+        source_path = source_parts.get("path")
+        source_layer = source_parts.get("layerName")
+        if (
+            not source_path
+            or not Path(source_path).is_file()
+            or len(source_parts.get("subset") or "") > 0
+        ):
+            return None
+
+        # Changes which are not checkpointed yet are kept in the WAL file
+        wal_path = Path(f"{source_path}-wal")
+        if wal_path.exists() and wal_path.stat().st_size > 0:
+            return None
+
+        # Other layers of the file would be uploaded needlessly
+        datasource = ogr.Open(source_path)
+        if datasource is None or datasource.GetLayerCount() != 1:
+            return None
+        datasource_layer = datasource.GetLayer(0).GetName()
+        del datasource
+        if source_layer is not None and source_layer != datasource_layer:
+            return None
+        source_layer = datasource_layer
+
+        field_names = set(snapshot.fields.names())
+        fid_source = "AUTO" if {"ngw_id", "id"} & field_names else "SOURCE"
 
-        gpkg_path, old_fid_name = self.prepareAsGPKG(layer)
+        logger.debug(f"<b>Upload</b> layer {snapshot.name} source as is")
 
-        return gpkg_path, old_fid_name, layer
+        return PreparedVectorFile(
+            source_path,
+            None,
+            is_converted=False,
+            source_layer=source_layer,
+            fid_source=fid_source,
+        )
 
     def prepareImportRasterFile(
-        self, qgs_raster_layer: QgsRasterLayer
+        self, snapshot: RasterLayerSnapshot
     ) -> Tuple[bool, str]:
-        source = qgs_raster_layer.source()
-        source_crs = qgs_raster_layer.crs()
+        source = snapshot.source
+        source_crs = snapshot.source_crs
+        as_cog = (
+            self.build_cog_locally and NgConnectSettings().upload_raster_as_cog
+        )
         if (
             Path(source).exists()
             and Path(source).suffix in (".tif", ".tiff")
             and source_crs.postgisSrid() == 3857
         ):
+            if not as_cog or is_cog(source):
+                return False, source
+
+            self._layer_status(
+                snapshot.name,
+                QgsApplication.translate("QGISResourceJob", "preparing"),
+            )
+            output_path = tempfile.mktemp(suffix=".tif")
+            if translate_to_cog(source, output_path):
+                return True, output_path
             return False, source
 
-        logger.debug(
-            f"<b>Transform</b> raster layer {qgs_raster_layer.name()}"
-        )
+        logger.debug(f"<b>Transform</b> raster layer {snapshot.name}")
 
         self._layer_status(
-            qgs_raster_layer.name(),
+            snapshot.name,
             QgsApplication.translate("QGISResourceJob", "preparing"),
         )
 
@@ -592,14 +906,17 @@ class QGISResourceJob(NGWResourceModelJob):
 
         output_path = tempfile.mktemp(suffix=".tif")
 
+        if self.warpRasterFile(snapshot, output_path, as_cog=as_cog):
+            return True, output_path
+
         pipe = QgsRasterPipe()
-        if not pipe.set(qgs_raster_layer.dataProvider().clone()):
+        if not pipe.set(snapshot.data_provider.clone()):
             raise RuntimeError
 
-        extent = qgs_raster_layer.extent()
+        extent = QgsRectangle(snapshot.extent)
 
         output_crs = QgsCoordinateReferenceSystem.fromEpsgId(3857)
-        transform_context = QgsProject.instance().transformContext()
+        transform_context = snapshot.transform_context
 
         if source_crs != output_crs:
             projector = QgsRasterProjector()
@@ -611,7 +928,7 @@ class QGISResourceJob(NGWResourceModelJob):
                 )
 
             transform = QgsCoordinateTransform(
-                source_crs, output_crs, QgsProject.instance()
+                source_crs, output_crs, transform_context
             )
             transform.setBallparkTransformsAreAppropriate(True)
             extent = transform.transformBoundingBox(extent)
@@ -621,15 +938,87 @@ class QGISResourceJob(NGWResourceModelJob):
 
         raster_writer.writeRaster(
             pipe,
-            qgs_raster_layer.dataProvider().xSize(),
-            qgs_raster_layer.dataProvider().ySize(),
+            snapshot.width,
+            snapshot.height,
             extent,
             output_crs,
             transform_context,
         )
 
+        if as_cog:
+            cog_path = tempfile.mktemp(suffix=".tif")
+            if translate_to_cog(output_path, cog_path):
+                os.remove(output_path)
+                return True, cog_path
+
         return True, output_path
 
+    def warpRasterFile(
+        self,
+        snapshot: RasterLayerSnapshot,
+        output_path: str,
+        *,
+        as_cog: bool = False,
+        warp_memory_limit: int = RASTER_WARP_MEMORY_LIMIT,
+    ) -> bool:
+        """
+        Reproject a file based raster layer to EPSG:3857 with GDAL.
+
+        Warping uses several threads and writes a tiled GeoTIFF, or a Cloud
+        Optimized GeoTIFF with internal overviews if requested and supported
+        by GDAL. Layers whose project transform context defines a coordinate
+        operation to EPSG:3857 are left to QgsRasterProjector, since GDAL
+        would pick its own operation.
+
+        :param snapshot: Snapshot of a layer with the "gdal" data provider.
+        :param output_path: Path of the created file.
+        :param as_cog: Create a Cloud Optimized GeoTIFF.
+        :param warp_memory_limit: Working memory of GDAL in megabytes.
+        :return: True if the file has been created.
+        """
+        source = snapshot.source
+        if snapshot.provider_type != "gdal" or not Path(source).is_file():
+            return False
+
+        if snapshot.transform_context.hasTransform(
+            snapshot.source_crs,
+            QgsCoordinateReferenceSystem.fromEpsgId(3857),
+        ):
+            return False
+
+        if as_cog and is_cog_supported():
+            output_format = "COG"
+            creation_options = cog_creation_options()
+        else:
+            output_format = "GTiff"
+            creation_options = ["TILED=YES", "BIGTIFF=IF_SAFER"]
+
+        options = gdal.WarpOptions(
+            format=output_format,
+            srcSRS=snapshot.source_crs.toWkt(),
+            dstSRS="EPSG:3857",
+            multithread=True,
+            warpOptions=[f"NUM_THREADS={RASTER_NUM_THREADS}"],
+            warpMemoryLimit=warp_memory_limit,
+            creationOptions=creation_options,
+        )
+        try:
+            dataset = gdal.Warp(output_path, source, options=options)
+        except RuntimeError:
+            dataset = None
+
+        if dataset is None:
+            logger.warning(
+                f"Can't reproject raster layer {snapshot.name} with GDAL"
+            )
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            return False
+
+        del dataset  # save changes
+
+        return True
+
     def checkGeometry(self, qgs_vector_layer):
         has_simple_geometries = False
         has_multipart_geometries = False
@@ -818,20 +1207,17 @@ class QGISResourceJob(NGWResourceModelJob):
         return geometry_type
 
     def prepareAsGPKG(
-        self, qgs_vector_layer: QgsVectorLayer
+        self, snapshot: VectorLayerSnapshot
     ) -> Tuple[str, Optional[str]]:
         tmp_gpkg_path = tempfile.mktemp(".gpkg")
 
-        source_srs = qgs_vector_layer.sourceCrs()
+        source_srs = snapshot.source_crs
         destination_srs = QgsCoordinateReferenceSystem.fromEpsgId(3857)
 
-        project = QgsProject.instance()
-        assert project is not None
-
         old_fid_name = None
-        pk_attributes = qgs_vector_layer.primaryKeyAttributes()
+        pk_attributes = snapshot.primary_key_attributes
         if len(pk_attributes) == 1:
-            pk_field = qgs_vector_layer.fields().at(pk_attributes[0])
+            pk_field = snapshot.fields.at(pk_attributes[0])
             if pk_field.type() in (
                 NgwDataType.INTEGER.qt_value,
                 NgwDataType.BIGINT.qt_value,
@@ -840,9 +1226,14 @@ class QGISResourceJob(NGWResourceModelJob):
 
         fid_name = "0xFEEDC0DE"
 
+        if old_fid_name is None and self.translateAsGPKG(
+            snapshot, tmp_gpkg_path, fid_name
+        ):
+            return tmp_gpkg_path, old_fid_name
+
         options = QgsVectorFileWriter.SaveVectorOptions()
         options.driverName = "GPKG"
-        options.layerName = qgs_vector_layer.name()
+        options.layerName = snapshot.name
         options.fileEncoding = "UTF-8"
         options.layerOptions = [
             *QgsVectorFileWriter.defaultDatasetOptions("GPKG"),
@@ -852,14 +1243,14 @@ class QGISResourceJob(NGWResourceModelJob):
 
         fields = QgsFields()
         fields.append(QgsField(fid_name, FieldType.LongLong))
-        for field in qgs_vector_layer.fields().toList():
+        for field in snapshot.fields.toList():
             fields.append(field)
 
         writer = QgsVectorFileWriter.create(
             fileName=tmp_gpkg_path,
             fields=fields,
-            geometryType=get_real_wkb_type(qgs_vector_layer),
-            transformContext=project.transformContext(),
+            geometryType=get_real_wkb_type(snapshot),
+            transformContext=snapshot.transform_context,
             srs=destination_srs,
             options=options,
         )
@@ -868,23 +1259,48 @@ class QGISResourceJob(NGWResourceModelJob):
         transform = None
         if source_srs != destination_srs:
             transform = QgsCoordinateTransform(
-                source_srs, destination_srs, QgsProject.instance()
+                source_srs, destination_srs, snapshot.transform_context
             )
 
-        for feature in cast(
-            Iterable[QgsFeature], qgs_vector_layer.getFeatures()
-        ):
-            try:
-                target_feature = QgsFeature(fields)
-                geometry = feature.geometry()
-                if transform is not None:
-                    geometry.transform(transform)
-                target_feature.setGeometry(geometry)
+        def convert_chunk(
+            features: List[QgsFeature],
+        ) -> Tuple[List[QgsFeature], List[int]]:
+            # Transform objects are not shared between threads
+            chunk_transform = (
+                QgsCoordinateTransform(transform)
+                if transform is not None
+                else None
+            )
+            target_features = []
+            failed_fids = []
+            for feature in features:
+                try:
+                    target_feature = QgsFeature(fields)
+                    geometry = feature.geometry()
+                    if chunk_transform is not None:
+                        geometry.transform(chunk_transform)
+                    target_feature.setGeometry(geometry)
+
+                    target_feature.setAttributes([None, *feature.attributes()])
+                except Exception:
+                    failed_fids.append(feature.id())
+                    continue
+
+                target_features.append(target_feature)
 
-                target_feature.setAttributes([None, *feature.attributes()])
+            return target_features, failed_fids
 
+        def write_chunk(
+            writer: QgsVectorFileWriter,
+            chunk_future: "Future[Tuple[List[QgsFeature], List[int]]]",
+        ) -> None:
+            target_features, failed_fids = chunk_future.result()
+            # addFeatures() stops at the first rejected feature, so
+            # features are added one by one as before
+            for target_feature in target_features:
                 writer.addFeature(target_feature)
-            except Exception:
+
+            for fid in failed_fids:
                 # fmt: off
                 self.warningOccurred.emit(
                     JobWarning(
@@ -892,16 +1308,159 @@ class QGISResourceJob(NGWResourceModelJob):
                             "QGISResourceJob",
                             "Feature {} haven't been added."
                             " Please check geometry"
-                        ).format(feature.id())
+                        ).format(fid)
                     )
                 )
                 # fmt: on
-                continue
+
+        # Features are read and written by this thread in the source order
+        # while geometries of several chunks are transformed in workers
+        with ThreadPoolExecutor(
+            max_workers=GPKG_EXPORT_WORKERS,
+            thread_name_prefix="prepareAsGPKG",
+        ) as executor:
+            chunk_futures: Deque[
+                "Future[Tuple[List[QgsFeature], List[int]]]"
+            ] = deque()
+            chunk: List[QgsFeature] = []
+            for feature in cast(
+                Iterable[QgsFeature],
+                snapshot.feature_source.getFeatures(QgsFeatureRequest()),
+            ):
+                chunk.append(QgsFeature(feature))
+                if len(chunk) < GPKG_EXPORT_CHUNK_SIZE:
+                    continue
+
+                chunk_futures.append(executor.submit(convert_chunk, chunk))
+                chunk = []
+                while len(chunk_futures) > GPKG_EXPORT_WORKERS or (
+                    len(chunk_futures) > 0 and chunk_futures[0].done()
+                ):
+                    write_chunk(writer, chunk_futures.popleft())
+
+            if len(chunk) > 0:
+                chunk_futures.append(executor.submit(convert_chunk, chunk))
+
+            while len(chunk_futures) > 0:
+                write_chunk(writer, chunk_futures.popleft())
 
         del writer  # save changes
 
         return tmp_gpkg_path, old_fid_name
 
+    def translateAsGPKG(
+        self,
+        snapshot: VectorLayerSnapshot,
+        gpkg_path: str,
+        fid_name: str,
+    ) -> bool:
+        """
+        Convert an unmodified OGR layer to GeoPackage with GDAL.
+
+        GDAL reads, reprojects and writes features without passing them
+        through Python. Layers with edits, filters, virtual or joined
+        fields or a non UTF-8 encoding are not converted. Neither are
+        layers whose CRS has a coordinate operation chosen in the project
+        transform context, since GDAL would pick its own one, and layers
+        whose geometry type declared by OGR differs from the QGIS one.
+        Single part types are promoted to multipart ones if QGIS reports
+        the layer as multipart.
+
+        :return: True if the layer has been converted.
+        """
+        if (
+            snapshot.provider_type != "ogr"
+            or snapshot.is_modified
+            or len(snapshot.subset_string) > 0
+            or snapshot.provider_field_names != snapshot.fields.names()
+            or snapshot.encoding.upper() not in ("", "UTF-8", "UTF8")
+            or get_real_wkb_type(snapshot) != snapshot.wkb_type
+            or snapshot.transform_context.hasTransform(
+                snapshot.source_crs,
+                QgsCoordinateReferenceSystem.fromEpsgId(3857),
+            )
+        ):
+            return False
+
+        registry = QgsProviderRegistry.instance()
+        assert registry is not None
+        source_parts = registry.decodeUri("ogr", snapshot.source)
+        source_path = source_parts.get("path")
+        source_layer = source_parts.get("layerName")
+        if (
+            not source_path
+            or (
+                source_layer is None
+                and source_parts.get("layerId") is not None
+            )
+            or len(source_parts.get("subset") or "") > 0
+        ):
+            return False
+
+        datasource = ogr.Open(source_path)
+        if datasource is None:
+            return False
+        ogr_layer = (
+            datasource.GetLayerByName(source_layer)
+            if source_layer is not None
+            else datasource.GetLayer(0)
+        )
+        if ogr_layer is None or (
+            source_layer is None and datasource.GetLayerCount() != 1
+        ):
+            return False
+        declared_wkb_type = get_ogr_layer_wkb_type(ogr_layer)
+        del ogr_layer, datasource
+
+        # OGR declares single part types for shapefiles which QGIS reports
+        # as multipart, so geometries are promoted as QGIS writer does
+        geometry_type = None
+        if QgsWkbTypes.isMultiType(
+            snapshot.wkb_type
+        ) and not QgsWkbTypes.isMultiType(declared_wkb_type):
+            declared_wkb_type = QgsWkbTypes.multiType(declared_wkb_type)
+            geometry_type = "PROMOTE_TO_MULTI"
+        if (
+            QgsWkbTypes.flatType(declared_wkb_type)
+            != QgsWkbTypes.flatType(snapshot.wkb_type)
+            or QgsWkbTypes.hasZ(declared_wkb_type)
+            != QgsWkbTypes.hasZ(snapshot.wkb_type)
+            or QgsWkbTypes.hasM(declared_wkb_type)
+            != QgsWkbTypes.hasM(snapshot.wkb_type)
+        ):
+            return False
+
+        logger.debug(f"<b>Translate</b> layer {snapshot.name} with GDAL")
+
+        options = gdal.VectorTranslateOptions(
+            format="GPKG",
+            layers=[source_layer] if source_layer is not None else None,
+            layerName=snapshot.name,
+            geometryType=geometry_type,
+            srcSRS=snapshot.source_crs.toWkt(),
+            dstSRS="EPSG:3857",
+            datasetCreationOptions=QgsVectorFileWriter.defaultDatasetOptions(
+                "GPKG"
+            ),
+            layerCreationOptions=[f"FID={fid_name}", "SPATIAL_INDEX=NO"],
+        )
+        try:
+            dataset = gdal.VectorTranslate(
+                gpkg_path, source_path, options=options
+            )
+        except RuntimeError:
+            dataset = None
+
+        if dataset is None:
+            logger.warning(f"Can't translate layer {snapshot.name} with GDAL")
+            if os.path.exists(gpkg_path):
+                os.remove(gpkg_path)
+            return False
+
+        del dataset  # save changes
+
+        return True
+
     def upload_qml_file(
         self, ngw_layer_resource, qml_filename, style_name=None
     ):
@@ -926,19 +1485,22 @@ class QGISResourceJob(NGWResourceModelJob):
         if not isinstance(qgs_map_layer, (QgsVectorLayer, QgsRasterLayer)):
             return None
 
-        style_manager = qgs_map_layer.styleManager()
-        assert style_manager is not None
+        return self.uploadStyle(
+            ngw_layer_resource,
+            LayerStyle.from_layer(qgs_map_layer, style_name),
+        )
 
+    def uploadStyle(
+        self, ngw_layer_resource, style: LayerStyle
+    ) -> Optional[NGWQGISStyle]:
         temp_filename = tempfile.mktemp(suffix=".qml")
         with open(temp_filename, "w") as qml_file:
-            qml_data = style_manager.style(style_name).xmlData()
-            qml_file.write(qml_data)
-
-        if style_manager.isDefault(style_name):
-            style_name = None
+            qml_file.write(style.qml)
 
         ngw_resource = self.upload_qml_file(
-            ngw_layer_resource, temp_filename, style_name
+            ngw_layer_resource,
+            temp_filename,
+            None if style.is_default else style.name,
         )
         os.remove(temp_filename)
         return ngw_resource
@@ -1016,26 +1578,23 @@ class QGISResourceJob(NGWResourceModelJob):
         to import the attachment
         """
 
-        def uploadFileCallback(total_size, readed_size, value=None):
+        def uploadFileCallback(file_path, total_size, readed_size):
+            if total_size == 0:
+                return
             self._layer_status(
-                full_path,
+                file_path,
                 QgsApplication.translate(
                     "QGISResourceJob", "uploading ({}%)"
-                ).format(
-                    int(
-                        readed_size * 100 / total_size
-                        if value is None
-                        else value
-                    )
-                ),
+                ).format(int(readed_size * 100 / total_size)),
             )
 
         if ngw_resource.type_id != NGWVectorLayer.type_id:
             return
 
-        ngw_ftrs = []
-        for attrInx in qgs_vector_layer.attributeList():
-            editor_widget = qgs_vector_layer.editorWidgetSetup(attrInx)
+        snapshot = self._layer_snapshot(qgs_vector_layer)
+        attachment_fields: List[Tuple[int, Path]] = []
+        for attrInx, field in enumerate(snapshot.fields):
+            editor_widget = field.editorWidgetSetup()
             if editor_widget.type() != "ExternalResource":
                 continue
 
@@ -1052,7 +1611,7 @@ class QGISResourceJob(NGWResourceModelJob):
                     editor_config["RelativeStorage"]
                     == QgsFileWidget.RelativeStorage.RelativeProject
                 ):
-                    root_dir = QgsProject.instance().homePath()
+                    root_dir = snapshot.project_home_path
                 if (
                     editor_config["RelativeStorage"]
                     == QgsFileWidget.RelativeStorage.RelativeDefaultPath
@@ -1065,32 +1624,56 @@ class QGISResourceJob(NGWResourceModelJob):
                     and not isinstance(root_dir, QVariant)
                     else Path()
                 )
+                attachment_fields.append((attrInx, root_dir))
 
-                for finx, ftr in enumerate(
-                    cast(Iterable[QgsFeature], qgs_vector_layer.getFeatures())
-                ):
-                    file_path = ftr.attributes()[attrInx]
-                    if not isinstance(file_path, str):
-                        continue
+        if len(attachment_fields) == 0:
+            return
 
-                    full_path = root_dir / file_path
-                    if not full_path.is_file():
-                        continue
+        # Files of every feature by its index in the layer
+        feature_files: Dict[int, List[str]] = {}
+        for finx, ftr in enumerate(
+            cast(
+                Iterable[QgsFeature],
+                snapshot.feature_source.getFeatures(QgsFeatureRequest()),
+            )
+        ):
+            attributes = ftr.attributes()
+            for attrInx, root_dir in attachment_fields:
+                file_path = attributes[attrInx]
+                if not isinstance(file_path, str):
+                    continue
 
-                    if len(ngw_ftrs) == 0:
-                        # Lazy loading
-                        ngw_ftrs = ngw_resource.get_features()
+                full_path = root_dir / file_path
+                if not full_path.is_file():
+                    continue
 
-                    logger.debug(f"Load file: {full_path}")
-                    uploaded_file_info = ngw_ftrs[
-                        finx
-                    ].ngw_vector_layer.res_factory.connection.upload_file(
-                        str(full_path), uploadFileCallback
-                    )
-                    logger.debug(f"Uploaded file info: {uploaded_file_info}")
-                    ngw_ftrs[finx].link_attachment(
-                        full_path.name, uploaded_file_info
-                    )
+                feature_files.setdefault(finx, []).append(str(full_path))
+
+        if len(feature_files) == 0:
+            return
+
+        uploader = NGWAttachmentUploader(
+            ngw_resource, progress_callback=uploadFileCallback
+        )
+        last_finx = max(feature_files)
+        for finx, feature_id in enumerate(ngw_resource.iter_feature_ids()):
+            if finx in feature_files:
+                uploader.add(feature_id, feature_files[finx])
+            if finx == last_finx:
+                break
+        uploader.close()
+
+        for error in uploader.errors:
+            # fmt: off
+            self.warningOccurred.emit(
+                JobWarning(
+                    QgsApplication.translate(
+                        "QGISResourceJob",
+                        "Attachment {} of feature {} hasn't been added"
+                    ).format(error.path, error.feature_id)
+                )
+            )
+            # fmt: on
 
     def overwriteQGISMapLayer(self, qgs_map_layer, ngw_layer_resource):
         layer_type = qgs_map_layer.type()
@@ -1103,26 +1686,12 @@ class QGISResourceJob(NGWResourceModelJob):
         return None
 
     def overwriteQgsVectorLayer(self, qgs_map_layer, ngw_layer_resource):
-        block_size = 10
         total_count = qgs_map_layer.featureCount()
-
-        self._layer_status(
-            ngw_layer_resource.display_name,
-            QgsApplication.translate(
-                "QGISResourceJob", "removing all features"
-            ),
-        )
-        ngw_layer_resource.delete_all_features()
-
-        features_counter = 0
         progress = 0
-        for features in self.getFeaturesPart(
-            qgs_map_layer, ngw_layer_resource, block_size
-        ):
-            ngw_layer_resource.patch_features(features)
 
-            features_counter += len(features)
-            v = int(features_counter * 100 / total_count)
+        def update_progress(committed_count: int) -> None:
+            nonlocal progress
+            v = int(committed_count * 100 / total_count)
             if progress < v:
                 progress = v
                 self._layer_status(
@@ -1132,72 +1701,61 @@ class QGISResourceJob(NGWResourceModelJob):
                     ).format(progress),
                 )
 
-    def getFeaturesPart(self, qgs_map_layer, ngw_layer_resource, pack_size):
-        ngw_features = []
-        for qgsFeature in qgs_map_layer.getFeatures():
-            ngw_features.append(
-                NGWFeature(
-                    self.createNGWFeatureDictFromQGSFeature(
-                        ngw_layer_resource, qgsFeature, qgs_map_layer
-                    ),
-                    ngw_layer_resource,
-                )
-            )
-
-            if len(ngw_features) == pack_size:
-                yield ngw_features
-                ngw_features = []
-
-        if len(ngw_features) > 0:
-            yield ngw_features
-
-    def createNGWFeatureDictFromQGSFeature(
-        self, ngw_layer_resource, qgs_feature, qgs_map_layer
-    ):
-        feature_dict = {}
-
-        # id need only for update not for create
-        # feature_dict["id"] = qgs_feature.id() + 1 # Fix NGW behavior
-        g = qgs_feature.geometry()
-        g.transform(
-            QgsCoordinateTransform(
-                qgs_map_layer.crs(),
-                QgsCoordinateReferenceSystem.fromEpsgId(
-                    ngw_layer_resource.srs(),
-                ),
-                QgsProject.instance(),
-            )
+        self._layer_status(
+            ngw_layer_resource.display_name,
+            QgsApplication.translate(
+                "QGISResourceJob", "removing all features"
+            ),
         )
-        if ngw_layer_resource.is_geom_multy():
-            g.convertToMultiType()
-        feature_dict["geom"] = get_wkt(g)
-
-        attributes = {}
-        for qgsField in qgs_feature.fields().toList():
-            value = qgs_feature.attribute(qgsField.name())
-            attributes[qgsField.name()] = CompatQt.get_clean_python_value(
-                value
-            )
+        ngw_layer_resource.delete_all_features()
 
-        feature_dict["fields"] = (
-            ngw_layer_resource.construct_ngw_feature_as_json(attributes)
+        writer = NGWFeatureWriter(
+            ngw_layer_resource, progress_callback=update_progress
         )
+        encoder = NGWFeatureEncoder(
+            qgs_map_layer, ngw_layer_resource, writer.geom_format
+        )
+        qgs_features = iter(qgs_map_layer.getFeatures())
+        while True:
+            qgs_features_batch = list(
+                islice(qgs_features, WRITER_MAX_BATCH_FEATURES)
+            )
+            if len(qgs_features_batch) == 0:
+                break
 
-        return feature_dict
+            # Features are encoded once and passed to the writer as is
+            encoded_features = encoder.encode_batch(qgs_features_batch)
+            for index, feature_dict in enumerate(encoded_features):
+                writer.write(feature_dict, qgs_features_batch[index].id())
+        writer.close()
 
 
 class QGISResourcesUploader(QGISResourceJob):
+    max_parallel_layers: int
+
+    __reserved_names: Dict[int, Set[str]]
+    __reserved_names_lock: threading.Lock
+    __layer_upload: threading.local
+
     def __init__(
         self,
         qgs_layer_tree_nodes: List[QgsLayerTreeNode],
         parent_group_resource: NGWGroupResource,
         iface: QgisInterface,
         ngw_version=None,
+        *,
+        max_parallel_layers: int = UPLOAD_LAYERS_WORKERS,
+        build_cog_locally: bool = False,
     ):
-        super().__init__(ngw_version)
+        super().__init__(ngw_version, build_cog_locally=build_cog_locally)
         self.qgs_layer_tree_nodes = qgs_layer_tree_nodes
         self.parent_group_resource = parent_group_resource
         self.iface = iface
+        self.max_parallel_layers = max(1, max_parallel_layers)
+
+        self.__reserved_names = {}
+        self.__reserved_names_lock = threading.Lock()
+        self.__layer_upload = threading.local()
 
     def _do(self):
         self._find_lookup_tables()
@@ -1208,12 +1766,13 @@ class QGISResourcesUploader(QGISResourceJob):
 
         ngw_webmap_root_group = NGWWebMapRoot()
         ngw_webmap_basemaps = []
-        self.process_one_level_of_layers_tree(
-            self.qgs_layer_tree_nodes,
-            self.parent_group_resource,
-            ngw_webmap_root_group,
-            ngw_webmap_basemaps,
-        )
+        with self._prepare_files_ahead():
+            self.process_one_level_of_layers_tree(
+                self.qgs_layer_tree_nodes,
+                self.parent_group_resource,
+                ngw_webmap_root_group,
+                ngw_webmap_basemaps,
+            )
 
         # The group was attached resources,  therefore, it is necessary to upgrade for get children flag
         self.parent_group_resource.update()
@@ -1315,6 +1874,106 @@ class QGISResourcesUploader(QGISResourceJob):
             elif isinstance(node, QgsLayerTreeLayer):
                 collect_value_relations(node)
 
+    @contextmanager
+    def _prepare_files_ahead(self) -> Iterator[None]:
+        """
+        Prepare files of uploaded layers in worker threads while previous
+        layers are uploaded. Layers are still uploaded one by one in the
+        layer tree order.
+
+        Layers are snapshotted here, in the thread owning them. The workers
+        read the snapshots only.
+        """
+
+        def prepare_task(qgs_map_layer: QgsMapLayer) -> Optional[PrepareTask]:
+            if qgs_map_layer.type() == LayerType.Vector:
+                snapshot = VectorLayerSnapshot.from_layer(
+                    cast(QgsVectorLayer, qgs_map_layer)
+                )
+                self._layer_snapshots[snapshot.layer_id] = snapshot
+                return PrepareTask(
+                    qgs_map_layer.id(),
+                    lambda: self.prepareImportVectorFile(snapshot),
+                    lambda result: (
+                        [result.path] if result.is_converted else []
+                    ),
+                )
+
+            if (
+                qgs_map_layer.type() == LayerType.Raster
+                and qgs_map_layer.dataProvider().name() != "wms"
+            ):
+                raster_snapshot = RasterLayerSnapshot.from_layer(
+                    cast(QgsRasterLayer, qgs_map_layer)
+                )
+                self._layer_snapshots[raster_snapshot.layer_id] = (
+                    raster_snapshot
+                )
+                return PrepareTask(
+                    qgs_map_layer.id(),
+                    lambda: self.prepareImportRasterFile(raster_snapshot),
+                    lambda result: [result[1]] if result[0] else [],
+                )
+
+            return None
+
+        def collect_tasks(
+            nodes: Iterable[QgsLayerTreeNode],
+        ) -> Iterator[PrepareTask]:
+            for node in nodes:
+                if not isinstance(node, QgsLayerTreeLayer):
+                    yield from collect_tasks(node.children())
+                    continue
+
+                layer = node.layer()
+                if (
+                    layer is None
+                    or self.isSuitableLayer(layer) != self.SUITABLE_LAYER
+                ):
+                    continue
+
+                task = prepare_task(layer)
+                if task is not None:
+                    yield task
+
+        self._upload_pipeline = UploadPipeline(
+            collect_tasks(self.qgs_layer_tree_nodes)
+        )
+        try:
+            yield
+        finally:
+            self._upload_pipeline.close()
+            self._upload_pipeline = None
+            self._layer_snapshots.clear()
+
+    def unique_resource_name(
+        self, resource_name: str, ngw_group: NGWGroupResource
+    ) -> str:
+        # Layers of one group may be uploaded simultaneously, so names are
+        # reserved for the whole upload. Children are requested outside of
+        # the lock: a resource created after the request has a reserved name
+        children_names = [
+            children.display_name for children in ngw_group.get_children()
+        ]
+        with self.__reserved_names_lock:
+            reserved_names = self.__reserved_names.setdefault(
+                ngw_group.resource_id, set()
+            )
+            unique_resource_name = generate_unique_name(
+                resource_name, [*children_names, *reserved_names]
+            )
+            reserved_names.add(unique_resource_name)
+            return unique_resource_name
+
+    def putAddedResourceToResult(
+        self, ngw_resource: NGWResource, is_main: bool = False
+    ):
+        added_resources = getattr(self.__layer_upload, "resources", None)
+        if added_resources is None:
+            super().putAddedResourceToResult(ngw_resource, is_main)
+            return
+        added_resources.append((ngw_resource, is_main))
+
     def process_one_level_of_layers_tree(
         self,
         qgs_layer_tree_nodes,
@@ -1322,26 +1981,151 @@ class QGISResourcesUploader(QGISResourceJob):
         ngw_webmap_item,
         ngw_webmap_basemaps,
     ):
-        for node in qgs_layer_tree_nodes:
-            if isinstance(node, QgsLayerTreeLayer):
-                if self.isSuitableLayer(node.layer()) != self.SUITABLE_LAYER:
+        """
+        Upload layers of the tree level and of its subgroups.
+
+        Groups and lookup tables must be created beforehand. Layers do not
+        depend on each other, so up to ``max_parallel_layers`` of them are
+        uploaded simultaneously. Vector and raster layers are snapshotted
+        before scheduling, workers read their data, styles and opacity from
+        the snapshots. Resources, webmap items and basemaps are collected in
+        the layer tree order after all uploads are finished. The first
+        upload error is raised after that.
+        """
+        steps: List[Tuple[NGWWebMapItem, Any]] = []
+        ngw_groups: List[NGWGroupResource] = []
+
+        def schedule_level(
+            executor: ThreadPoolExecutor,
+            qgs_layer_tree_nodes: Iterable[QgsLayerTreeNode],
+            ngw_resource_group: NGWGroupResource,
+            ngw_webmap_item: NGWWebMapItem,
+        ) -> None:
+            for node in qgs_layer_tree_nodes:
+                if isinstance(node, QgsLayerTreeLayer):
+                    if (
+                        self.isSuitableLayer(node.layer())
+                        != self.SUITABLE_LAYER
+                    ):
+                        continue
+                    layer = node.layer()
+                    assert layer is not None
+                    if layer.id() not in self._layer_snapshots:
+                        if layer.type() == LayerType.Vector:
+                            self._layer_snapshots[layer.id()] = (
+                                VectorLayerSnapshot.from_layer(
+                                    cast(QgsVectorLayer, layer)
+                                )
+                            )
+                        elif layer.type() == LayerType.Raster:
+                            self._layer_snapshots[layer.id()] = (
+                                RasterLayerSnapshot.from_layer(
+                                    cast(QgsRasterLayer, layer)
+                                )
+                            )
+                    added_resources: List[Tuple[NGWResource, bool]] = []
+                    future = executor.submit(
+                        self.__upload_layer,
+                        ngw_resource_group,
+                        node,
+                        added_resources,
+                    )
+                    steps.append((ngw_webmap_item, (future, added_resources)))
                     continue
-                layer = node.layer()
-                assert layer is not None
-                self.add_layer(
-                    ngw_resource_group,
-                    node,
-                    ngw_webmap_item,
-                    ngw_webmap_basemaps,
+
+                node = cast(QgsLayerTreeGroup, node)
+                ngw_resource_child_group = self._groups[node]
+                ngw_webmap_child_group = NGWWebMapGroup(
+                    ngw_resource_child_group.display_name,
+                    node.isExpanded(),
+                    node.isMutuallyExclusive(),
                 )
-            else:
-                self.add_group(
-                    ngw_resource_group,
-                    node,
-                    ngw_webmap_item,
-                    ngw_webmap_basemaps,
+                steps.append((ngw_webmap_item, ngw_webmap_child_group))
+                ngw_groups.append(ngw_resource_child_group)
+
+                schedule_level(
+                    executor,
+                    node.children(),
+                    ngw_resource_child_group,
+                    ngw_webmap_child_group,
                 )
 
+        with ThreadPoolExecutor(
+            max_workers=self.max_parallel_layers,
+            thread_name_prefix="QGISResourcesUploader",
+        ) as executor:
+            schedule_level(
+                executor,
+                qgs_layer_tree_nodes,
+                ngw_resource_group,
+                ngw_webmap_item,
+            )
+
+        upload_error: Optional[BaseException] = None
+        for ngw_webmap_parent, step in steps:
+            if isinstance(step, NGWWebMapGroup):
+                ngw_webmap_parent.appendChild(step)
+                continue
+
+            future, added_resources = cast(
+                Tuple[Future, List[Tuple[NGWResource, bool]]], step
+            )
+            for ngw_resource, is_main in added_resources:
+                self.putAddedResourceToResult(ngw_resource, is_main)
+
+            error = future.exception()
+            if error is not None:
+                if upload_error is None:
+                    upload_error = error
+                continue
+
+            ngw_webmap_items, ngw_basemaps = future.result()
+            for ngw_webmap_child in ngw_webmap_items.children:
+                ngw_webmap_parent.appendChild(ngw_webmap_child)
+            ngw_webmap_basemaps.extend(ngw_basemaps)
+
+        # in order to update group items: if they have children items they should become expandable
+        for ngw_resource_child_group in ngw_groups:
+            ngw_resource_child_group.update()
+
+        if upload_error is not None:
+            raise upload_error
+
+    def __upload_layer(
+        self,
+        ngw_resource_group: NGWGroupResource,
+        layer_tree_item: QgsLayerTreeLayer,
+        added_resources: List[Tuple[NGWResource, bool]],
+    ) -> Tuple[NGWWebMapRoot, List[NGWResource]]:
+        # Connections are bound to threads, so every worker gets its own
+        # connection and resource factory. Cached resources are not copied
+        res_factory = getattr(self.__layer_upload, "res_factory", None)
+        if res_factory is None:
+            shared_factory = ngw_resource_group.res_factory
+            res_factory = NGWResourceFactory(
+                deepcopy(shared_factory.connection),
+                store=shared_factory.store,
+            )
+            self.__layer_upload.res_factory = res_factory
+        ngw_resource_group = type(ngw_resource_group)(
+            res_factory, deepcopy(ngw_resource_group._json)
+        )
+        ngw_webmap_items = NGWWebMapRoot()
+        ngw_basemaps: List[NGWResource] = []
+
+        self.__layer_upload.resources = added_resources
+        try:
+            self.add_layer(
+                ngw_resource_group,
+                layer_tree_item,
+                ngw_webmap_items,
+                ngw_basemaps,
+            )
+        finally:
+            del self.__layer_upload.resources
+
+        return ngw_webmap_items, ngw_basemaps
+
     def _add_group_tree(self) -> None:
         self.statusChanged.emit(
             QgsApplication.translate(
@@ -1465,24 +2249,28 @@ class QGISResourcesUploader(QGISResourceJob):
             ]:
                 qgs_map_layer = layer_tree_item.layer()
                 assert qgs_map_layer is not None
-                style_manager = qgs_map_layer.styleManager()
-                assert style_manager is not None
-                current_style = style_manager.currentStyle()
-
-                for style_name in style_manager.styles():
-                    ngw_style = self.addStyle(
-                        ngw_resource, qgs_map_layer, style_name
+                snapshot: Union[VectorLayerSnapshot, RasterLayerSnapshot]
+                if ngw_resource.type_id == NGWVectorLayer.type_id:
+                    snapshot = self._layer_snapshot(
+                        cast(QgsVectorLayer, qgs_map_layer)
+                    )
+                else:
+                    snapshot = self._raster_layer_snapshot(
+                        cast(QgsRasterLayer, qgs_map_layer)
                     )
+
+                for style in snapshot.styles:
+                    ngw_style = self.uploadStyle(ngw_resource, style)
                     if ngw_style is None:
                         continue
 
                     self.putAddedResourceToResult(ngw_style)
 
-                    if style_name == current_style:
+                    if style.name == snapshot.current_style:
                         ngw_webmap_item.appendChild(
                             NGWWebMapLayer(
                                 ngw_style.resource_id,
-                                layer_tree_item.layer().name(),
+                                snapshot.name,
                                 is_visible=layer_tree_item.itemVisibilityChecked(),
                                 transparency=None,
                                 legend=layer_tree_item.isExpanded(),
@@ -1500,11 +2288,13 @@ class QGISResourcesUploader(QGISResourceJob):
 
             elif ngw_resource.type_id == NGWWmsLayer.type_id:
                 transparency = None
-                if layer_tree_item.layer().type() == LayerType.Raster:
-                    transparency = (
-                        100
-                        - 100 * layer_tree_item.layer().renderer().opacity()
+                qgs_map_layer = layer_tree_item.layer()
+                assert qgs_map_layer is not None
+                if qgs_map_layer.type() == LayerType.Raster:
+                    raster_snapshot = self._raster_layer_snapshot(
+                        cast(QgsRasterLayer, qgs_map_layer)
                     )
+                    transparency = 100 - 100 * raster_snapshot.opacity
 
                 ngw_webmap_item.appendChild(
                     NGWWebMapLayer(
@@ -1527,31 +2317,6 @@ class QGISResourcesUploader(QGISResourceJob):
             if isinstance(child, NGWQGISVectorStyle):
                 self.updateStyle(qgsLayerTreeItem.layer(), child)
 
-    def add_group(
-        self,
-        ngw_resource_group,
-        qgsLayerTreeGroup: QgsLayerTreeGroup,
-        ngw_webmap_item,
-        ngw_webmap_basemaps,
-    ) -> None:
-        ngw_resource_child_group = self._groups[qgsLayerTreeGroup]
-
-        ngw_webmap_child_group = NGWWebMapGroup(
-            ngw_resource_child_group.display_name,
-            qgsLayerTreeGroup.isExpanded(),
-            qgsLayerTreeGroup.isMutuallyExclusive(),
-        )
-        ngw_webmap_item.appendChild(ngw_webmap_child_group)
-
-        self.process_one_level_of_layers_tree(
-            qgsLayerTreeGroup.children(),
-            ngw_resource_child_group,
-            ngw_webmap_child_group,
-            ngw_webmap_basemaps,
-        )
-
-        ngw_resource_child_group.update()  # in order to update group items: if they have children items they should become expandable
-
 
 class QGISProjectUploader(QGISResourcesUploader):
     """
@@ -1574,10 +2339,18 @@ class QGISProjectUploader(QGISResourcesUploader):
         parent_group_resource: NGWGroupResource,
         iface: QgisInterface,
         ngw_version,
+        *,
+        max_parallel_layers: int = UPLOAD_LAYERS_WORKERS,
+        build_cog_locally: bool = False,
     ) -> None:
         qgs_layer_tree_nodes = QgsProject.instance().layerTreeRoot().children()
         super().__init__(
-            qgs_layer_tree_nodes, parent_group_resource, iface, ngw_version
+            qgs_layer_tree_nodes,
+            parent_group_resource,
+            iface,
+            ngw_version,
+            max_parallel_layers=max_parallel_layers,
+            build_cog_locally=build_cog_locally,
         )
         self.new_group_name = new_group_name
 
@@ -1599,12 +2372,13 @@ class QGISProjectUploader(QGISResourcesUploader):
 
         ngw_webmap_root_group = NGWWebMapRoot()
         ngw_webmap_basemaps = []
-        self.process_one_level_of_layers_tree(
-            self.qgs_layer_tree_nodes,
-            ngw_group_resource,
-            ngw_webmap_root_group,
-            ngw_webmap_basemaps,
-        )
+        with self._prepare_files_ahead():
+            self.process_one_level_of_layers_tree(
+                self.qgs_layer_tree_nodes,
+                ngw_group_resource,
+                ngw_webmap_root_group,
+                ngw_webmap_basemaps,
+            )
 
         ngw_webmap = self.create_webmap(
             ngw_group_resource,
@@ -1812,7 +2586,9 @@ class NGWUpdateVectorLayer(QGISResourceJob):
             f'<b>Replace "{self.ngw_layer.display_name}" layer features</b> from layer "{self.qgis_layer.name()}")'
         )
 
-        def uploadFileCallback(total_size, readed_size, value=None):
+        def uploadFileCallback(
+            total_size, readed_size, value=None, chunk_size=None
+        ):
             self._layer_status(
                 self.qgis_layer.name(),
                 QgsApplication.translate(
@@ -1834,20 +2610,20 @@ class NGWUpdateVectorLayer(QGISResourceJob):
                 f"Vector layer '{self.qgis_layer.name()}' has no suitable geometry"
             )
 
-        filepath, old_fid_name, _ = self.prepareImportVectorFile(
-            self.qgis_layer
+        prepared_file = self.prepareImportVectorFile(
+            VectorLayerSnapshot.from_layer(self.qgis_layer)
         )
-        if filepath is None:
+        if prepared_file.path is None:
             raise JobError(f'Can\'t prepare layer "{self.qgis_layer.name()}"')
 
         connection = self.ngw_layer.res_factory.connection
         vector_file_desc = connection.tus_upload_file(
-            filepath, uploadFileCallback
+            prepared_file.path, uploadFileCallback
         )
 
         fid_fields = ["ngw_id", "id"]
-        if old_fid_name is not None:
-            fid_fields.append(old_fid_name)
+        if prepared_file.old_fid_name is not None:
+            fid_fields.append(prepared_file.old_fid_name)
 
         url = self.ngw_layer.get_absolute_api_url()
         params = dict(
@@ -1858,10 +2634,12 @@ class NGWUpdateVectorLayer(QGISResourceJob):
                 fix_errors="LOSSY",
                 skip_errors=True,
                 skip_other_geometry_types=False,
-                fid_source="AUTO",
+                fid_source=prepared_file.fid_source,
                 fid_field=",".join(fid_fields),
             ),
         )
+        if prepared_file.source_layer is not None:
+            params["vector_layer"]["source_layer"] = prepared_file.source_layer
 
         self._layer_status(
             self.ngw_layer.display_name,
@@ -1870,6 +2648,9 @@ class NGWUpdateVectorLayer(QGISResourceJob):
 
         connection.put(url, params=params, is_lunkwill=True)
 
+        # Fields are recreated with the new source, so the layer cached by
+        # the factory is outdated
+        self.ngw_layer.res_factory.invalidate(self.ngw_layer.resource_id)
         self.ngw_layer = self.ngw_layer.res_factory.get_resource(
             self.ngw_layer.resource_id
         )
@@ -1897,7 +2678,8 @@ class NGWUpdateVectorLayer(QGISResourceJob):
             self.ngw_layer.display_name,
             QgsApplication.translate("QGISResourceJob", "finishing"),
         )
-        os.remove(filepath)
+        if prepared_file.is_converted:
+            os.remove(prepared_file.path)
 
 
 class ResourcesDownloader(QGISResourceJob):
@@ -1912,21 +2694,6 @@ class ResourcesDownloader(QGISResourceJob):
     def _do(self):
         ngw_connection = QgsNgwConnection(self.__connection_id)
         resources_factory = NGWResourceFactory(ngw_connection)
-        for resource_id in self.__resources_id:
-            try:
-                self.result.dangling_resources.append(
-                    resources_factory.get_resource(resource_id)
-                )
-            except NgwError as error:
-                if error.code not in (
-                    ErrorCode.PermissionsError,
-                    ErrorCode.AuthorizationError,
-                ):
-                    raise
-
-                logger.warning(
-                    "An permission error occurred during fetching resource"
-                    f" (id={resource_id})"
-                )
-
-                self.result.not_permitted_resources.append(resource_id)
+        batch = resources_factory.get_resources(self.__resources_id)
+        self.result.dangling_resources.extend(batch.resources)
+        self.result.not_permitted_resources.extend(batch.not_permitted)
@@ -19,12 +19,29 @@
 """
 
 import contextlib
+import inspect
 import json
+import mimetypes
 import time
 import urllib.parse
 from base64 import b64encode
+from collections import deque
 from http import HTTPStatus
-from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple, Union
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+    cast,
+)
 
 from qgis.core import QgsNetworkAccessManager
 from qgis.PyQt.QtCore import (
@@ -37,7 +54,7 @@ from qgis.PyQt.QtCore import (
     QTimer,
     QUrl,
 )
-from qgis.PyQt.QtNetwork import QNetworkRequest
+from qgis.PyQt.QtNetwork import QNetworkAccessManager, QNetworkRequest
 
 from nextgis_connect.exceptions import (
     ErrorCode,
@@ -54,6 +71,11 @@ from nextgis_connect.ngw_connection.ngw_connections_manager import (
 from nextgis_connect.settings import NgConnectSettings
 
 from .compat_qgis import CompatQt
+from .file_upload_cache import FileUploadCache, file_upload_key
+from .http_validation_cache import CachedResponse, HttpValidationCache
+from .mapped_file_region import MappedFileRegion
+from .tus_chunk_size_controller import TusChunkSizeController
+from .tus_upload_state import TusUploadState, TusUploadStateStorage
 
 if TYPE_CHECKING:
     from qgis.PyQt.QtNetwork import QNetworkReply as _QNetworkReply
@@ -69,7 +91,38 @@ GET_VERSION_URL = "/api/component/pyramid/pkg_version"
 TUS_UPLOAD_FILE_URL = "/api/component/file_upload/"
 TUS_VERSION = "1.0.0"
 TUS_CHUNK_SIZE = 16777216
+TUS_MIN_CHUNK_SIZE = 1024 * 1024
+TUS_MAX_CHUNK_SIZE = 256 * 1024 * 1024
+TUS_CHUNK_TARGET_DURATION = 15  # Seconds, much less than CLIENT_TIMEOUT
+TUS_WINDOW_SIZE = 4
 CLIENT_TIMEOUT = 3 * 60 * 1000
+# Qt opens at most 6 parallel HTTP/1.1 connections per host, so there is no
+# point in keeping more requests in flight by default.
+MAX_REQUESTS_IN_FLIGHT = 6
+# Maximum amount of downloaded data buffered in memory before it is written
+# to a file.
+DOWNLOAD_BUFFER_SIZE = 1024 * 1024
+
+
+def is_keyword_accepted(callback: Callable[..., Any], name: str) -> bool:
+    """Check if the callable can be called with the keyword argument"""
+    try:
+        parameters = inspect.signature(callback).parameters.values()
+    except (TypeError, ValueError):
+        return False
+
+    return any(
+        parameter.kind == inspect.Parameter.VAR_KEYWORD
+        or (
+            parameter.name == name
+            and parameter.kind
+            in (
+                inspect.Parameter.POSITIONAL_OR_KEYWORD,
+                inspect.Parameter.KEYWORD_ONLY,
+            )
+        )
+        for parameter in parameters
+    )
 
 
 def is_lunkwill_reply(reply: QNetworkReply) -> bool:
@@ -81,6 +134,116 @@ def is_lunkwill_reply(reply: QNetworkReply) -> bool:
     return header.startswith(lunkwill_type)
 
 
+class NgwReplyFuture:
+    """
+    Pending result of an asynchronous request to NGW.
+
+    Futures are resolved by the event loop of the thread which has created
+    them, so :meth:`result` and :meth:`exception` must be called from the
+    same thread. Both methods wait for the request to finish if needed.
+    """
+
+    sub_url: str
+    method: str
+    status_code: Optional[int]
+
+    def __init__(
+        self,
+        connection: "QgsNgwConnection",
+        sub_url: str,
+        method: str,
+        params: Optional[Any],
+        kwargs: Dict[str, Any],
+    ) -> None:
+        self.sub_url = sub_url
+        self.method = method
+
+        self._connection = connection
+        self._params = params
+        self._kwargs = kwargs
+
+        self.status_code = None
+        self._raw_headers: Dict[bytes, bytes] = {}
+        self._is_lunkwill_summary = False
+
+        # Streaming of response body into a file
+        self._output: Optional[QFile] = None
+        self._progress_callback: Optional[Callable[[int, int], None]] = None
+        self._is_streaming = False
+        self._expected_size = 0
+
+        self._is_done = False
+        self._result: Any = None
+        self._error: Optional[Exception] = None
+        self._done_callbacks: List[Callable[["NgwReplyFuture"], None]] = []
+
+        # Qt objects of the running request. They are kept here to prevent
+        # garbage collection until the reply is finished.
+        self._request: Optional[QNetworkRequest] = None
+        self._reply: Optional[QNetworkReply] = None
+        self._iodevice: Optional[QIODevice] = None
+        self._timer: Optional[QTimer] = None
+
+    def __repr__(self) -> str:
+        state = "done" if self._is_done else "pending"
+        return f"<NgwReplyFuture: {self.method} {self.sub_url} ({state})>"
+
+    def done(self) -> bool:
+        return self._is_done
+
+    def result(self) -> Any:
+        """
+        Return the decoded NGW answer.
+
+        :raises NgwError: If the request has failed.
+        """
+        if not self._is_done:
+            self._connection.wait([self])
+
+        if self._error is not None:
+            raise self._error
+
+        return self._result
+
+    def exception(self) -> Optional[Exception]:
+        if not self._is_done:
+            self._connection.wait([self])
+
+        return self._error
+
+    @property
+    def is_lunkwill_summary(self) -> bool:
+        return self._is_lunkwill_summary
+
+    def raw_header(self, name: str) -> Optional[str]:
+        """Return header of the finished reply or None if it is absent"""
+        value = self._raw_headers.get(name.lower().encode())
+        return value.decode() if value is not None else None
+
+    def add_done_callback(
+        self, callback: Callable[["NgwReplyFuture"], None]
+    ) -> None:
+        if self._is_done:
+            callback(self)
+            return
+
+        self._done_callbacks.append(callback)
+
+    def _resolve(self, result: Any, error: Optional[Exception]) -> None:
+        self._is_done = True
+        self._result = result
+        self._error = error
+
+        callbacks = self._done_callbacks
+        self._done_callbacks = []
+        for callback in callbacks:
+            # Exceptions must not leak into Qt slots
+            try:
+                callback(self)
+            except Exception:
+                logger.exception("Exception in request done callback")
+
+
 class QgsNgwConnection(QObject):
     """NextGIS Web API connection"""
 
@@ -88,6 +251,13 @@ class QgsNgwConnection(QObject):
     __log_network: bool
 
     __ngw_components: Optional[Dict]
+    __tus_supported_extensions: Optional[Set[str]]
+    __http_cache: HttpValidationCache
+    __file_upload_cache: FileUploadCache
+
+    __max_requests_in_flight: int
+    __queued_futures: Deque[NgwReplyFuture]
+    __running_futures: Set[NgwReplyFuture]
 
     def __init__(
         self, connection_id: str, parent: Optional[QObject] = None
@@ -101,6 +271,13 @@ class QgsNgwConnection(QObject):
             raise NgwConnectionError(code=ErrorCode.InvalidConnection)
 
         self.__ngw_components = None
+        self.__tus_supported_extensions = None
+        self.__http_cache = HttpValidationCache.for_connection(connection_id)
+        self.__file_upload_cache = FileUploadCache()
+
+        self.__max_requests_in_flight = MAX_REQUESTS_IN_FLIGHT
+        self.__queued_futures = deque()
+        self.__running_futures = set()
 
     @property
     def server_url(self) -> str:
@@ -113,6 +290,10 @@ class QgsNgwConnection(QObject):
     def connection_id(self) -> str:
         return self.__connection_id
 
+    @property
+    def http_cache(self) -> HttpValidationCache:
+        return self.__http_cache
+
     def get(
         self, sub_url: str, params=None, *, is_lunkwill: bool = False, **kwargs
     ) -> Any:
@@ -148,21 +329,169 @@ class QgsNgwConnection(QObject):
             sub_url, "DELETE", params, is_lunkwill=is_lunkwill, **kwargs
         )
 
+    @property
+    def max_requests_in_flight(self) -> int:
+        return self.__max_requests_in_flight
+
+    @max_requests_in_flight.setter
+    def max_requests_in_flight(self, value: int) -> None:
+        if value < 1:
+            message = "At least one request must be allowed in flight"
+            raise ValueError(message)
+        self.__max_requests_in_flight = value
+        self.__start_queued_requests()
+
+    def request_async(
+        self,
+        method: str,
+        sub_url: str,
+        params=None,
+        *,
+        callback: Optional[Callable[[NgwReplyFuture], None]] = None,
+        output: Optional[QFile] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        **kwargs,
+    ) -> NgwReplyFuture:
+        """
+        Send a request to NGW without waiting for the answer.
+
+        Requests are queued and at most :attr:`max_requests_in_flight` of
+        them are sent at the same time. Lunkwill requests are not supported
+        in asynchronous mode.
+
+        :param method: HTTP method (GET, POST, PATCH, DELETE, etc.).
+        :type method: str
+        :param sub_url: The sub-URL to send the request to.
+        :type sub_url: str
+        :param params: Optional parameters to include in the request.
+        :param callback: Optional function called with the finished future.
+        :type callback: Optional[Callable[[NgwReplyFuture], None]]
+        :param output: Optional opened file to stream successful response
+            body into from its current position. The future is resolved
+            with None in this case.
+        :type output: Optional[QFile]
+        :param progress_callback: Optional function called with total and
+            processed bytes count. It tracks the download when ``output`` is
+            set and the upload of the request body otherwise.
+        :type progress_callback: Optional[Callable[[int, int], None]]
+        :param kwargs: Additional keyword arguments as for :meth:`get`.
+
+        :return: Future resolved with the decoded NGW answer.
+        :rtype: NgwReplyFuture
+        """
+        future = NgwReplyFuture(self, sub_url, method, params, kwargs)
+        future._output = output
+        future._progress_callback = progress_callback
+        if callback is not None:
+            future.add_done_callback(callback)
+
+        self.__queued_futures.append(future)
+        self.__start_queued_requests()
+
+        return future
+
+    def wait(self, futures: Iterable[NgwReplyFuture]) -> None:
+        """
+        Run the event loop until all passed futures are resolved.
+
+        Every running request is guarded by the client timeout, so waiting
+        always ends.
+        """
+        pending = [future for future in futures if not future.done()]
+        if len(pending) == 0:
+            return
+
+        loop = QEventLoop()
+
+        def quit_if_all_done(_: NgwReplyFuture) -> None:
+            if all(future.done() for future in pending):
+                loop.quit()
+
+        for future in pending:
+            future.add_done_callback(quit_if_all_done)
+
+        if not all(future.done() for future in pending):
+            loop.exec()
+
     def download(
         self,
         sub_url: str,
         path: str,
+        *,
+        resume: bool = False,
+        callback: Optional[Callable[[int, int], None]] = None,
         **kwargs,
     ) -> None:
-        data = self.get(sub_url, is_lunkwill=True, **kwargs)
+        """
+        Download response body into a file.
 
+        Data is written to the file as it arrives, so memory usage does not
+        depend on the response size.
+
+        :param sub_url: The sub-URL to download.
+        :type sub_url: str
+        :param path: Path of the target file.
+        :type path: str
+        :param resume: Continue download of a partially downloaded file
+            using HTTP Range request.
+        :type resume: bool
+        :param callback: Optional function called with total and downloaded
+            bytes count.
+        :type callback: Optional[Callable[[int, int], None]]
+
+        :raises NgwError: On network or server error.
+        """
         file = QFile(path)
-        if not file.open(QIODevice.OpenModeFlag.WriteOnly):
+        open_mode = (
+            QIODevice.OpenModeFlag.ReadWrite
+            if resume
+            else QIODevice.OpenModeFlag.WriteOnly
+            | QIODevice.OpenModeFlag.Truncate
+        )
+        if not file.open(open_mode):
             message = "Failed to open file for downloading into it"
             raise RuntimeError(message)
 
-        file.write(data)
-        file.close()
+        try:
+            headers = {"X-Lunkwill": "suggest"}
+            offset = file.size() if resume else 0
+            if offset > 0:
+                headers["Range"] = f"bytes={offset}-"
+                file.seek(offset)
+
+            future = self.request_async(
+                "GET",
+                sub_url,
+                headers=headers,
+                output=file,
+                progress_callback=callback,
+                **kwargs,
+            )
+            error = future.exception()
+            if (
+                error is not None
+                and offset > 0
+                and future.status_code
+                == HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+            ):
+                return  # File is already downloaded
+            if error is not None:
+                raise error
+
+            if future.is_lunkwill_summary:
+                request_id = self.__wait_for_lunkwill(future.result())
+                file.resize(0)
+                file.seek(0)
+                future = self.request_async(
+                    "GET",
+                    f"/api/lunkwill/{request_id}/response",
+                    output=file,
+                    progress_callback=callback,
+                )
+                future.result()
+
+        finally:
+            file.close()
 
     def __request(
         self,
@@ -204,6 +533,7 @@ class QgsNgwConnection(QObject):
         method: str,
         *,
         badata: Optional[QByteArray] = None,
+        device: Optional[QIODevice] = None,
         params: Optional[Any] = None,
         headers: Optional[Dict[str, str]] = None,
         **kwargs,
@@ -217,6 +547,8 @@ class QgsNgwConnection(QObject):
         :type method: str
         :param badata: Optional raw byte data to send in the request body.
         :type badata: Optional[QByteArray]
+        :param device: Optional device to read the request body from.
+        :type device: Optional[QIODevice]
         :param params: Optional parameters to include in the request.
         :type params: Optional[Any]
         :param headers: Optional dictionary of HTTP headers.
@@ -228,6 +560,57 @@ class QgsNgwConnection(QObject):
 
         :raises NgwError: On network or server error.
         """
+        request, iodevice = self.__create_request(
+            sub_url,
+            method,
+            badata=badata,
+            device=device,
+            params=params,
+            headers=headers,
+            **kwargs,
+        )
+
+        loop = QEventLoop()  # loop = QEventLoop(self)
+
+        reply = self.__send_request(request, method, iodevice)
+        reply.finished.connect(loop.quit)
+        if kwargs.get("file") is not None:
+            reply.uploadProgress.connect(self.sendUploadProgress)
+
+        # In our current approach we use QEventLoop to wait QNetworkReply finished() signal. This could lead to infinite loop
+        # in the case when finished() signal 1) is not fired at all or 2) fired right after isFinished() method but before loop.exec_().
+        # We need some kind of guard for that OR we need to use another approach to wait for network replies (e.g. fully asynchronous
+        # approach which is actually should be used when dealing with QNetworkAccessManager).
+        # NOTE: actualy this is also our client timeout for any single request to NGW. We are able to set it to some not-large value because
+        # we use tus uplod for large files => we do not warry that large files will not be uploaded this way.
+        if not reply.isFinished():  # isFinished() checks that finished() is emmited before, but not after this method
+            timer = QTimer()
+            timer.setSingleShot(True)
+            timer.timeout.connect(loop.quit)
+            timer.start(CLIENT_TIMEOUT)
+
+            loop.exec()
+        del loop
+
+        if iodevice is not None:
+            iodevice.close()
+
+        self.__check_network_error(request, reply)
+
+        return request, reply
+
+    def __create_request(
+        self,
+        sub_url: str,
+        method: str,
+        *,
+        badata: Optional[QByteArray] = None,
+        device: Optional[QIODevice] = None,
+        params: Optional[Any] = None,
+        headers: Optional[Dict[str, str]] = None,
+        use_cache: bool = True,
+        **kwargs,
+    ) -> Tuple[QNetworkRequest, Optional[QIODevice]]:
         json_data = None
         if params:
             if isinstance(params, str):
@@ -250,7 +633,9 @@ class QgsNgwConnection(QObject):
                     json_data,
                     headers,
                     filename if filename else "-",
-                    badata.size() if badata else "-",
+                    badata.size()
+                    if badata
+                    else (device.size() if device else "-"),
                 )
             )
 
@@ -272,9 +657,16 @@ class QgsNgwConnection(QObject):
             for name, value in list(headers.items()):
                 request.setRawHeader(name.encode(), value.encode())
 
+        if method != "GET":
+            self.__http_cache.invalidate(request.url().toString())
+        elif use_cache and not request.hasRawHeader(b"Range"):
+            self.__add_validators(request)
+
         iodevice = None  # default to None, not to "QBuffer(QByteArray())" - otherwise random crashes at post() in QGIS 3
         if badata is not None:
             iodevice = QBuffer(badata)
+        elif device is not None:
+            iodevice = device
         elif filename is not None:
             iodevice = QFile(filename)
         elif json_data is not None:
@@ -285,10 +677,73 @@ class QgsNgwConnection(QObject):
             json_data = QByteArray(json_data.encode())
             iodevice = QBuffer(json_data)
 
-        if iodevice is not None:
+        if iodevice is not None and not iodevice.isOpen():
             iodevice.open(QIODevice.OpenModeFlag.ReadOnly)
 
-        loop = QEventLoop()  # loop = QEventLoop(self)
+        return request, iodevice
+
+    def __add_validators(self, request: QNetworkRequest) -> None:
+        # Make request conditional if the response is cached. The cached
+        # response is attached to the request, so it is available on 304
+        # even if it is evicted from the cache in the meantime.
+        cached_response = self.__http_cache.get(request.url().toString())
+        if cached_response is None:
+            return
+
+        if cached_response.etag is not None:
+            request.setRawHeader(
+                b"If-None-Match", cached_response.etag.encode()
+            )
+        if cached_response.last_modified is not None:
+            request.setRawHeader(
+                b"If-Modified-Since", cached_response.last_modified.encode()
+            )
+        request.setAttribute(QNetworkRequest.Attribute.User, cached_response)
+
+    def __cache_response(
+        self,
+        request: QNetworkRequest,
+        reply: QNetworkReply,
+        data: QByteArray,
+    ) -> None:
+        if (
+            reply.operation() != QNetworkAccessManager.Operation.GetOperation
+            or reply.attribute(
+                QNetworkRequest.Attribute.HttpStatusCodeAttribute
+            )
+            != HTTPStatus.OK
+            or is_lunkwill_reply(reply)
+        ):
+            return
+
+        etag = None
+        if reply.hasRawHeader(b"ETag"):
+            etag = bytes(reply.rawHeader(b"ETag")).decode()
+        last_modified = None
+        if reply.hasRawHeader(b"Last-Modified"):
+            last_modified = bytes(reply.rawHeader(b"Last-Modified")).decode()
+        if etag is None and last_modified is None:
+            return
+
+        content_type = reply.header(
+            QNetworkRequest.KnownHeaders.ContentTypeHeader
+        )
+        self.__http_cache.put(
+            request.url().toString(),
+            CachedResponse(
+                etag,
+                last_modified,
+                content_type if isinstance(content_type, str) else None,
+                data.data(),
+            ),
+        )
+
+    def __send_request(
+        self,
+        request: QNetworkRequest,
+        method: str,
+        iodevice: Optional[QIODevice],
+    ) -> QNetworkReply:
         nam = QgsNetworkAccessManager.instance()
 
         if CompatQt.has_redirect_policy():
@@ -310,28 +765,11 @@ class QgsNgwConnection(QObject):
 
         assert isinstance(reply, QNetworkReply)
 
-        reply.finished.connect(loop.quit)
-        if filename is not None:
-            reply.uploadProgress.connect(self.sendUploadProgress)
-
-        # In our current approach we use QEventLoop to wait QNetworkReply finished() signal. This could lead to infinite loop
-        # in the case when finished() signal 1) is not fired at all or 2) fired right after isFinished() method but before loop.exec_().
-        # We need some kind of guard for that OR we need to use another approach to wait for network replies (e.g. fully asynchronous
-        # approach which is actually should be used when dealing with QNetworkAccessManager).
-        # NOTE: actualy this is also our client timeout for any single request to NGW. We are able to set it to some not-large value because
-        # we use tus uplod for large files => we do not warry that large files will not be uploaded this way.
-        if not reply.isFinished():  # isFinished() checks that finished() is emmited before, but not after this method
-            timer = QTimer()
-            timer.setSingleShot(True)
-            timer.timeout.connect(loop.quit)
-            timer.start(CLIENT_TIMEOUT)
-
-            loop.exec()
-        del loop
-
-        if iodevice is not None:
-            iodevice.close()
+        return reply
 
+    def __check_network_error(
+        self, request: QNetworkRequest, reply: QNetworkReply
+    ) -> None:
         # Indicate that request has been timed out by QGIS.
         # TODO: maybe use QgsNetworkAccessManager::requestTimedOut()?
         if reply.error() == QNetworkReply.NetworkError.OperationCanceledError:
@@ -366,7 +804,162 @@ class QgsNgwConnection(QObject):
             qt_error_info.add_exception_notes(error)
             raise error
 
-        return request, reply
+    def __start_queued_requests(self) -> None:
+        while (
+            len(self.__queued_futures) > 0
+            and len(self.__running_futures) < self.__max_requests_in_flight
+        ):
+            future = self.__queued_futures.popleft()
+            self.__running_futures.add(future)
+            try:
+                self.__start_async_request(future)
+            except Exception as error:
+                self.__running_futures.discard(future)
+                future._resolve(None, error)
+
+    def __start_async_request(self, future: NgwReplyFuture) -> None:
+        request, iodevice = self.__create_request(
+            future.sub_url,
+            future.method,
+            params=future._params,
+            use_cache=future._output is None,
+            **future._kwargs,
+        )
+        reply = self.__send_request(request, future.method, iodevice)
+
+        # Client timeout for a single request. Aborted reply finishes with
+        # OperationCanceledError.
+        timer = QTimer()
+        timer.setSingleShot(True)
+        timer.timeout.connect(reply.abort)
+
+        future._request = request
+        future._reply = reply
+        future._iodevice = iodevice
+        future._timer = timer
+
+        if future._output is not None:
+            reply.setReadBufferSize(DOWNLOAD_BUFFER_SIZE)
+            reply.readyRead.connect(
+                lambda: self.__on_async_reply_ready_read(future)
+            )
+        elif future._progress_callback is not None:
+            reply.uploadProgress.connect(
+                lambda sent, total: self.__send_async_progress(
+                    future, sent, total
+                )
+            )
+
+        reply.finished.connect(lambda: self.__on_async_reply_finished(future))
+        if reply.isFinished():
+            self.__on_async_reply_finished(future)
+            return
+
+        timer.start(CLIENT_TIMEOUT)
+
+    def __on_async_reply_ready_read(self, future: NgwReplyFuture) -> None:
+        reply = future._reply
+        output = future._output
+        if reply is None or output is None:
+            return
+
+        if not future._is_streaming:
+            # Error answers and lunkwill summaries are decoded as usual
+            status_code = reply.attribute(
+                QNetworkRequest.Attribute.HttpStatusCodeAttribute
+            )
+            if status_code not in (
+                HTTPStatus.OK,
+                HTTPStatus.PARTIAL_CONTENT,
+            ) or is_lunkwill_reply(reply):
+                return
+
+            if status_code == HTTPStatus.OK and output.pos() > 0:
+                # Range header is ignored by server
+                output.resize(0)
+                output.seek(0)
+
+            content_length = reply.header(
+                QNetworkRequest.KnownHeaders.ContentLengthHeader
+            )
+            if content_length is not None:
+                future._expected_size = output.pos() + int(content_length)
+            future._is_streaming = True
+
+        # Client timeout is counted from the last received data for
+        # streamed replies
+        if future._timer is not None:
+            future._timer.start(CLIENT_TIMEOUT)
+
+        data = reply.readAll()
+        if output.write(data) != data.size():
+            reply.abort()
+            return
+
+        self.__send_async_progress(future, output.pos(), future._expected_size)
+
+    def __send_async_progress(
+        self, future: NgwReplyFuture, processed: int, total: int
+    ) -> None:
+        if future._progress_callback is None or processed == 0 or total <= 0:
+            return
+
+        try:
+            future._progress_callback(total, processed)
+        except Exception:
+            logger.exception("Exception in progress callback")
+
+    def __on_async_reply_finished(self, future: NgwReplyFuture) -> None:
+        reply = future._reply
+        if reply is None:
+            return  # Already handled
+
+        if future._output is not None:
+            self.__on_async_reply_ready_read(future)
+
+        request = future._request
+        assert request is not None
+        assert future._timer is not None
+        future._timer.stop()
+        if future._iodevice is not None:
+            future._iodevice.close()
+
+        future.status_code = reply.attribute(
+            QNetworkRequest.Attribute.HttpStatusCodeAttribute
+        )
+        future._raw_headers = {
+            bytes(name).lower(): bytes(reply.rawHeader(name))
+            for name in reply.rawHeaderList()
+        }
+        future._is_lunkwill_summary = is_lunkwill_reply(reply)
+
+        result = None
+        error = None
+        try:
+            self.__check_network_error(request, reply)
+            if not future._is_streaming:
+                result = self.__decode_reply(request, reply)
+            elif reply.error() != QNetworkReply.NetworkError.NoError:  # type: ignore
+                error = NgwError("Download has been interrupted")
+                error.add_note(f"URL: {request.url().toString()}")
+                raise error
+        except Exception as exception:
+            error = exception
+
+        reply.deleteLater()
+        future._request = None
+        future._reply = None
+        future._iodevice = None
+        future._timer = None
+
+        if self.__log_network and isinstance(result, (dict, list)):
+            escaped_result = escape_html(format_container_data(result))
+            logger.debug(f"\nReply:\n{escaped_result}\n")
+
+        self.__running_futures.discard(future)
+        self.__start_queued_requests()
+
+        future._resolve(result, error)
 
     def __request_and_decode(
         self, sub_url, method, params=None, headers=None, **kwargs
@@ -380,16 +973,33 @@ class QgsNgwConnection(QObject):
             **kwargs,
         )
 
+        return reply, self.__decode_reply(request, reply)
+
+    def __decode_reply(
+        self, request: QNetworkRequest, reply: QNetworkReply
+    ) -> Any:
         status_code = reply.attribute(
             QNetworkRequest.Attribute.HttpStatusCodeAttribute
         )
+        cached_response = request.attribute(QNetworkRequest.Attribute.User)
+        if status_code == HTTPStatus.NOT_MODIFIED and isinstance(
+            cached_response, CachedResponse
+        ):
+            if self.__log_network:
+                logger.debug("Response is not modified, cached body is used")
+            return self.__parse_data(
+                QByteArray(cached_response.body),
+                cached_response.content_type,
+                is_lunkwill_summary=False,
+            )
+
         if (
             reply.error() != QNetworkReply.NetworkError.NoError  # type: ignore
             or (status_code is not None and status_code // 100 != 2)
         ):
             data = None
             with contextlib.suppress(Exception):
-                data = self.__extract_data(reply)
+                data = self.__extract_data(request, reply)
 
             if self.__log_network:
                 logger.debug(f"Response error\nstatus_code {status_code}")
@@ -414,7 +1024,7 @@ class QgsNgwConnection(QObject):
             raise error
 
         try:
-            response_data = self.__extract_data(reply)
+            response_data = self.__extract_data(request, reply)
 
         except NgConnectError:
             raise
@@ -422,13 +1032,102 @@ class QgsNgwConnection(QObject):
             message = "Extracting data error"
             raise NgConnectError(message) from error
 
-        return reply, response_data
+        return response_data
 
     def upload_file(self, filename, callback):
+        file_key, file_upload = self.__find_file_upload(filename)
+        if file_upload is not None:
+            return file_upload
+
         self.uploadProgressCallback = callback
-        return self.put(UPLOAD_FILE_URL, file=filename)
+        file_upload = self.put(UPLOAD_FILE_URL, file=filename)
+        self.__save_file_upload(file_key, file_upload)
+        return file_upload
 
-    def tus_upload_file(self, filename: str, callback: Any) -> Any:
+    def upload_file_async(
+        self,
+        filename: str,
+        *,
+        callback: Optional[Callable[[NgwReplyFuture], None]] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> NgwReplyFuture:
+        """
+        Upload a small file with one request without waiting for the answer.
+
+        Content uploaded before is not sent again, as in
+        :meth:`tus_upload_file`. Whether the server still has the file is
+        checked with an asynchronous request too. The future is resolved
+        with the file_upload descriptor.
+
+        :param filename: Path to the file to upload.
+        :type filename: str
+        :param callback: Optional function called with the finished future.
+        :type callback: Optional[Callable[[NgwReplyFuture], None]]
+        :param progress_callback: Optional function called with total and
+            uploaded bytes count.
+        :type progress_callback: Optional[Callable[[int, int], None]]
+
+        :return: Future resolved with the file_upload descriptor.
+        :rtype: NgwReplyFuture
+        """
+        file_key, file_upload = self.__cached_file_upload(filename)
+
+        # Resolved by the upload or by the check of the cached descriptor
+        future = NgwReplyFuture(
+            self, UPLOAD_FILE_URL, "PUT", None, dict(file=filename)
+        )
+        if callback is not None:
+            future.add_done_callback(callback)
+
+        def on_uploaded(upload_future: NgwReplyFuture) -> None:
+            error = upload_future.exception()
+            if error is not None:
+                future._resolve(None, error)
+                return
+            self.__save_file_upload(file_key, upload_future.result())
+            future._resolve(upload_future.result(), None)
+
+        def upload() -> None:
+            self.request_async(
+                "PUT",
+                UPLOAD_FILE_URL,
+                callback=on_uploaded,
+                progress_callback=progress_callback,
+                file=filename,
+            )
+
+        if file_upload is None:
+            upload()
+            return future
+
+        def on_checked(check_future: NgwReplyFuture) -> None:
+            if check_future.exception() is None:
+                logger.debug(
+                    f"Content of {filename} has already been uploaded"
+                )
+                future._resolve(file_upload, None)
+                return
+
+            self.__file_upload_cache.remove(self.__connection_id, file_key)
+            try:
+                upload()
+            except Exception as error:
+                future._resolve(None, error)
+
+        self.request_async(
+            "GET", f"{UPLOAD_FILE_URL}{file_upload['id']}", callback=on_checked
+        )
+        return future
+
+    def tus_upload_file(
+        self,
+        filename: str,
+        callback: Any,
+        *,
+        window_size: int = TUS_WINDOW_SIZE,
+        min_chunk_size: int = TUS_MIN_CHUNK_SIZE,
+        max_chunk_size: int = TUS_MAX_CHUNK_SIZE,
+    ) -> Any:
         """
         Implements tus protocol to upload a file to NGW.
         Note: This method internally uses self methods to send synchronous
@@ -438,10 +1137,37 @@ class QgsNgwConnection(QObject):
         This method uploads a file in chunks using the TUS protocol, providing
         progress updates via the callback. Raises an exception if the upload fails.
 
+        If the server supports tus "concatenation" extension, up to
+        ``window_size`` chunks are uploaded concurrently as partial uploads
+        which are concatenated on the server at the end. Otherwise chunks are
+        sent one after another. NextGIS Web does not advertise the extension,
+        so uploads to it are always sequential.
+
+        State of sequential uploads is saved locally after every chunk, so
+        an interrupted upload of the same unchanged file continues from the
+        offset confirmed by the server.
+
+        Content uploaded before, within the retention period of uploaded
+        files, is not sent again: the descriptor of the previous upload is
+        returned if the server still has the file. Large files are not
+        hashed for this, so only uploads of the same unchanged file are
+        reused for them.
+
+        Sequential uploads adapt chunk size to the measured throughput
+        within ``min_chunk_size`` and ``max_chunk_size`` bounds. The chosen
+        size is passed to the callback as ``chunk_size`` keyword argument if
+        the callback accepts it.
+
         :param filename: Path to the file to upload.
         :type filename: str
         :param callback: Callback function for upload progress.
         :type callback: Any
+        :param window_size: Maximum number of chunks uploaded concurrently.
+        :type window_size: int
+        :param min_chunk_size: Lower bound of sequential upload chunk size.
+        :type min_chunk_size: int
+        :param max_chunk_size: Upper bound of sequential upload chunk size.
+        :type max_chunk_size: int
 
         :return: NGW server response after successful upload.
         :rtype: Any
@@ -449,6 +1175,11 @@ class QgsNgwConnection(QObject):
         :raises Exception: If file cannot be opened or upload fails.
         :raises NGWError: If the server returns an error.
         """
+        file_key, file_upload = self.__find_file_upload(filename)
+        if file_upload is not None:
+            callback(1, 1, 100)
+            return file_upload
+
         callback(
             0, 0, 0
         )  # show in the progress bar that 0% is loaded currently
@@ -459,16 +1190,136 @@ class QgsNgwConnection(QObject):
             raise Exception("Failed to open file for tus upload")
         file_size = file.size()
 
+        encoded_filename = b64encode(file.fileName().encode()).decode()
+        upload_metadata = f"name {encoded_filename}"
+
+        states_storage = TusUploadStateStorage()
+        upload_state = states_storage.find(self.__connection_id, filename)
+
+        is_concatenation_used = (
+            upload_state is None
+            and window_size > 1
+            and file_size > TUS_CHUNK_SIZE
+            and "concatenation" in self.__tus_extensions()
+        )
+
+        try:
+            if is_concatenation_used:
+                file_upload_url = self.__tus_upload_concatenated(
+                    file, upload_metadata, window_size
+                )
+            else:
+                chunk_size_controller = TusChunkSizeController(
+                    TUS_CHUNK_SIZE,
+                    min_chunk_size,
+                    max_chunk_size,
+                    TUS_CHUNK_TARGET_DURATION,
+                )
+                file_upload_url = self.__tus_upload_sequentially(
+                    file,
+                    upload_metadata,
+                    states_storage,
+                    upload_state,
+                    chunk_size_controller,
+                )
+        finally:
+            file.close()
+
+        callback(1, 1, 100)  # show in the progress bar that 100% is loaded
+
+        # Finally GET and return NGW result of uploaded file.
+        file_upload = self.get(file_upload_url)
+        self.__save_file_upload(file_key, file_upload)
+        return file_upload
+
+    def __cached_file_upload(
+        self, filename: str
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Find descriptor of content uploaded before without requests to the
+        server. The descriptor describes the passed file, not the one it
+        was uploaded from
+        """
+        file_key = file_upload_key(filename)
+        file_upload = self.__file_upload_cache.find(
+            self.__connection_id, file_key
+        )
+        if file_upload is None or "id" not in file_upload:
+            return file_key, None
+
+        mime_type, _ = mimetypes.guess_type(filename)
+        return file_key, dict(
+            file_upload,
+            name=Path(filename).name,
+            mime_type=mime_type or file_upload.get("mime_type"),
+        )
+
+    def __find_file_upload(
+        self, filename: str
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        file_key, file_upload = self.__cached_file_upload(filename)
+        if file_upload is None:
+            return file_key, None
+
+        # Make sure the server has not removed the file yet
+        try:
+            self.get(f"{UPLOAD_FILE_URL}{file_upload['id']}")
+        except NgwError:
+            self.__file_upload_cache.remove(self.__connection_id, file_key)
+            return file_key, None
+
+        logger.debug(f"Content of {filename} has already been uploaded")
+        return file_key, file_upload
+
+    def __save_file_upload(self, file_key: str, file_upload: Any) -> None:
+        if not isinstance(file_upload, dict) or "id" not in file_upload:
+            return
+        self.__file_upload_cache.save(
+            self.__connection_id, file_key, file_upload
+        )
+
+    def __tus_extensions(self) -> Set[str]:
+        if self.__tus_supported_extensions is not None:
+            return self.__tus_supported_extensions
+
+        extensions: Set[str] = set()
+        try:
+            _, options_rep = self.__request_rep(
+                TUS_UPLOAD_FILE_URL,
+                "OPTIONS",
+                headers={"Tus-Resumable": TUS_VERSION},
+            )
+        except NgwError:
+            logger.debug("Failed to request supported tus extensions")
+        else:
+            extensions_hdr = bytes(
+                options_rep.rawHeader(b"Tus-Extension")
+            ).decode()
+            extensions = {
+                extension.strip()
+                for extension in extensions_hdr.split(",")
+                if len(extension.strip()) > 0
+            }
+            options_rep.deleteLater()
+            del options_rep
+
+        self.__tus_supported_extensions = extensions
+        return extensions
+
+    def __tus_create(
+        self, headers: Dict[str, str], upload_length: Optional[int]
+    ) -> str:
         # Initiate upload process by sending specific "create" request with a
         # void body.
-        encoded_filename = b64encode(file.fileName().encode()).decode()
         create_hdrs = {
             "Tus-Resumable": TUS_VERSION,
             "Content-Length": "0",
             #'Upload-Defer-Length': ,
-            "Upload-Length": str(file_size),
-            "Upload-Metadata": f"name {encoded_filename}",
+            **headers,
         }
+        if upload_length is not None:
+            create_hdrs["Upload-Length"] = str(upload_length)
+
         create_req, create_rep = self.__request_rep(
             TUS_UPLOAD_FILE_URL, "POST", headers=create_hdrs
         )
@@ -491,12 +1342,72 @@ class QgsNgwConnection(QObject):
         del create_rep
 
         file_guid = location.split("/")[-1]
-        file_upload_url = TUS_UPLOAD_FILE_URL + file_guid
-        max_retry_count = 3
+        return TUS_UPLOAD_FILE_URL + file_guid
+
+    def __tus_upload_offset(self, file_upload_url: str) -> Optional[int]:
+        """Return offset of unfinished upload or None if it is unknown"""
+        head_req, head_rep = self.__request_rep(
+            file_upload_url, "HEAD", headers={"Tus-Resumable": TUS_VERSION}
+        )
+        head_rep_code = head_rep.attribute(
+            QNetworkRequest.Attribute.HttpStatusCodeAttribute
+        )
+        offset_hdr = bytes(head_rep.rawHeader(b"Upload-Offset")).decode()
+        head_rep.deleteLater()
+        del head_rep
+
+        if head_rep_code is not None and head_rep_code // 100 == 4:
+            return None
+        if head_rep_code != 200:
+            raise Exception("Failed to get tus upload offset")
+
+        return int(offset_hdr) if offset_hdr.isdigit() else None
+
+    def __tus_upload_sequentially(
+        self,
+        file: QFile,
+        upload_metadata: str,
+        states_storage: TusUploadStateStorage,
+        upload_state: Optional[TusUploadState],
+        chunk_size_controller: TusChunkSizeController,
+    ) -> str:
+        file_size = file.size()
         bytes_sent = 0
 
+        if upload_state is not None:
+            server_offset = self.__tus_upload_offset(upload_state.upload_url)
+            if server_offset is None or server_offset > file_size:
+                states_storage.remove(upload_state)
+                upload_state = None
+            else:
+                bytes_sent = server_offset
+                logger.debug(
+                    f"Resume tus upload of {file.fileName()} from"
+                    f" {bytes_sent} of {file_size} bytes"
+                )
+
+        if upload_state is None:
+            upload_state = TusUploadState.for_file(
+                self.__connection_id,
+                file.fileName(),
+                self.__tus_create(
+                    {"Upload-Metadata": upload_metadata}, file_size
+                ),
+            )
+            states_storage.save(upload_state)
+
+        file_upload_url = upload_state.upload_url
+        file_guid = file_upload_url.split("/")[-1]
+
+        max_retry_count = 3
+
         is_file_large = (file_size / TUS_CHUNK_SIZE) > 10
 
+        # Callbacks written before chunk size reporting take two arguments
+        is_chunk_size_reported = is_keyword_accepted(
+            self.uploadProgressCallback, "chunk_size"
+        )
+
         # Allow to skip logging of PATCH requests. Helpful when a large file is being uploaded.
         # Note: QGIS 3 has a hardcoded limit of log messages.
         if self.__log_network and is_file_large:
@@ -504,32 +1415,46 @@ class QgsNgwConnection(QObject):
                 f'Skip PATCH requests logging during uploading of file "{file_guid}"'
             )
 
-        # Upload file chunk-by-chunk.
+        # Upload file chunk-by-chunk. Chunks are read from memory-mapped
+        # file regions, so a whole chunk is never held in Python objects.
         while True:
-            badata = QByteArray(file.read(TUS_CHUNK_SIZE))
-            if badata.isEmpty():  # end of data OR some error
+            chunk_size = chunk_size_controller.chunk_size
+            if file_size - bytes_sent <= 0:  # end of data
                 break
-            bytes_read = badata.size()
 
             if self.__log_network and not is_file_large:
                 logger.debug(f"Upload {bytes_sent} from {file_size}")
-            self.sendUploadProgress(bytes_sent, file_size)
+            if bytes_sent != 0 and file_size != 0:
+                if is_chunk_size_reported:
+                    self.uploadProgressCallback(
+                        file_size, bytes_sent, chunk_size=chunk_size
+                    )
+                else:
+                    self.uploadProgressCallback(file_size, bytes_sent)
 
-            chunk_hdrs = {
-                "Tus-Resumable": TUS_VERSION,
-                "Content-Type": "application/offset+octet-stream",
-                "Content-Length": str(bytes_read),
-                "Upload-Offset": str(bytes_sent),
-            }
             retries = 0
             while retries < max_retry_count:
                 if retries > 0:
                     logger.debug(f"Retrying. Attempt №{retries}")
 
+                # Chunk is read again on every attempt, so a retry sends
+                # the chunk size reduced after the failure
+                bytes_read = min(
+                    chunk_size_controller.chunk_size, file_size - bytes_sent
+                )
+                chunk_hdrs = {
+                    "Tus-Resumable": TUS_VERSION,
+                    "Content-Type": "application/offset+octet-stream",
+                    "Content-Length": str(bytes_read),
+                    "Upload-Offset": str(bytes_sent),
+                }
+                chunk_started_at = time.monotonic()
                 chunk_request, chunk_reply = self.__request_rep(
                     file_upload_url,
                     "PATCH",
-                    badata=badata,
+                    device=MappedFileRegion(
+                        file.fileName(), bytes_sent, bytes_read
+                    ),
                     headers=chunk_hdrs,
                 )
                 chunk_rep_code = chunk_reply.attribute(
@@ -549,7 +1474,11 @@ class QgsNgwConnection(QObject):
                 chunk_reply.deleteLater()
                 del chunk_reply
                 if chunk_rep_code == 204:
+                    chunk_size_controller.chunk_sent(
+                        bytes_read, time.monotonic() - chunk_started_at
+                    )
                     break
+                chunk_size_controller.chunk_failed()
                 retries += 1
 
             if retries == max_retry_count:
@@ -559,21 +1488,251 @@ class QgsNgwConnection(QObject):
                 break
 
             bytes_sent += bytes_read
+            upload_state.offset = bytes_sent
+            states_storage.save(upload_state)
+
             if self.__log_network and not is_file_large:
                 logger.debug(
                     f"Tus-uploaded chunk of {bytes_read} bytes. Now "
                     f"{bytes_sent} of overall {file_size} bytes are uploaded"
                 )
 
-        file.close()
-
         if bytes_sent < file_size:
             raise Exception("Failed to upload file via tus")
 
-        callback(1, 1, 100)  # show in the progress bar that 100% is loaded
+        states_storage.remove(upload_state)
 
-        # Finally GET and return NGW result of uploaded file.
-        return self.get(file_upload_url)
+        return file_upload_url
+
+    def __tus_upload_concatenated(
+        self, file: QFile, upload_metadata: str, window_size: int
+    ) -> str:
+        """
+        Upload every chunk as a tus partial upload keeping up to
+        ``window_size`` chunks in flight, then concatenate them.
+
+        Progress is reported for the uploaded part of the file which starts
+        at offset 0 and has no gaps. A failed chunk is resumed from the
+        offset of its partial upload. Partial uploads which can't be used
+        are deleted if the server supports tus "termination" extension.
+        """
+        file_size = file.size()
+        chunks_count = (file_size + TUS_CHUNK_SIZE - 1) // TUS_CHUNK_SIZE
+        max_retry_count = 3
+
+        if self.__log_network:
+            logger.debug(
+                f"Upload {chunks_count} chunks with window of {window_size}"
+            )
+
+        partial_urls: List[Optional[str]] = [None] * chunks_count
+        # Partial uploads existing on the server
+        created_urls: Set[str] = set()
+        is_termination_supported = "termination" in self.__tus_extensions()
+        errors: List[Exception] = []
+        next_chunk = 0
+        chunks_in_flight = 0
+        uploaded_prefix = 0  # Number of uploaded chunks without gaps
+
+        loop = QEventLoop()
+
+        def chunk_range(index: int) -> Tuple[int, int]:
+            offset = index * TUS_CHUNK_SIZE
+            return offset, min(TUS_CHUNK_SIZE, file_size - offset)
+
+        def start_next_chunks() -> None:
+            nonlocal next_chunk, chunks_in_flight
+            while (
+                len(errors) == 0
+                and chunks_in_flight < window_size
+                and next_chunk < chunks_count
+            ):
+                chunks_in_flight += 1
+                next_chunk += 1
+                start_chunk(next_chunk - 1, retries=0)
+
+            if chunks_in_flight == 0:
+                loop.quit()
+
+        def start_chunk(index: int, retries: int) -> None:
+            _, size = chunk_range(index)
+            create_hdrs = {
+                "Tus-Resumable": TUS_VERSION,
+                "Content-Length": "0",
+                "Upload-Length": str(size),
+                "Upload-Concat": "partial",
+                "Upload-Metadata": upload_metadata,
+            }
+            self.request_async(
+                "POST",
+                TUS_UPLOAD_FILE_URL,
+                headers=create_hdrs,
+                callback=lambda future: on_chunk_created(
+                    index, retries, future
+                ),
+            )
+
+        def on_chunk_created(
+            index: int, retries: int, future: NgwReplyFuture
+        ) -> None:
+            location = future.raw_header("Location")
+            if (
+                future.exception() is not None
+                or future.status_code != 201
+                or location is None
+            ):
+                retry_chunk(index, retries, future, None)
+                return
+
+            partial_url = TUS_UPLOAD_FILE_URL + location.split("/")[-1]
+            created_urls.add(partial_url)
+            patch_chunk(index, retries, partial_url, 0)
+
+        def patch_chunk(
+            index: int, retries: int, partial_url: str, chunk_offset: int
+        ) -> None:
+            nonlocal chunks_in_flight
+            offset, size = chunk_range(index)
+
+            chunk_hdrs = {
+                "Tus-Resumable": TUS_VERSION,
+                "Content-Type": "application/offset+octet-stream",
+                "Content-Length": str(size - chunk_offset),
+                "Upload-Offset": str(chunk_offset),
+            }
+            try:
+                device = MappedFileRegion(
+                    file.fileName(), offset + chunk_offset, size - chunk_offset
+                )
+            except OSError as error:
+                errors.append(error)
+                chunks_in_flight -= 1
+                start_next_chunks()
+                return
+
+            self.request_async(
+                "PATCH",
+                partial_url,
+                device=device,
+                headers=chunk_hdrs,
+                callback=lambda future: on_chunk_patched(
+                    index, retries, partial_url, future
+                ),
+            )
+
+        def on_chunk_patched(
+            index: int,
+            retries: int,
+            partial_url: str,
+            future: NgwReplyFuture,
+        ) -> None:
+            nonlocal chunks_in_flight, uploaded_prefix
+            if future.exception() is not None or future.status_code != 204:
+                retry_chunk(index, retries, future, partial_url)
+                return
+
+            partial_urls[index] = partial_url
+            chunks_in_flight -= 1
+
+            while (
+                uploaded_prefix < chunks_count
+                and partial_urls[uploaded_prefix] is not None
+            ):
+                uploaded_prefix += 1
+            bytes_sent = min(uploaded_prefix * TUS_CHUNK_SIZE, file_size)
+            self.sendUploadProgress(bytes_sent, file_size)
+
+            start_next_chunks()
+
+        def retry_chunk(
+            index: int,
+            retries: int,
+            future: NgwReplyFuture,
+            partial_url: Optional[str],
+        ) -> None:
+            nonlocal chunks_in_flight
+            logger.warning("An error occurred during uploading file")
+            logger.debug(f"HTTP Status code: {future.status_code}")
+
+            retries += 1
+            if retries < max_retry_count and len(errors) == 0:
+                logger.debug(f"Retrying. Attempt №{retries}")
+                if partial_url is None:
+                    start_chunk(index, retries)
+                else:
+                    resume_chunk(index, retries, partial_url)
+                return
+
+            logger.error(
+                "Maximum number of attempts reached. TUS uploading is cancelled."
+            )
+            error = future.exception()
+            errors.append(
+                error
+                if error is not None
+                else Exception("Failed to upload file via tus")
+            )
+            chunks_in_flight -= 1
+            start_next_chunks()
+
+        def resume_chunk(index: int, retries: int, partial_url: str) -> None:
+            # Continue the failed partial upload from the offset confirmed
+            # by the server instead of creating a new one
+            self.request_async(
+                "HEAD",
+                partial_url,
+                headers={"Tus-Resumable": TUS_VERSION},
+                callback=lambda future: on_chunk_offset(
+                    index, retries, partial_url, future
+                ),
+            )
+
+        def on_chunk_offset(
+            index: int,
+            retries: int,
+            partial_url: str,
+            future: NgwReplyFuture,
+        ) -> None:
+            _, size = chunk_range(index)
+            offset_hdr = future.raw_header("Upload-Offset")
+            if (
+                future.status_code == 200
+                and offset_hdr is not None
+                and offset_hdr.isdigit()
+                and int(offset_hdr) < size
+            ):
+                patch_chunk(index, retries, partial_url, int(offset_hdr))
+                return
+
+            terminate_partial(partial_url)
+            start_chunk(index, retries)
+
+        def terminate_partial(partial_url: str) -> None:
+            created_urls.discard(partial_url)
+            if not is_termination_supported:
+                return
+            self.request_async(
+                "DELETE",
+                partial_url,
+                headers={"Tus-Resumable": TUS_VERSION},
+            )
+
+        start_next_chunks()
+        if chunks_in_flight > 0:
+            loop.exec()
+
+        if len(errors) > 0:
+            # Do not leave unusable partial uploads on the server
+            for partial_url in list(created_urls):
+                terminate_partial(partial_url)
+            raise errors[0]
+
+        final_hdrs = {
+            "Upload-Concat": "final;"
+            + " ".join(cast(List[str], partial_urls)),
+            "Upload-Metadata": upload_metadata,
+        }
+        return self.__tus_create(final_hdrs, upload_length=None)
 
     def sendUploadProgress(self, sent, total):
         # For Qt 5 the uploadProgress signal is sometimes emited when
@@ -604,9 +1763,14 @@ class QgsNgwConnection(QObject):
         return ngw_components.get("nextgisweb")
 
     def __wait_for_answer(self, lunkwill_summary: Dict[str, Any]) -> Any:
-        # Send "summary" requests periodically to check long request's status.
         # Make final "response" request with usual NGW json response after
         # receiving "ready" status.
+        request_id = self.__wait_for_lunkwill(lunkwill_summary)
+        return self.get(f"/api/lunkwill/{request_id}/response")
+
+    def __wait_for_lunkwill(self, lunkwill_summary: Dict[str, Any]) -> str:
+        # Send "summary" requests periodically to check long request's status.
+        # Return request id after receiving "ready" status.
 
         default_wait_ms = 2000
         max_failed_attempts = 3
@@ -648,18 +1812,16 @@ class QgsNgwConnection(QObject):
                     summary_failed += 1
 
             elif status == "ready":
-                sub_url = f"/api/lunkwill/{request_id}/response"
-                lunkwill_summary = self.get(sub_url)
                 break
 
             else:
                 message = f"Lunkwill request failed on server. Reply: {lunkwill_summary!s}"
                 raise RuntimeError(message)
 
-        return lunkwill_summary
+        return request_id
 
     def __extract_data(
-        self, reply: QNetworkReply
+        self, request: QNetworkRequest, reply: QNetworkReply
     ) -> Union[QByteArray, Dict[str, Any], None]:
         status_code = reply.attribute(
             QNetworkRequest.Attribute.HttpStatusCodeAttribute
@@ -667,12 +1829,26 @@ class QgsNgwConnection(QObject):
         if status_code == HTTPStatus.NO_CONTENT:
             return None
 
-        is_lunkwill_summary = is_lunkwill_reply(reply)
-        header_name = QNetworkRequest.KnownHeaders.ContentTypeHeader
-        is_json = reply.header(header_name) == "application/json"
-
         data = reply.readAll()
+        self.__cache_response(request, reply, data)
 
+        content_type = reply.header(
+            QNetworkRequest.KnownHeaders.ContentTypeHeader
+        )
+        return self.__parse_data(
+            data,
+            content_type if isinstance(content_type, str) else None,
+            is_lunkwill_summary=is_lunkwill_reply(reply),
+        )
+
+    def __parse_data(
+        self,
+        data: QByteArray,
+        content_type: Optional[str],
+        *,
+        is_lunkwill_summary: bool,
+    ) -> Union[QByteArray, Dict[str, Any]]:
+        is_json = content_type == "application/json"
         if not is_lunkwill_summary and not is_json:
             return data
 
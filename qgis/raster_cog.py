@@ -0,0 +1,118 @@
+"""
+/***************************************************************************
+    NextGIS WEB API
+                              -------------------
+        begin                : 2014-11-19
+        git sha              : $Format:%H$
+        copyright            : (C) 2014 by NextGIS
+        email                : info@nextgis.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import os
+from typing import List
+
+from osgeo import gdal
+
+from nextgis_connect.logging import logger
+
+from .upload_pipeline import UPLOAD_PREPARE_WORKERS
+
+# Lossless compression keeps pixel values of uploaded rasters unchanged
+COG_COMPRESSION = "DEFLATE"
+COG_BLOCK_SIZE = 512
+# Threads of one GDAL job. Several files are prepared at once, so CPU cores
+# are shared between them
+RASTER_NUM_THREADS = max(1, (os.cpu_count() or 1) // UPLOAD_PREPARE_WORKERS)
+
+
+def is_cog_supported() -> bool:
+    return gdal.GetDriverByName("COG") is not None
+
+
+def cog_creation_options(
+    compression: str = COG_COMPRESSION,
+    num_threads: int = RASTER_NUM_THREADS,
+) -> List[str]:
+    """
+    Creation options of the GDAL COG driver.
+
+    Internal overviews are always built. Overview levels are computed and
+    compressed by GDAL worker threads.
+    """
+    options = [
+        f"COMPRESS={compression}",
+        f"BLOCKSIZE={COG_BLOCK_SIZE}",
+        "OVERVIEWS=IGNORE_EXISTING",
+        "BIGTIFF=IF_SAFER",
+        f"NUM_THREADS={num_threads}",
+    ]
+    if compression in ("DEFLATE", "LZW", "ZSTD"):
+        options.append("PREDICTOR=YES")
+    return options
+
+
+def is_cog(path: str) -> bool:
+    """Check if the file is a Cloud Optimized GeoTIFF"""
+    dataset = gdal.OpenEx(path, gdal.OF_RASTER)
+    if dataset is None:
+        return False
+    layout = dataset.GetMetadataItem("LAYOUT", "IMAGE_STRUCTURE")
+    has_overviews = (
+        dataset.RasterCount > 0
+        and dataset.GetRasterBand(1).GetOverviewCount() > 0
+    )
+    del dataset
+    return layout == "COG" and has_overviews
+
+
+def translate_to_cog(
+    source_path: str,
+    output_path: str,
+    *,
+    compression: str = COG_COMPRESSION,
+    num_threads: int = RASTER_NUM_THREADS,
+) -> bool:
+    """
+    Convert a georeferenced raster to a Cloud Optimized GeoTIFF.
+
+    :param source_path: Path of the source raster.
+    :param output_path: Path of the created file.
+    :param compression: Compression method of the GDAL COG driver.
+    :param num_threads: Number of GDAL worker threads.
+    :return: True if the file has been created.
+    """
+    if not is_cog_supported():
+        return False
+
+    options = gdal.TranslateOptions(
+        format="COG",
+        creationOptions=cog_creation_options(compression, num_threads),
+    )
+    # Overviews of big rasters are computed in several threads too
+    gdal.SetThreadLocalConfigOption("GDAL_NUM_THREADS", str(num_threads))
+    try:
+        dataset = gdal.Translate(output_path, source_path, options=options)
+    except RuntimeError:
+        dataset = None
+    finally:
+        gdal.SetThreadLocalConfigOption("GDAL_NUM_THREADS", None)
+
+    if dataset is None:
+        logger.warning(f"Can't convert {source_path} to COG")
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        return False
+
+    del dataset  # save changes
+
+    return True
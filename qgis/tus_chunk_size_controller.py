@@ -0,0 +1,97 @@
+"""
+/***************************************************************************
+    NextGIS WEB API
+                              -------------------
+        begin                : 2014-11-19
+        git sha              : $Format:%H$
+        copyright            : (C) 2014 by NextGIS
+        email                : info@nextgis.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+from typing import Optional
+
+# Chunk sizes are multiples of this value
+CHUNK_SIZE_STEP = 256 * 1024
+
+
+class TusChunkSizeController:
+    """
+    Choose tus chunk size from measured PATCH throughput.
+
+    The next chunk is sized so that sending it takes about
+    ``target_duration`` seconds: long enough to make the round trip
+    negligible and far enough from the client timeout. The size changes at
+    most twice per chunk and is halved after a failed chunk.
+    """
+
+    __chunk_size: int
+    __min_chunk_size: int
+    __max_chunk_size: int
+    __target_duration: float
+    __throughput: Optional[float]
+
+    def __init__(
+        self,
+        initial_chunk_size: int,
+        min_chunk_size: int,
+        max_chunk_size: int,
+        target_duration: float,
+    ) -> None:
+        if not 0 < min_chunk_size <= max_chunk_size:
+            message = "Invalid chunk size bounds"
+            raise ValueError(message)
+
+        self.__min_chunk_size = min_chunk_size
+        self.__max_chunk_size = max_chunk_size
+        self.__target_duration = target_duration
+        self.__throughput = None
+        self.__chunk_size = self.__bound(initial_chunk_size)
+
+    @property
+    def chunk_size(self) -> int:
+        return self.__chunk_size
+
+    @property
+    def throughput(self) -> Optional[float]:
+        """Smoothed throughput in bytes per second"""
+        return self.__throughput
+
+    def chunk_sent(self, size: int, duration: float) -> None:
+        if size <= 0:
+            return
+
+        throughput = size / max(duration, 0.001)
+        if self.__throughput is None:
+            self.__throughput = throughput
+        else:
+            self.__throughput = (self.__throughput + throughput) / 2
+
+        # Last chunk of the file is usually smaller and should not shrink
+        # the chunk size by itself
+        if size < self.__chunk_size and duration < self.__target_duration:
+            return
+
+        ideal_size = self.__throughput * self.__target_duration
+        ideal_size = min(
+            max(ideal_size, self.__chunk_size / 2), self.__chunk_size * 2
+        )
+        self.__chunk_size = self.__bound(int(ideal_size))
+
+    def chunk_failed(self) -> None:
+        self.__chunk_size = self.__bound(self.__chunk_size // 2)
+
+    def __bound(self, chunk_size: int) -> int:
+        chunk_size -= chunk_size % CHUNK_SIZE_STEP
+        return min(
+            max(chunk_size, self.__min_chunk_size), self.__max_chunk_size
+        )
@@ -0,0 +1,168 @@
+"""
+/***************************************************************************
+    NextGIS WEB API
+                              -------------------
+        begin                : 2014-11-19
+        git sha              : $Format:%H$
+        copyright            : (C) 2014 by NextGIS
+        email                : info@nextgis.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import hashlib
+import json
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+from nextgis_connect.logging import logger
+
+from .local_storage import local_storage_path
+
+# Size of file parts at the beginning and at the end of the file used for
+# the content hash. Hashing whole multi-gigabyte files before every upload
+# is too slow, while size and mtime are checked separately anyway.
+HASH_SAMPLE_SIZE = 1024 * 1024
+
+_storage_lock = threading.Lock()
+
+
+def file_content_hash(file_path: str) -> str:
+    path = Path(file_path)
+    file_size = path.stat().st_size
+
+    content_hash = hashlib.sha256(str(file_size).encode())
+    with path.open("rb") as file:
+        content_hash.update(file.read(HASH_SAMPLE_SIZE))
+        if file_size > HASH_SAMPLE_SIZE:
+            file.seek(max(HASH_SAMPLE_SIZE, file_size - HASH_SAMPLE_SIZE))
+            content_hash.update(file.read(HASH_SAMPLE_SIZE))
+
+    return content_hash.hexdigest()
+
+
+@dataclass
+class TusUploadState:
+    connection_id: str
+    file_path: str
+    file_size: int
+    file_mtime: float
+    content_hash: str
+    upload_url: str
+    offset: int
+
+    @staticmethod
+    def for_file(
+        connection_id: str, file_path: str, upload_url: str
+    ) -> "TusUploadState":
+        path = Path(file_path).resolve()
+        stat = path.stat()
+        return TusUploadState(
+            connection_id,
+            str(path),
+            stat.st_size,
+            stat.st_mtime,
+            file_content_hash(str(path)),
+            upload_url,
+            0,
+        )
+
+    def is_file_unchanged(self) -> bool:
+        path = Path(self.file_path)
+        if not path.is_file():
+            return False
+
+        stat = path.stat()
+        return (
+            stat.st_size == self.file_size
+            and stat.st_mtime == self.file_mtime
+            and file_content_hash(self.file_path) == self.content_hash
+        )
+
+
+class TusUploadStateStorage:
+    """Persistent storage of unfinished tus uploads"""
+
+    __path: Path
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.__path = (
+            path
+            if path is not None
+            else local_storage_path("tus_uploads.json")
+        )
+
+    def find(
+        self, connection_id: str, file_path: str
+    ) -> Optional[TusUploadState]:
+        """
+        Return state of unfinished upload of the file.
+
+        States of files changed since the upload has been started are
+        removed.
+        """
+        key = self.__key(connection_id, file_path)
+        with _storage_lock:
+            states = self.__read()
+            state_dict = states.get(key)
+        if state_dict is None:
+            return None
+
+        try:
+            state = TusUploadState(**state_dict)
+        except TypeError:
+            state = None
+
+        if state is None or not state.is_file_unchanged():
+            logger.debug(f"Forget tus upload state of {file_path}")
+            with _storage_lock:
+                states = self.__read()
+                states.pop(key, None)
+                self.__write(states)
+            return None
+
+        return state
+
+    def save(self, state: TusUploadState) -> None:
+        key = self.__key(state.connection_id, state.file_path)
+        with _storage_lock:
+            states = self.__read()
+            states[key] = asdict(state)
+            self.__write(states)
+
+    def remove(self, state: TusUploadState) -> None:
+        key = self.__key(state.connection_id, state.file_path)
+        with _storage_lock:
+            states = self.__read()
+            if states.pop(key, None) is not None:
+                self.__write(states)
+
+    def __key(self, connection_id: str, file_path: str) -> str:
+        return f"{connection_id}:{Path(file_path).resolve()}"
+
+    def __read(self) -> Dict[str, Dict]:
+        if not self.__path.exists():
+            return {}
+
+        try:
+            states = json.loads(self.__path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            logger.warning("Tus uploads state file is corrupted")
+            return {}
+
+        return states if isinstance(states, dict) else {}
+
+    def __write(self, states: Dict[str, Dict]) -> None:
+        tmp_path = self.__path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(states), encoding="utf-8")
+        tmp_path.replace(self.__path)
@@ -0,0 +1,190 @@
+"""
+/***************************************************************************
+    NextGIS WEB API
+                              -------------------
+        begin                : 2014-11-19
+        git sha              : $Format:%H$
+        copyright            : (C) 2014 by NextGIS
+        email                : info@nextgis.com
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Generic, Iterable, List, TypeVar
+
+from nextgis_connect.logging import logger
+
+# Number of files prepared simultaneously
+UPLOAD_PREPARE_WORKERS = 2
+# Maximum total size of prepared files waiting for upload
+UPLOAD_PREPARE_DISK_BUDGET = 2 * 1024 * 1024 * 1024
+
+R = TypeVar("R")
+
+
+@dataclass(frozen=True)
+class PrepareTask(Generic[R]):
+    key: str
+    prepare: Callable[[], R]
+    temporary_files: Callable[[R], Iterable[str]]
+
+
+class UploadPipeline(Generic[R]):
+    """
+    Prepares files for upload in worker threads ahead of the network stage.
+
+    Tasks are started in the order they were passed. The consumer takes
+    results by key, so uploads and the resulting resource tree keep their
+    order regardless of which preparation finishes first. New tasks are not
+    started while prepared but not yet taken files exceed the disk budget.
+    A taken result is owned by the consumer; results which were never taken
+    are removed when the pipeline is closed.
+    """
+
+    __tasks: List[PrepareTask[R]]
+    __keys: Dict[str, int]
+    __futures: Dict[str, "Future[R]"]
+    __sizes: Dict[str, int]
+    __next_task: int
+    __running: int
+    __workers: int
+    __disk_budget: int
+    __is_closed: bool
+    __executor: ThreadPoolExecutor
+    __lock: threading.RLock
+
+    def __init__(
+        self,
+        tasks: Iterable[PrepareTask[R]],
+        *,
+        workers: int = UPLOAD_PREPARE_WORKERS,
+        disk_budget: int = UPLOAD_PREPARE_DISK_BUDGET,
+    ) -> None:
+        self.__tasks = list(tasks)
+        self.__keys = {
+            task.key: index for index, task in enumerate(self.__tasks)
+        }
+        self.__futures = {}
+        self.__sizes = {}
+        self.__next_task = 0
+        self.__running = 0
+        self.__workers = max(1, workers)
+        self.__disk_budget = disk_budget
+        self.__is_closed = False
+        self.__executor = ThreadPoolExecutor(
+            max_workers=self.__workers,
+            thread_name_prefix="UploadPipeline",
+        )
+        self.__lock = threading.RLock()
+
+        with self.__lock:
+            self.__submit_ready()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__keys
+
+    def __enter__(self) -> "UploadPipeline[R]":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def take(self, key: str) -> R:
+        """
+        Wait for the preparation of the task and return its result.
+
+        The task is started immediately if it was not started yet. Errors
+        raised by the preparation are raised here.
+
+        :param key: Key of the task.
+        :return: Result of the preparation.
+        """
+        with self.__lock:
+            index = self.__keys.pop(key)
+            future = self.__futures.get(key)
+            if future is None:
+                future = self.__submit(self.__tasks[index])
+
+        try:
+            return future.result()
+        finally:
+            with self.__lock:
+                self.__futures.pop(key, None)
+                self.__sizes.pop(key, None)
+                self.__submit_ready()
+
+    def close(self) -> None:
+        """Cancel pending tasks and remove files which were not taken"""
+        with self.__lock:
+            if self.__is_closed:
+                return
+            self.__is_closed = True
+            futures = dict(self.__futures)
+            for future in futures.values():
+                future.cancel()
+
+        self.__executor.shutdown(wait=True)
+
+        for key, future in futures.items():
+            if future.cancelled() or key not in self.__keys:
+                continue
+            try:
+                result = future.result()
+            except Exception:
+                continue
+            task = self.__tasks[self.__keys[key]]
+            for path in task.temporary_files(result):
+                try:
+                    os.remove(path)
+                except OSError:
+                    logger.warning(f"Can't remove prepared file {path}")
+
+        self.__futures.clear()
+        self.__sizes.clear()
+
+    def __submit_ready(self) -> None:
+        while (
+            not self.__is_closed
+            and self.__next_task < len(self.__tasks)
+            and self.__running < self.__workers
+            and sum(self.__sizes.values()) < self.__disk_budget
+        ):
+            task = self.__tasks[self.__next_task]
+            self.__next_task += 1
+            if task.key in self.__keys and task.key not in self.__futures:
+                self.__submit(task)
+
+    def __submit(self, task: PrepareTask[R]) -> "Future[R]":
+        self.__running += 1
+        future = self.__executor.submit(task.prepare)
+        self.__futures[task.key] = future
+        future.add_done_callback(
+            lambda future: self.__on_prepared(task, future)
+        )
+        return future
+
+    def __on_prepared(self, task: PrepareTask[R], future: "Future[R]") -> None:
+        size = 0
+        try:
+            for path in task.temporary_files(future.result()):
+                size += os.path.getsize(path)
+        except Exception:
+            pass
+
+        with self.__lock:
+            self.__running -= 1
+            if task.key in self.__futures:
+                self.__sizes[task.key] = size
+            self.__submit_ready()
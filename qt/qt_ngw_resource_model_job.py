@@ -34,6 +34,9 @@ from nextgis_connect.ngw_api.core.ngw_resource_creator import ResourceCreator
 from nextgis_connect.ngw_api.core.ngw_resource_factory import (
     NGWResourceFactory,
 )
+from nextgis_connect.ngw_api.core.ngw_resource_store import (
+    NGWResourceStore,
+)
 from nextgis_connect.ngw_api.core.ngw_vector_layer import NGWVectorLayer
 from nextgis_connect.ngw_api.core.ngw_webmap import (
     NGWWebMap,
@@ -202,18 +205,70 @@ class NGWResourceModelJob(QObject):
 
 class NGWRootResourcesLoader(NGWResourceModelJob):
     ngw_connection: QgsNgwConnection
+    store: Optional[NGWResourceStore]
 
-    def __init__(self, ngw_connection: QgsNgwConnection):
+    def __init__(
+        self,
+        ngw_connection: QgsNgwConnection,
+        *,
+        store: Optional[NGWResourceStore] = None,
+    ):
         super().__init__()
         self.ngw_connection = ngw_connection
+        self.store = store
 
     def _do(self):
-        rsc_factory = NGWResourceFactory(self.ngw_connection)
+        rsc_factory = NGWResourceFactory(self.ngw_connection, store=self.store)
 
         ngw_root_resource = rsc_factory.get_root_resource()
         self.putAddedResourceToResult(ngw_root_resource, is_main=True)
 
 
+class NGWStoredResourcesLoader(NGWResourceModelJob):
+    """
+    Load resources tree saved in the store during previous sessions.
+
+    No requests are sent to the server, so the tree can be shown at once.
+    Resources should be revalidated afterwards with
+    :class:`NGWRootResourcesLoader` and :class:`NGWResourceUpdater` using
+    the same store. If the store has no root resource, the result is empty.
+    """
+
+    ngw_connection: QgsNgwConnection
+    store: NGWResourceStore
+
+    def __init__(
+        self, ngw_connection: QgsNgwConnection, store: NGWResourceStore
+    ):
+        super().__init__()
+        self.ngw_connection = ngw_connection
+        self.store = store
+
+    def _do(self):
+        rsc_factory = NGWResourceFactory(self.ngw_connection, store=self.store)
+
+        ngw_root_resource = rsc_factory.get_stored_resource(0)
+        if ngw_root_resource is None:
+            return
+
+        self.putAddedResourceToResult(ngw_root_resource, is_main=True)
+
+        level = [ngw_root_resource]
+        while len(level) > 0:
+            next_level = []
+            for ngw_resource in level:
+                children = rsc_factory.get_stored_children(ngw_resource)
+                if children is None:
+                    continue
+
+                ngw_resource.set_children_count(len(children))
+                for child in children:
+                    self.putAddedResourceToResult(child)
+                next_level.extend(children)
+
+            level = next_level
+
+
 class NGWResourceUpdater(NGWResourceModelJob):
     def __init__(
         self,
@@ -240,26 +295,34 @@ class NGWResourceUpdater(NGWResourceModelJob):
         self.recursive = recursive
 
     def _do(self):
-        for ngw_resource in self.ngw_resources:
-            self.__get_children(ngw_resource)
-
-        for ngw_resource in self.dangling_resources:
-            self.__get_children(ngw_resource, dangling=True)
+        self.__get_children(self.ngw_resources)
+        self.__get_children(self.dangling_resources, dangling=True)
 
     def __get_children(
-        self, ngw_resource: NGWResource, dangling: bool = False
+        self, ngw_resources: List[NGWResource], dangling: bool = False
     ):
-        ngw_resource_children = ngw_resource.get_children()
-        for ngw_resource_child in ngw_resource_children:
-            if dangling:
-                self.result.dangling_resources.append(ngw_resource_child)
-            else:
-                self.putAddedResourceToResult(ngw_resource_child)
-
-            if self.recursive and isinstance(
-                ngw_resource_child, NGWGroupResource
-            ):
-                self.__get_children(ngw_resource_child, dangling=dangling)
+        # Children of all resources of one tree level are fetched
+        # concurrently, then the next level is processed
+        level = ngw_resources
+        while len(level) > 0:
+            next_level = []
+
+            rsc_factory = level[0].res_factory
+            for ngw_resource_children in rsc_factory.get_children_of(level):
+                for ngw_resource_child in ngw_resource_children:
+                    if dangling:
+                        self.result.dangling_resources.append(
+                            ngw_resource_child
+                        )
+                    else:
+                        self.putAddedResourceToResult(ngw_resource_child)
+
+                    if self.recursive and isinstance(
+                        ngw_resource_child, NGWGroupResource
+                    ):
+                        next_level.append(ngw_resource_child)
+
+            level = next_level
 
 
 class NGWGroupCreater(NGWResourceModelJob):